@@ -1,19 +1,59 @@
-from flask import Flask, jsonify, render_template, request, redirect, url_for, send_from_directory
+from flask import Flask, jsonify, render_template, request, redirect, url_for, send_from_directory, make_response, g, Markup
+import click
+import metrics
 import http.client
 import json
 from datetime import datetime, timedelta
 import requests
+import numpy as np
 import os
 from dotenv import load_dotenv
-from functools import lru_cache
+from werkzeug.exceptions import HTTPException
+from contextlib import contextmanager
+from functools import wraps
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from collections import namedtuple, deque, OrderedDict
+import asyncio
+import bisect
+import codecs
+import contextvars
+import fcntl
+import fnmatch
+import glob
+import gzip
+import hashlib
+import heapq
+import itertools
+import logging
+import queue
+import re
+import socket
+import sqlite3
+import ssl
+import tempfile
+import threading
 import time
+import unicodedata
+import zlib
+from urllib.parse import parse_qs
 
 load_dotenv()  # Charge les variables d'environnement depuis .env
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'default-dev-key')  # Utilise la clé depuis les variables d'environnement
 
+# Niveau de journalisation (DEBUG affiche les URL appelées et le détail des prédictions)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+logger = logging.getLogger('prono')
+if not logger.handlers:
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter('%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s'))
+    logger.addHandler(log_handler)
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
 API_KEY = os.environ.get('RAPIDAPI_KEY', 'dfa89bdb87mshcc417c376ac947fp100750jsn6f1aa9d00a91')
+API_HOST = 'api-football-v1.p.rapidapi.com'
 
 # Organisation des ligues par région
 REGIONS = {
@@ -93,87 +133,1542 @@ for region in REGIONS.values():
         for league in category['leagues'].values():
             LEAGUES[league['id']] = league['name']
 
-# Cache pour les appels API (30 minutes)
+# Durée de fraîcheur par défaut des entrées du cache API (30 minutes) ; voir CACHE_CLASSES
 CACHE_DURATION = 1800
+# Durée supplémentaire pendant laquelle une entrée périmée est servie pendant son rafraîchissement
+CACHE_STALE_DURATION = int(os.environ.get('CACHE_STALE_DURATION', '1800'))
+
+# Durées (en secondes) des classes de cache qui s'écartent de CACHE_DURATION
+CACHE_LIVE_TTL = int(os.environ.get('CACHE_LIVE_TTL', '60'))
+CACHE_REFERENCE_TTL = int(os.environ.get('CACHE_REFERENCE_TTL', '86400'))
+# Budget (en octets) du cache mémoire (L1) de chaque worker, toutes classes confondues
+API_CACHE_L1_BUDGET = int(os.environ.get('API_CACHE_L1_BUDGET', str(64 * 1024 * 1024)))
+
+# Durée de fraîcheur, durée supplémentaire de service périmé, budget L1 (octets) et priorité d'éviction :
+# quand le budget global est dépassé, les classes de priorité la plus basse sont vidées en premier
+CacheClass = namedtuple('CacheClass', ['ttl', 'stale', 'budget', 'priority'])
+CACHE_CLASSES = {
+    'live': CacheClass(CACHE_LIVE_TTL, CACHE_LIVE_TTL, 4 * 1024 * 1024, 1),
+    'daily': CacheClass(CACHE_DURATION, CACHE_STALE_DURATION, 16 * 1024 * 1024, 3),
+    'finished': CacheClass(CACHE_REFERENCE_TTL, CACHE_REFERENCE_TTL, 16 * 1024 * 1024, 2),
+    'reference': CacheClass(CACHE_REFERENCE_TTL, CACHE_REFERENCE_TTL, 32 * 1024 * 1024, 4),
+    'default': CacheClass(CACHE_DURATION, CACHE_STALE_DURATION, 16 * 1024 * 1024, 2)
+}
+
+# Règles évaluées dans l'ordre, la première applicable l'emporte : motif de l'endpoint (fnmatch), expression
+# cherchée dans les paramètres, condition sur la réponse ou le match concerné (CACHE_CONDITIONS), classe
+CacheRule = namedtuple('CacheRule', ['endpoint', 'params', 'when', 'cache_class'])
+CACHE_POLICY = [
+    CacheRule('matches_*', None, None, 'daily'),
+    CacheRule('fixtures', r'(^|&)live=', None, 'live'),
+    CacheRule('fixtures', r'(^|&)date=', None, 'daily'),
+    CacheRule('fixtures', r'(^|&)team=', None, 'default'),
+    CacheRule('fixtures/headtohead', None, None, 'reference'),
+    CacheRule('fixtures*', None, 'live', 'live'),
+    CacheRule('fixtures*', None, 'finished', 'finished'),
+    CacheRule('predictions', None, 'finished', 'finished'),
+    CacheRule('teams/statistics', None, 'past_season', 'reference'),
+    CacheRule('teams', None, None, 'reference'),
+    CacheRule('leagues', None, None, 'reference'),
+    CacheRule('*', None, None, 'default')
+]
+
+def query_fixture_state(params, data):
+    """État du match d'après la réponse, ou d'après le calendrier pour l'id passé en paramètre"""
+    query = parse_qs(params)
+    fixture_id = (query.get('id') or query.get('fixture') or [None])[0]
+    return fixture_state(normalize_fixture_id(fixture_id), data)
+
+def is_past_season(params, data):
+    """Vrai pour une saison terminée, d'après les saisons en cours déjà en cache (jamais d'appel API ici)"""
+    query = parse_qs(params)
+    season = safe_int_convert((query.get('season') or [None])[0], None)
+    league_id = safe_int_convert((query.get('league') or [None])[0], None)
+    if season is None:
+        return False
+    current = datetime.now().year - 1
+    leagues = api_cache.peek('leagues?current=true')
+    for item in (leagues or {}).get('response', []):
+        if safe_get(item, 'league', 'id') == league_id:
+            current = next((s['year'] for s in item.get('seasons') or [] if s.get('current')), current)
+    return season < current
+
+CACHE_CONDITIONS = {
+    'live': lambda params, data: query_fixture_state(params, data) == 'live',
+    'finished': lambda params, data: query_fixture_state(params, data) == 'finished',
+    'past_season': is_past_season
+}
+
+def cache_policy(key, data=None):
+    """Classe de cache d'une clé ('endpoint?params' ou 'matches_<date>'), avec la réponse si elle est connue"""
+    endpoint, _, params = key.partition('?')
+    for rule in CACHE_POLICY:
+        if not fnmatch.fnmatchcase(endpoint, rule.endpoint):
+            continue
+        if rule.params is not None and not re.search(rule.params, params):
+            continue
+        if rule.when is not None and not CACHE_CONDITIONS[rule.when](params, data):
+            continue
+        return rule.cache_class
+    return 'default'
+
+# Cache partagé entre les workers : 'sqlite' (un fichier par hôte) ou 'memory' (cache local uniquement)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+CACHE_DB_PATH = os.environ.get('CACHE_DB_PATH',
+                               os.path.join(tempfile.gettempdir(), f"prono-cache-{socket.gethostname()}.sqlite3"))
+# Intervalle minimal (en secondes) entre deux purges des entrées expirées, et taille des lots supprimés
+CACHE_SWEEP_INTERVAL = int(os.environ.get('CACHE_SWEEP_INTERVAL', '300'))
+CACHE_SWEEP_BATCH = int(os.environ.get('CACHE_SWEEP_BATCH', '500'))
+# Durée (en secondes) pendant laquelle une entrée expirée reste disponible comme dernière réponse valide connue
+CACHE_LAST_GOOD_RETENTION = int(os.environ.get('CACHE_LAST_GOOD_RETENTION', '172800'))
+# Nombre d'entrées expirées gardées en mémoire par worker pour la même raison
+API_CACHE_LAST_GOOD_SIZE = int(os.environ.get('API_CACHE_LAST_GOOD_SIZE', '256'))
+
+# Entrées du cache API lues par la page en cours : clé -> date d'enregistrement (dictionnaire partagé avec ses appels parallèles)
+cache_reads = contextvars.ContextVar('cache_reads', default=None)
+
+def record_reads(stamps):
+    reads = cache_reads.get()
+    if reads is not None:
+        reads.update(stamps)
+
+@contextmanager
+def tracking_reads():
+    """Collecte les entrées du cache API lues dans le bloc ; elles restent aussi comptées pour l'appelant"""
+    reads = {}
+    token = cache_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        cache_reads.reset(token)
+        record_reads(reads)
+
+class SQLiteCacheBackend:
+    """Cache SQLite (mode WAL) partagé par tous les workers et conservé entre les redémarrages"""
+    def __init__(self, path, sweep_interval=CACHE_SWEEP_INTERVAL, sweep_batch=CACHE_SWEEP_BATCH,
+                 retention=CACHE_LAST_GOOD_RETENTION):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self.retention = retention
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = 0
+        self.stats = {'evictions': 0}
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache ('
+                     'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                     'stored_at REAL NOT NULL, expires_at REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)')
+
+    def _connection(self):
+        # Une connexion par thread, recréée après un fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Retourne (données, date d'enregistrement, taille en octets) ou None ; lecture par clé primaire uniquement"""
+        row = self._connection().execute(
+            'SELECT value, stored_at FROM cache WHERE key = ? AND expires_at > ?',
+            (key, time.time())).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], len(row[0])
+
+    def set(self, key, data, stored_at, expires_at):
+        """Enregistre l'entrée et retourne sa taille sérialisée en octets"""
+        value = json.dumps(data)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)',
+            (key, value, stored_at, expires_at))
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.sweep()
+        return len(value)
+
+    def last_good(self, key):
+        """Retourne (données, date d'enregistrement) même si l'entrée a expiré, tant qu'elle n'a pas été purgée"""
+        row = self._connection().execute('SELECT value, stored_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def usage(self):
+        """Nombre d'entrées et taille totale des valeurs en octets"""
+        return self._connection().execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache').fetchone()
+
+    def sweep(self):
+        """Supprime par lots, pour ne pas bloquer les autres workers, les entrées expirées depuis plus de retention"""
+        if not self._sweep_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._last_sweep = time.time()
+            conn = self._connection()
+            removed = 0
+            while True:
+                cursor = conn.execute(
+                    'DELETE FROM cache WHERE rowid IN '
+                    '(SELECT rowid FROM cache WHERE expires_at <= ? LIMIT ?)',
+                    (self._last_sweep - self.retention, self.sweep_batch))
+                removed += cursor.rowcount
+                if cursor.rowcount < self.sweep_batch:
+                    self.stats['evictions'] += removed
+                    return removed
+        finally:
+            self._sweep_lock.release()
 
 class APICache:
-    def __init__(self):
+    """Cache à deux niveaux : dictionnaire en mémoire (L1) devant un backend partagé optionnel (L2).
+
+    La classe de chaque entrée (cache_policy) fixe sa durée de fraîcheur et de service périmé, son budget
+    en mémoire et sa priorité d'éviction."""
+    def __init__(self, backend=None, budget=API_CACHE_L1_BUDGET):
         self.cache = {}
-        
+        self.sizes = {}  # taille sérialisée (en octets) de chaque entrée L1
+        self.classes = {}  # classe de chaque entrée L1
+        self.lru = {name: OrderedDict() for name in CACHE_CLASSES}  # clés L1 par classe, la plus ancienne en tête
+        self.class_bytes = dict.fromkeys(CACHE_CLASSES, 0)
+        self.budget = budget
+        self.backend = backend
+        self.stats = {
+            'l1': {'hits': 0, 'misses': 0, 'evictions': 0},
+            'l2': {'hits': 0, 'misses': 0, 'errors': 0}
+        }
+        self.class_stats = {name: {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0} for name in CACHE_CLASSES}
+        self.expired = OrderedDict()  # entrées sorties de leur fenêtre de validité : dernières réponses valides connues
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, tier, counter):
+        with self._stats_lock:
+            self.stats[tier][counter] += 1
+
+    def _count_class(self, name, counter):
+        with self._stats_lock:
+            self.class_stats[name][counter] += 1
+
+    def _forget(self, key):
+        # Sous self._lock
+        self.cache.pop(key, None)
+        size = self.sizes.pop(key, 0)
+        name = self.classes.pop(key, None)
+        if name is not None:
+            del self.lru[name][key]
+            self.class_bytes[name] -= size
+
+    def _evict(self, name):
+        # Sous self._lock : l'entrée la moins récemment lue de la classe (elle reste dans le L2)
+        self._forget(next(iter(self.lru[name])))
+        self._count_class(name, 'evictions')
+
+    def _store(self, key, data, timestamp, name, size):
+        """Ajoute l'entrée au L1 puis évince selon le budget de sa classe et le budget global"""
+        with self._lock:
+            self._forget(key)
+            self.expired.pop(key, None)
+            self.cache[key] = (data, timestamp)
+            self.sizes[key] = size
+            self.classes[key] = name
+            self.lru[name][key] = None
+            self.class_bytes[name] += size
+            while self.class_bytes[name] > CACHE_CLASSES[name].budget:
+                self._evict(name)
+            while sum(self.class_bytes.values()) > self.budget:
+                victim = min((n for n in CACHE_CLASSES if self.lru[n]), key=lambda n: CACHE_CLASSES[n].priority)
+                self._evict(victim)
+
+    def _entry(self, key):
+        """Retourne (données, date d'enregistrement, classe) tant que l'entrée est dans sa fenêtre de validité (fraîche ou périmée)"""
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                name = self.classes[key]
+                policy = CACHE_CLASSES[name]
+                if time.time() - entry[1] < policy.ttl + policy.stale:
+                    self.lru[name].move_to_end(key)
+                    self._count('l1', 'hits')
+                    return entry[0], entry[1], name
+                self._forget(key)
+                self.expired[key] = entry
+                while len(self.expired) > API_CACHE_LAST_GOOD_SIZE:
+                    self.expired.popitem(last=False)
+                self._count('l1', 'evictions')
+        self._count('l1', 'misses')
+
+        if self.backend is None:
+            return None
+        try:
+            entry = self.backend.get(key)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("Erreur du cache partagé: %s", e)
+            self._count('l2', 'errors')
+            return None
+        if entry is None:
+            self._count('l2', 'misses')
+            return None
+        # L'état du match a pu changer depuis l'écriture : la classe est réévaluée
+        data, timestamp, size = entry
+        name = cache_policy(key, data)
+        policy = CACHE_CLASSES[name]
+        if time.time() - timestamp >= policy.ttl + policy.stale:
+            self._count('l2', 'misses')
+            return None
+        self._count('l2', 'hits')
+        # Remonter l'entrée en L1 en conservant sa date d'origine
+        self._store(key, data, timestamp, name, size)
+        return data, timestamp, name
+
+    def lookup(self, key):
+        """Retourne (données, fraîche) ; une entrée périmée mais encore servable est retournée avec fraîche=False"""
+        entry = self._entry(key)
+        if entry is None:
+            self._count_class(cache_policy(key), 'misses')
+            return None, False
+        data, timestamp, name = entry
+        fresh = time.time() - timestamp < CACHE_CLASSES[name].ttl
+        self._count_class(name, 'hits' if fresh else 'stale_hits')
+        record_reads({key: timestamp})
+        return data, fresh
+
     def get(self, key):
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < CACHE_DURATION:
-                return data
+        data, fresh = self.lookup(key)
+        return data if fresh else None
+
+    def set(self, key, data):
+        name = cache_policy(key, data)
+        policy = CACHE_CLASSES[name]
+        timestamp = time.time()
+        size = None
+        if self.backend is not None:
+            try:
+                size = self.backend.set(key, data, timestamp, timestamp + policy.ttl + policy.stale)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning("Erreur du cache partagé: %s", e)
+                self._count('l2', 'errors')
+        self._store(key, data, timestamp, name, size if size is not None else len(json.dumps(data, default=str)))
+        record_reads({key: timestamp})
+
+    def peek(self, key):
+        """Données de l'entrée dans sa fenêtre de validité, en L1 puis en L2 (None sinon).
+
+        Ni appel API, ni lecture comptée, ni remontée en L1 : utilisable pendant le calcul d'une classe de cache."""
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                policy = CACHE_CLASSES[self.classes[key]]
+                if time.time() - entry[1] < policy.ttl + policy.stale:
+                    return entry[0]
+        if self.backend is None:
+            return None
+        try:
+            entry = self.backend.get(key)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("Erreur du cache partagé: %s", e)
+            self._count('l2', 'errors')
+            return None
+        return entry[0] if entry is not None else None
+
+    def stamp(self, key):
+        """Date d'enregistrement de l'entrée en L1 (None si absente) : elle change à chaque écriture ou invalidation"""
+        with self._lock:
+            entry = self.cache.get(key)
+        return entry[1] if entry is not None else None
+
+    def last_good(self, key):
+        """Dernière réponse enregistrée pour cette clé, même expirée (None si elle a été purgée)"""
+        with self._lock:
+            entry = self.cache.get(key) or self.expired.get(key)
+        if entry is not None:
+            return entry[0]
+        if self.backend is None:
+            return None
+        try:
+            entry = self.backend.last_good(key)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("Erreur du cache partagé: %s", e)
+            self._count('l2', 'errors')
+            return None
+        return entry[0] if entry is not None else None
+
+    def invalidate(self, key):
+        """Supprime l'entrée des deux niveaux : la prochaine lecture rappelle l'API"""
+        with self._lock:
+            self._forget(key)
+            self.expired.pop(key, None)
+        if self.backend is not None:
+            try:
+                self.backend.delete(key)
+            except sqlite3.Error as e:
+                logger.warning("Erreur du cache partagé: %s", e)
+                self._count('l2', 'errors')
+
+def create_cache_backend(name):
+    """Instancie le backend partagé (L2) configuré par CACHE_BACKEND"""
+    if name == 'sqlite':
+        try:
+            return SQLiteCacheBackend(CACHE_DB_PATH)
+        except sqlite3.Error as e:
+            logger.warning("Cache SQLite indisponible (%s), utilisation du cache mémoire seul", e)
+    return None
+
+api_cache = APICache(create_cache_backend(CACHE_BACKEND))
+
+# Nombre maximum d'appels API simultanés lancés par un worker
+API_CONCURRENCY = int(os.environ.get('API_CONCURRENCY', '8'))
+
+# Executor partagé par toutes les requêtes du worker
+api_executor = ThreadPoolExecutor(max_workers=API_CONCURRENCY, thread_name_prefix='api')
+
+def submit_with_context(executor, fn, *args):
+    """Soumet fn à l'executor en propagant le contexte (contextvars) de l'appelant"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+# Nombre maximum de connexions keep-alive ouvertes par worker
+API_POOL_SIZE = int(os.environ.get('API_POOL_SIZE', '8'))
+# Durée (en secondes) au-delà de laquelle une connexion inactive est fermée
+API_POOL_IDLE_TIMEOUT = float(os.environ.get('API_POOL_IDLE_TIMEOUT', '60'))
+# Délais (en secondes) d'établissement de la connexion et de lecture (par opération sur la socket)
+API_CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', '3'))
+API_READ_TIMEOUT = float(os.environ.get('API_READ_TIMEOUT', '10'))
+# Endpoints qui s'écartent des délais par défaut : (connexion, lecture)
+API_TIMEOUTS = {
+    'fixtures': (API_CONNECT_TIMEOUT, 15.0),
+    'teams': (API_CONNECT_TIMEOUT, 15.0),
+    'predictions': (API_CONNECT_TIMEOUT, 8.0)
+}
+
+# data : objet déjà décodé d'une réponse lue en flux (body est alors vide), size : taille décompressée lue
+UpstreamResponse = namedtuple('UpstreamResponse', ['status', 'headers', 'body', 'data', 'size'], defaults=(None, None))
+
+# Taille (en octets) des morceaux lus sur la socket pour les réponses décodées en flux
+API_STREAM_CHUNK = int(os.environ.get('API_STREAM_CHUNK', '65536'))
+
+class BodyReader:
+    """Corps d'une réponse lu par morceaux et décompressé au fil de l'eau"""
+    def __init__(self, res, gzipped, chunk_size=API_STREAM_CHUNK):
+        self.res = res
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+
+    def __iter__(self):
+        while True:
+            chunk = self.res.read(self.chunk_size)
+            if not chunk:
+                break
+            if self._decompressor is not None:
+                chunk = self._decompressor.decompress(chunk)
+            self.size += len(chunk)
+            yield chunk
+        if self._decompressor is not None:
+            tail = self._decompressor.flush()
+            self.size += len(tail)
+            yield tail
+
+    def drain(self):
+        """Lit la fin du corps pour que la connexion puisse être réutilisée"""
+        for _ in self:
+            pass
+
+class HTTPConnectionPool:
+    """Pool thread-safe de connexions HTTPS keep-alive vers un hôte"""
+    def __init__(self, host, size, idle_timeout):
+        self.host = host
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle = []  # (connexion, date de dernière utilisation)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._pid = os.getpid()
+        self.stats = {'created': 0, 'reused': 0, 'expired': 0}
+        
+    def _acquire(self):
+        with self._lock:
+            # Après un fork, ne jamais réutiliser les sockets du processus parent
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            now = time.time()
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    self.stats['reused'] += 1
+                    return conn, True
+                conn.close()
+                self.stats['expired'] += 1
+            self.stats['created'] += 1
+        return http.client.HTTPSConnection(self.host), False
+        
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((conn, time.time()))
+                return
+        conn.close()
+        
+    def request(self, method, url, headers, stream=None, timeouts=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)):
+        """Envoie une requête et retourne le statut, les en-têtes et le corps décompressé.
+
+        Avec stream, un corps de statut 200 n'est pas lu en entier : stream(morceaux) le décode au fil de
+        la lecture et son résultat est retourné dans data. timeouts : délais (connexion, lecture) en secondes."""
+        connect_timeout, read_timeout = timeouts
+        headers = dict(headers, **{'Accept-Encoding': 'gzip'})
+        with self._slots:
+            for attempt in range(2):
+                conn, reused = self._acquire()
+                try:
+                    if conn.sock is None:
+                        conn.timeout = connect_timeout
+                        conn.connect()
+                    conn.sock.settimeout(read_timeout)
+                    conn.request(method, url, headers=headers)
+                    res = conn.getresponse()
+                    response_headers = {name.lower(): value for name, value in res.getheaders()}
+                    gzipped = response_headers.get('content-encoding', '').lower() == 'gzip'
+                    if stream is not None and res.status == 200:
+                        reader = BodyReader(res, gzipped)
+                        data = stream(iter(reader))
+                        reader.drain()
+                    else:
+                        reader = data = None
+                        body = res.read()
+                except (http.client.HTTPException, ConnectionError):
+                    conn.close()
+                    # Le serveur a pu fermer une connexion inactive : on réessaie une fois
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except Exception:
+                    conn.close()
+                    raise
+                
+                if res.will_close:
+                    conn.close()
+                else:
+                    self._release(conn)
+                
+                if reader is not None:
+                    return UpstreamResponse(res.status, response_headers, b'', data, reader.size)
+                if gzipped:
+                    body = gzip.decompress(body)
+                return UpstreamResponse(res.status, response_headers, body)
+
+api_pool = HTTPConnectionPool(API_HOST, API_POOL_SIZE, API_POOL_IDLE_TIMEOUT)
+
+# Délai maximal (en secondes) d'attente d'un appel identique déjà en cours
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '30'))
+
+class SingleFlight:
+    """Regroupe les appels concurrents portant sur la même clé en un seul appel"""
+    class Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+    
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'coalesced': 0, 'timeouts': 0}
+        
+    def begin(self, key):
+        """Inscrit un appel sur la clé ; retourne (appel, meneur). Le meneur charge puis appelle finish, les autres wait"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight.Call()
+                self.stats['calls'] += 1
             else:
-                del self.cache[key]
+                self.stats['coalesced'] += 1
+        return call, leader
+
+    def wait(self, call, timeout):
+        """Résultat de l'appel en cours (None si délai dépassé)"""
+        if call.done.wait(timeout):
+            return call.result
+        with self._lock:
+            self.stats['timeouts'] += 1
         return None
+
+    def finish(self, key, call, result):
+        call.result = result
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+    def do(self, key, fn, timeout):
+        """Exécute fn() pour le premier appelant ; les suivants attendent son résultat (None si délai dépassé)"""
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call, timeout)
+        result = None
+        try:
+            result = fn()
+            return result
+        finally:
+            self.finish(key, call, result)
+
+api_single_flight = SingleFlight()
+
+# Priorités des appels à l'API : les pages demandées par un visiteur passent avant le travail de fond
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+upstream_priority = contextvars.ContextVar('upstream_priority', default=PRIORITY_INTERACTIVE)
+
+# Temps (en secondes) accordé à une page pour tous ses appels à l'API, bien en deçà du timeout de gunicorn
+REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE', '20'))
+# Échéance (time.monotonic()) de la requête en cours, partagée par tous ses appels ; None hors requête
+request_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+def deadline_remaining(limit):
+    """Temps restant avant l'échéance de la requête en cours, borné par limit (négatif si elle est passée)"""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return limit
+    return min(limit, deadline - time.monotonic())
+
+# Quota par minute supposé tant que l'API ne l'a pas annoncé dans ses en-têtes
+API_RATE_LIMIT_PER_MINUTE = int(os.environ.get('API_RATE_LIMIT_PER_MINUTE', '300'))
+# Attente maximale (en secondes) d'un jeton selon la priorité
+RATE_LIMIT_MAX_WAIT = {
+    PRIORITY_INTERACTIVE: float(os.environ.get('RATE_LIMIT_INTERACTIVE_WAIT', '10')),
+    PRIORITY_BACKGROUND: float(os.environ.get('RATE_LIMIT_BACKGROUND_WAIT', '300'))
+}
+
+class RateLimiter:
+    """Seau à jetons calé sur les quotas annoncés par l'API ; les appels attendent par ordre de priorité"""
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._queue = []  # tas de (priorité, ordre d'arrivée)
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {
+            'acquired': 0, 'throttled': 0, 'rejected': 0, 'rate_limited_responses': 0,
+            'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0,
+            'minute_limit': None, 'minute_remaining': None,
+            'day_limit': None, 'day_remaining': None
+        }
         
-    def set(self, key, data):
-        self.cache[key] = (data, time.time())
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60.0)
+        self.updated_at = now
+        
+    def _delay(self, now):
+        # Temps avant qu'un jeton soit disponible
+        delay = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) * 60.0 / self.capacity)
+        return delay
+        
+    def acquire(self, priority, timeout):
+        """Attend un jeton ; retourne False si le délai est dépassé"""
+        ticket = (priority, next(self._order))
+        start = time.monotonic()
+        throttled = False
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self._delay(now)
+                    if self._queue[0] == ticket and delay == 0:
+                        heapq.heappop(self._queue)
+                        self.tokens -= 1
+                        waited = now - start
+                        self.stats['acquired'] += 1
+                        self.stats['throttled'] += throttled
+                        self.stats['wait_seconds_total'] += waited
+                        self.stats['wait_seconds_max'] = max(self.stats['wait_seconds_max'], waited)
+                        metrics.observe('prono_rate_limiter_wait_seconds', waited,
+                                        {'priority': 'interactive' if priority <= PRIORITY_INTERACTIVE else 'background'})
+                        return True
+                    throttled = True
+                    remaining = timeout - (now - start)
+                    if remaining <= 0:
+                        self._queue.remove(ticket)
+                        heapq.heapify(self._queue)
+                        self.stats['rejected'] += 1
+                        return False
+                    # Seul le premier de la file attend un jeton ; les autres attendent leur tour
+                    self._cond.wait(min(delay, remaining) if self._queue[0] == ticket else remaining)
+            finally:
+                self._cond.notify_all()
+                
+    def update(self, status, headers):
+        """Ajuste le seau d'après le statut et les en-têtes de quota de la réponse"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            minute_limit = safe_int_convert(headers.get('x-ratelimit-limit'), None)
+            minute_remaining = safe_int_convert(headers.get('x-ratelimit-remaining'), None)
+            day_limit = safe_int_convert(headers.get('x-ratelimit-requests-limit'), None)
+            day_remaining = safe_int_convert(headers.get('x-ratelimit-requests-remaining'), None)
+            if minute_limit:
+                self.capacity = float(minute_limit)
+                self.stats['minute_limit'] = minute_limit
+            if minute_remaining is not None:
+                self.tokens = min(self.tokens, float(minute_remaining))
+                self.stats['minute_remaining'] = minute_remaining
+            if day_limit:
+                self.stats['day_limit'] = day_limit
+            if day_remaining is not None:
+                self.stats['day_remaining'] = day_remaining
+                if day_remaining <= 0:
+                    reset = safe_int_convert(headers.get('x-ratelimit-requests-reset'), 60)
+                    self.blocked_until = max(self.blocked_until, now + reset)
+            if status == 429:
+                self.stats['rate_limited_responses'] += 1
+                self.tokens = 0.0
+                retry_after = safe_int_convert(headers.get('retry-after'), 10)
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            self._cond.notify_all()
+            
+    def queue_length(self):
+        with self._cond:
+            return len(self._queue)
 
-api_cache = APICache()
+rate_limiter = RateLimiter(API_RATE_LIMIT_PER_MINUTE)
 
-def make_api_request(endpoint, params=""):
-    # Créer une clé de cache unique
-    cache_key = f"{endpoint}?{params}"
+metrics.histogram('prono_rate_limiter_wait_seconds', "Attente d'un jeton du limiteur avant un appel à l'API, par priorité",
+                  buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+
+# Échecs consécutifs (erreur réseau, délai dépassé, réponse 5xx) qui ouvrent le disjoncteur d'un endpoint
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))
+# Durée (en secondes) pendant laquelle un disjoncteur ouvert refuse les appels avant d'en laisser passer un à l'essai
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', '30'))
+
+class CircuitBreaker:
+    """Disjoncteur d'un endpoint : après des échecs consécutifs, les appels échouent immédiatement.
+
+    Passé CIRCUIT_RESET_TIMEOUT, un seul appel d'essai est autorisé : il referme le disjoncteur s'il réussit,
+    le rouvre sinon."""
+    def __init__(self, threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.probing = True
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def cancel(self):
+        """L'appel autorisé n'a pas eu lieu (jeton refusé, échéance passée) : l'essai reste à faire"""
+        with self._lock:
+            self.probing = False
+
+    def record(self, success):
+        with self._lock:
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                self.probing = False
+                return
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+                if self.opened_at is None:
+                    self.stats['opened'] += 1
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+circuit_breakers = {}
+circuit_breakers_lock = threading.Lock()
+
+def circuit_breaker(endpoint):
+    with circuit_breakers_lock:
+        breaker = circuit_breakers.get(endpoint)
+        if breaker is None:
+            breaker = circuit_breakers[endpoint] = CircuitBreaker()
+        return breaker
+
+# Champs conservés pour chaque endpoint avant la mise en cache (True = valeur gardée telle quelle)
+TEAM_FIELDS = {'id': True, 'name': True, 'logo': True, 'winner': True}
+FIXTURE_FIELDS = {
+    'fixture': {'id': True, 'date': True, 'timestamp': True, 'status': True},
+    'league': {'id': True, 'name': True, 'logo': True, 'country': True, 'season': True, 'round': True},
+    'teams': {'home': TEAM_FIELDS, 'away': TEAM_FIELDS},
+    'goals': True,
+    'score': True
+}
+TEAM_STATISTICS_FIELDS = {
+    'team': True,
+    'league': {'id': True, 'name': True, 'season': True},
+    'form': True,
+    'fixtures': {'played': True},
+    'goals': {
+        'for': {'total': True, 'average': True},
+        'against': {'total': True, 'average': True}
+    }
+}
+# Entrée de process_prediction_data : 'predictions' et 'comparison' restent complets
+PREDICTION_FIELDS = {
+    'predictions': True,
+    'comparison': True,
+    'league': {'id': True, 'name': True, 'logo': True, 'season': True},
+    'teams': {'home': TEAM_FIELDS, 'away': TEAM_FIELDS}
+}
+API_PROJECTIONS = {
+    'fixtures': FIXTURE_FIELDS,
+    'fixtures/headtohead': FIXTURE_FIELDS,
+    'predictions': PREDICTION_FIELDS,
+    'teams/statistics': TEAM_STATISTICS_FIELDS,
+    'teams': {'team': {'id': True, 'name': True, 'logo': True, 'country': True}},
+    'leagues': {'league': {'id': True, 'name': True}, 'seasons': {'year': True, 'current': True}}
+}
+projection_stats = {}
+projection_stats_lock = threading.Lock()
+
+def project(value, fields):
+    """Ne conserve de value que les champs décrits par fields (appliqué à chaque élément d'une liste)"""
+    if fields is True:
+        return value
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: project(value[key], sub_fields) for key, sub_fields in fields.items() if key in value}
+
+def is_tracked_fixture(match):
+    return safe_get(match, 'league', 'id') in LEAGUES
+
+def response_filter(endpoint, params):
+    """Prédicat appliqué à chaque élément de 'response' dès sa lecture, ou None pour tout garder"""
+    # La liste du jour et le direct contiennent tous les matchs du monde : seules les ligues suivies sont utilisées
+    if endpoint == 'fixtures' and parse_qs(params).keys() & {'date', 'live'}:
+        return is_tracked_fixture
+    return None
+
+class JSONStream:
+    """Décode un objet JSON reçu par morceaux ; le tableau 'response' est lu élément par élément"""
+    decoder = json.JSONDecoder()
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Ajoute le morceau suivant au tampon (déjà lu : oublié) ; False en fin de flux"""
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self._utf8.decode(b'', final=True)
+        else:
+            text = self._utf8.decode(chunk)
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Premier caractère significatif suivant ('' en fin de flux)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu en position {self.pos}")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Valeur coupée en fin de tampon : relire avec le morceau suivant
+                if not self._fill():
+                    raise
+                continue
+            # Un nombre qui atteint la fin du tampon peut se poursuivre dans le morceau suivant : '1.' ou '1e'
+            # sont décodés comme 1, sans erreur
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and self._number_cut(end) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _number_cut(self, end):
+        """Vrai si les caractères qui suivent le nombre décodé jusqu'à end vont jusqu'à la fin du tampon"""
+        while end < len(self.buffer) and self.buffer[end] in '0123456789.eE+-':
+            end += 1
+        return end == len(self.buffer)
+
+    def _items(self, keep):
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            item = self._value()
+            if keep is None or keep(item):
+                yield item
+            if self._peek() != ',':
+                self._expect(']')
+                return
+            self.pos += 1
+
+    def parse(self, keep=None):
+        """Retourne l'objet de premier niveau ; seuls les éléments de 'response' acceptés par keep sont conservés"""
+        data = {}
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return data
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'response' and self._peek() == '[':
+                self.pos += 1
+                data[key] = list(self._items(keep))
+            else:
+                data[key] = self._value()
+            if self._peek() != ',':
+                self._expect('}')
+                return data
+            self.pos += 1
+
+def apply_projection(endpoint, params, data, raw_size):
+    """Réduit une réponse de l'API aux champs utilisés par les routes et les templates"""
+    fields = API_PROJECTIONS.get(endpoint)
+    if fields is None or not isinstance(data, dict):
+        return data
+    response = data.get('response')
+    keep = response_filter(endpoint, params)
+    # Déjà filtrée si la réponse a été lue en flux ; le client asyncio lit encore le corps en entier
+    if keep is not None and isinstance(response, list):
+        response = [match for match in response if keep(match)]
+    projected = {key: data[key] for key in ('results', 'paging') if key in data}
+    projected['response'] = project(response, fields)
+    
+    stored_size = len(json.dumps(projected, separators=(',', ':')))
+    with projection_stats_lock:
+        stats = projection_stats.setdefault(endpoint, {'responses': 0, 'raw_bytes': 0, 'stored_bytes': 0})
+        stats['responses'] += 1
+        stats['raw_bytes'] += raw_size
+        stats['stored_bytes'] += stored_size
+    return projected
+
+API_HEADERS = {
+    'x-rapidapi-key': API_KEY,
+    'x-rapidapi-host': API_HOST
+}
+
+metrics.histogram('prono_upstream_request_duration_seconds', "Durée des appels à l'API par endpoint")
+metrics.counter('prono_upstream_responses_total',
+                "Réponses de l'API par endpoint et statut (error : échec réseau, timeout : délai dépassé, "
+                "rejected : quota local, deadline : échéance de la page passée, circuit_open : disjoncteur ouvert)")
+
+def record_upstream(endpoint, status, started=None):
+    metrics.inc('prono_upstream_responses_total', {'endpoint': endpoint, 'status': status})
+    if started is not None:
+        metrics.observe('prono_upstream_request_duration_seconds', time.perf_counter() - started, {'endpoint': endpoint})
+
+def rate_limit_wait(priority):
+    """Attente maximale d'un jeton : selon la priorité, sans dépasser l'échéance de la requête en cours"""
+    return deadline_remaining(RATE_LIMIT_MAX_WAIT.get(priority, RATE_LIMIT_MAX_WAIT[PRIORITY_BACKGROUND]))
+
+def acquire_upstream_token(url, priority, max_wait=None):
+    """Attend un jeton du limiteur selon la priorité ; retourne False (et journalise) si le délai est dépassé"""
+    if max_wait is None:
+        max_wait = rate_limit_wait(priority)
+    if rate_limiter.acquire(priority, max(max_wait, 0)):
+        return True
+    logger.warning("Quota API atteint, requête abandonnée: %s", url)
+    return False
+
+def parse_upstream_response(endpoint, params, res):
+    """Met à jour le limiteur puis décode et projette le corps ; None si le statut n'est pas 200"""
+    rate_limiter.update(res.status, res.headers)
     
-    # Vérifier le cache
-    cached_data = api_cache.get(cache_key)
-    if cached_data:
-        return cached_data
+    if res.status != 200:
+        logger.warning("API Error Response: %s (%s)", res.status, endpoint)
+        return None
     
-    # Si pas en cache, faire l'appel API
-    conn = http.client.HTTPSConnection('api-football-v1.p.rapidapi.com')
-    headers = {
-        'x-rapidapi-key': API_KEY,
-        'x-rapidapi-host': 'api-football-v1.p.rapidapi.com'
-    }
+    if res.data is not None:
+        return apply_projection(endpoint, params, res.data, res.size)
+    return apply_projection(endpoint, params, json.loads(res.body.decode('utf-8')), len(res.body))
+
+def upstream_timeouts(endpoint):
+    """Délais (connexion, lecture) de l'endpoint réduits au temps restant de la requête ; None si l'échéance est passée"""
+    connect_timeout, read_timeout = API_TIMEOUTS.get(endpoint, (API_CONNECT_TIMEOUT, API_READ_TIMEOUT))
+    remaining = deadline_remaining(max(connect_timeout, read_timeout))
+    if remaining <= 0:
+        return None
+    return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+def upstream_failure_status(error):
+    return 'timeout' if isinstance(error, (socket.timeout, asyncio.TimeoutError)) else 'error'
+
+def fetch_api_response(endpoint, params=""):
+    """Appelle l'API via le pool de connexions, sans cache ; None en cas d'erreur, d'échéance passée ou de disjoncteur ouvert"""
+    started = None
+    breaker = circuit_breaker(endpoint)
     try:
         url = f"/v3/{endpoint}?{params}"
-        print(f"\nAPI Request URL: {url}")
-        
-        conn.request("GET", url, headers=headers)
-        res = conn.getresponse()
-        data = res.read()
+        if upstream_timeouts(endpoint) is None:
+            record_upstream(endpoint, 'deadline')
+            return None
+        if not breaker.allow():
+            record_upstream(endpoint, 'circuit_open')
+            return None
+        if not acquire_upstream_token(url, upstream_priority.get()):
+            breaker.cancel()
+            record_upstream(endpoint, 'rejected')
+            return None
+        # Recalculés après l'attente du jeton
+        timeouts = upstream_timeouts(endpoint)
+        if timeouts is None:
+            breaker.cancel()
+            record_upstream(endpoint, 'deadline')
+            return None
+        logger.debug("API Request URL: %s", url)
         
-        if res.status != 200:
-            print(f"API Error Response: {res.status}")
+        # Les grandes listes sont décodées en flux et filtrées élément par élément
+        keep = response_filter(endpoint, params)
+        stream = (lambda chunks: JSONStream(chunks).parse(keep)) if keep is not None else None
+        started = time.perf_counter()
+        res = api_pool.request("GET", url, API_HEADERS, stream, timeouts)
+        record_upstream(endpoint, res.status, started)
+        breaker.record(res.status < 500)
+        # Appel déjà compté : une erreur de décodage du corps ne l'est pas une seconde fois
+        started = None
+        return parse_upstream_response(endpoint, params, res)
+    except Exception as e:
+        logger.error("API Request Error: %s", e)
+        if started is not None:
+            record_upstream(endpoint, upstream_failure_status(e), started)
+            breaker.record(False)
+        return None
+
+# Nombre de threads dédiés aux rafraîchissements en arrière-plan des entrées périmées
+CACHE_REFRESH_WORKERS = int(os.environ.get('CACHE_REFRESH_WORKERS', '2'))
+
+# Executor séparé d'api_executor : un rafraîchissement peut lui-même y soumettre des appels
+refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix='refresh')
+refreshing_keys = set()
+refreshing_lock = threading.Lock()
+refresh_stats = {'scheduled': 0, 'failed': 0}
+
+# Vrai pendant un rafraîchissement : les entrées périmées lues sont rechargées au lieu d'être servies
+revalidating = contextvars.ContextVar('revalidating', default=False)
+# Clés servies depuis une réponse expirée pendant la requête en cours (liste partagée avec ses appels parallèles)
+served_stale = contextvars.ContextVar('served_stale', default=None)
+
+metrics.counter('prono_stale_fallbacks_total', "Réponses expirées servies faute de réponse de l'API, par classe de cache")
+
+def stale_fallback(cache_key):
+    """Dernière réponse valide connue (même expirée), marquée _stale, quand le chargement a échoué ; None sinon"""
+    data = api_cache.last_good(cache_key)
+    if not data:
+        return None
+    metrics.inc('prono_stale_fallbacks_total', {'class': cache_policy(cache_key, data)})
+    logger.warning("API indisponible, dernière réponse connue servie pour %s", cache_key)
+    keys = served_stale.get()
+    if keys is not None:
+        keys.append(cache_key)
+    return dict(data, _stale=True) if isinstance(data, dict) else data
+
+def serving_stale():
+    return bool(served_stale.get())
+
+def load_and_cache(cache_key, loader):
+    """Charge la valeur et l'enregistre ; retourne (données, périmée).
+
+    Une valeur construite à partir d'une réponse expirée (servie par stale_fallback pendant le chargement)
+    n'est pas enregistrée : elle passerait pour fraîche une fois l'API rétablie."""
+    keys = served_stale.get()
+    seen = len(keys) if keys is not None else 0
+    data = loader()
+    stale = keys is not None and len(keys) > seen
+    if data and not stale:
+        api_cache.set(cache_key, data)
+    return data, stale
+
+def refresh_in_background(cache_key, loader):
+    """Lance un unique rafraîchissement en arrière-plan pour cette clé"""
+    with refreshing_lock:
+        if cache_key in refreshing_keys:
+            return
+        refreshing_keys.add(cache_key)
+        refresh_stats['scheduled'] += 1
+    
+    def refresh():
+        revalidating.set(True)
+        upstream_priority.set(PRIORITY_BACKGROUND)
+        try:
+            api_single_flight.do(cache_key, lambda: load_and_cache(cache_key, loader), SINGLE_FLIGHT_TIMEOUT)
+        except Exception as e:
+            logger.error("Erreur lors du rafraîchissement de %s: %s", cache_key, e)
+            refresh_stats['failed'] += 1
+        finally:
+            with refreshing_lock:
+                refreshing_keys.discard(cache_key)
+    
+    refresh_executor.submit(contextvars.Context().run, refresh)
+
+def get_or_revalidate(cache_key, loader):
+    """Retourne la valeur en cache ou la charge ; une entrée périmée est servie immédiatement et rafraîchie en arrière-plan"""
+    data, fresh = api_cache.lookup(cache_key)
+    if data and (fresh or not revalidating.get()):
+        if not fresh:
+            refresh_in_background(cache_key, loader)
+        return data
+    
+    # Si pas en cache, un seul chargement par clé : les appels concurrents attendent son résultat
+    data, stale = api_single_flight.do(cache_key, lambda: load_and_cache(cache_key, loader),
+                                       max(deadline_remaining(SINGLE_FLIGHT_TIMEOUT), 0)) or (None, False)
+    if stale:
+        # Les appels regroupés sur ce chargement reçoivent aussi des données expirées
+        keys = served_stale.get()
+        if keys is not None:
+            keys.append(cache_key)
+    # Un visiteur reçoit plutôt la dernière réponse connue qu'une page vide ; le travail de fond ne la recopie pas
+    if not data and not revalidating.get():
+        return stale_fallback(cache_key) or data
+    return data
+
+def make_api_request(endpoint, params=""):
+    # Créer une clé de cache unique
+    cache_key = f"{endpoint}?{params}"
+    return get_or_revalidate(cache_key, lambda: fetch_api_response(endpoint, params))
+
+# Client asyncio : les appels lancés en parallèle par une page sont portés par une boucle d'événements
+# dédiée (un thread par worker) au lieu d'occuper chacun un thread d'api_executor
+ASYNC_API = os.environ.get('ASYNC_API', '0') == '1'
+# Délai maximal (en secondes) d'un appel à l'API via le client asyncio
+ASYNC_API_TIMEOUT = float(os.environ.get('ASYNC_API_TIMEOUT', '30'))
+
+class AsyncAPIClient:
+    """Boucle asyncio dans un thread dédié, avec son pool de connexions HTTPS keep-alive et son single-flight"""
+    def __init__(self, host, size, idle_timeout, port=443):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl.create_default_context()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self.stats = {'created': 0, 'reused': 0, 'expired': 0, 'calls': 0, 'coalesced': 0, 'timeouts': 0}
+
+    def _ensure_loop(self):
+        with self._lock:
+            # Après un fork, le thread de la boucle n'existe plus : on en démarre un nouveau
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle = []  # (reader, writer, date de dernière utilisation)
+                self._slots = None
+                self._flights = {}
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='api-loop', daemon=True).start()
+            return self._loop
+
+    def submit(self, coro_fn, *args):
+        """Planifie coro_fn(*args) sur la boucle dans le contexte de l'appelant ; retourne un concurrent.futures.Future"""
+        loop = self._ensure_loop()
+        future = Future()
+
+        def copy_result(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def start():
+            # La tâche copie le contexte courant, c'est-à-dire celui de l'appelant
+            loop.create_task(coro_fn(*args)).add_done_callback(copy_result)
+
+        loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+        return future
+
+    def run(self, coro_fn, *args):
+        """Version bloquante de submit pour le code synchrone"""
+        return self.submit(coro_fn, *args).result()
+
+    async def coalesce(self, key, coro_fn, timeout):
+        """Single-flight côté boucle : les appels concurrents sur la même clé attendent la même tâche"""
+        task = self._flights.get(key)
+        if task is None:
+            task = self._flights[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+            self.stats['calls'] += 1
+        else:
+            self.stats['coalesced'] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            return None
+
+    async def _connect(self):
+        now = time.time()
+        while self._idle:
+            reader, writer, last_used = self._idle.pop()
+            if now - last_used < self.idle_timeout and not reader.at_eof():
+                self.stats['reused'] += 1
+                return reader, writer, True
+            writer.close()
+            self.stats['expired'] += 1
+        self.stats['created'] += 1
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl_context,
+            server_hostname=self.host if self.ssl_context else None)
+        return reader, writer, False
+
+    async def _exchange(self, reader, writer, method, url, headers):
+        lines = [f"{method} {url} HTTP/1.1", f"Host: {self.host}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connexion fermée par le serveur")
+        version, status = status_line.split(None, 2)[:2]
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            body = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            body = await reader.read()
+            response_headers['connection'] = 'close'
+
+        will_close = version == b'HTTP/1.0' or response_headers.get('connection', '').lower() == 'close'
+        return int(status), response_headers, body, will_close
+
+    async def request(self, method, url, headers):
+        """Équivalent asynchrone de HTTPConnectionPool.request"""
+        headers = dict(headers, **{'Accept-Encoding': 'gzip'})
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            for attempt in range(2):
+                reader, writer, reused = await self._connect()
+                try:
+                    status, response_headers, body, will_close = await self._exchange(reader, writer, method, url, headers)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    # Le serveur a pu fermer une connexion inactive : on réessaie une fois
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    # Y compris l'annulation par wait_for : la connexion est dans un état inconnu
+                    writer.close()
+                    raise
+
+                if will_close or len(self._idle) >= self.size:
+                    writer.close()
+                else:
+                    self._idle.append((reader, writer, time.time()))
+
+                if response_headers.get('content-encoding', '').lower() == 'gzip':
+                    body = gzip.decompress(body)
+                return UpstreamResponse(status, response_headers, body)
+
+async_client = AsyncAPIClient(API_HOST, API_POOL_SIZE, API_POOL_IDLE_TIMEOUT)
+
+async def fetch_api_response_async(endpoint, params=""):
+    """Équivalent asynchrone de fetch_api_response"""
+    started = None
+    breaker = circuit_breaker(endpoint)
+    try:
+        url = f"/v3/{endpoint}?{params}"
+        if upstream_timeouts(endpoint) is None:
+            record_upstream(endpoint, 'deadline')
+            return None
+        if not breaker.allow():
+            record_upstream(endpoint, 'circuit_open')
             return None
+        # L'attente d'un jeton est bloquante : elle se fait hors de la boucle (et hors du contexte de l'appelant)
+        priority = upstream_priority.get()
+        loop = asyncio.get_event_loop()
+        if not await loop.run_in_executor(None, acquire_upstream_token, url, priority, rate_limit_wait(priority)):
+            breaker.cancel()
+            record_upstream(endpoint, 'rejected')
+            return None
+        timeouts = upstream_timeouts(endpoint)
+        if timeouts is None:
+            breaker.cancel()
+            record_upstream(endpoint, 'deadline')
+            return None
+        logger.debug("API Request URL: %s", url)
+
+        started = time.perf_counter()
+        res = await asyncio.wait_for(async_client.request("GET", url, API_HEADERS), min(ASYNC_API_TIMEOUT, sum(timeouts)))
+        record_upstream(endpoint, res.status, started)
+        breaker.record(res.status < 500)
+        # Appel déjà compté : une erreur de décodage du corps ne l'est pas une seconde fois
+        started = None
+        return parse_upstream_response(endpoint, params, res)
+    except Exception as e:
+        logger.error("API Request Error: %s", e)
+        if started is not None:
+            record_upstream(endpoint, upstream_failure_status(e), started)
+            breaker.record(False)
+        return None
+
+async def run_blocking(fn, *args):
+    """Exécute fn(*args) dans le pool par défaut, avec le contexte courant : le cache L2 (SQLite) ne bloque pas la boucle"""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, contextvars.copy_context().run, fn, *args)
+
+async def make_api_request_async(endpoint, params=""):
+    """Équivalent asynchrone de make_api_request : mêmes clés de cache, même revalidation, None en cas d'erreur"""
+    cache_key = f"{endpoint}?{params}"
+    data, fresh = await run_blocking(api_cache.lookup, cache_key)
+    if data and (fresh or not revalidating.get()):
+        if not fresh:
+            refresh_in_background(cache_key, lambda: fetch_api_response(endpoint, params))
+        return data
+
+    loop = asyncio.get_event_loop()
+    timeout = max(deadline_remaining(SINGLE_FLIGHT_TIMEOUT), 0)
+
+    async def load():
+        # Même registre que make_api_request : un chargement synchrone en cours sur la clé est attendu, hors de la boucle,
+        # et les appels synchrones qui arrivent pendant ce chargement l'attendent à leur tour
+        call, leader = api_single_flight.begin(cache_key)
+        if not leader:
+            return await loop.run_in_executor(None, api_single_flight.wait, call, timeout)
+        result = None
+        try:
+            data = await fetch_api_response_async(endpoint, params)
+            if data:
+                await run_blocking(api_cache.set, cache_key, data)
+            result = (data, False)
+            return result
+        finally:
+            api_single_flight.finish(cache_key, call, result)
+
+    # Les appels asynchrones concurrents se regroupent d'abord sur la boucle : une seule inscription par clé
+    data, stale = await async_client.coalesce(cache_key, load, timeout) or (None, False)
+    if stale:
+        keys = served_stale.get()
+        if keys is not None:
+            keys.append(cache_key)
+    if not data and not revalidating.get():
+        return await run_blocking(stale_fallback, cache_key) or data
+    return data
+
+def submit_api_request(endpoint, params=""):
+    """Lance make_api_request sans attendre son résultat : sur la boucle asyncio si ASYNC_API, sinon dans api_executor"""
+    if ASYNC_API:
+        return async_client.submit(make_api_request_async, endpoint, params)
+    return submit_with_context(api_executor, make_api_request, endpoint, params)
+
+# Statuts courts des matchs renvoyés par l'API
+LIVE_STATUSES = {'1H', 'HT', '2H', 'ET', 'BT', 'P', 'SUSP', 'INT', 'LIVE'}
+FINISHED_STATUSES = {'FT', 'AET', 'PEN', 'AWD', 'WO', 'CANC', 'ABD'}
+# Durée de vie (en secondes) des résultats par match selon son état
+FIXTURE_CACHE_TTL = {
+    'live': int(os.environ.get('FIXTURE_CACHE_TTL_LIVE', '60')),
+    'scheduled': int(os.environ.get('FIXTURE_CACHE_TTL_SCHEDULED', '1800')),
+    'finished': int(os.environ.get('FIXTURE_CACHE_TTL_FINISHED', '86400')),
+    'unknown': int(os.environ.get('FIXTURE_CACHE_TTL_UNKNOWN', '600'))
+}
+# Durée de vie (en secondes) d'un échec (résultat vide ou None)
+FIXTURE_CACHE_NEGATIVE_TTL = int(os.environ.get('FIXTURE_CACHE_NEGATIVE_TTL', '60'))
+FIXTURE_CACHE_SIZE = int(os.environ.get('FIXTURE_CACHE_SIZE', '512'))
+# Durée (en secondes) après le coup d'envoi pendant laquelle un match non mis à jour est considéré en cours
+MATCH_DURATION = 3 * 3600
+
+def normalize_fixture_id(fixture_id):
+    """Même clé pour un id reçu en chaîne (formulaire) ou en entier"""
+    try:
+        return int(str(fixture_id).strip())
+    except (TypeError, ValueError):
+        return fixture_id
+
+def fixture_state(fixture_id, result=None):
+    """État d'un match ('live', 'scheduled', 'finished' ou 'unknown') d'après le résultat ou le calendrier local"""
+    match = None
+    response = result.get('response') if isinstance(result, dict) else None
+    if isinstance(response, list) and response and 'fixture' in response[0]:
+        match = response[0]
+    if match is None:
+        match = fixture_calendar.get(fixture_id)
+    if match is None:
+        return 'unknown'
+    
+    status = match['fixture']['status']['short']
+    if status in LIVE_STATUSES:
+        return 'live'
+    if status in FINISHED_STATUSES:
+        return 'finished'
+    # Le calendrier n'est pas mis à jour en direct : un match dont le coup d'envoi est passé est supposé en cours
+    kickoff = match['fixture'].get('timestamp') or 0
+    if kickoff <= time.time() < kickoff + MATCH_DURATION:
+        return 'live'
+    return 'scheduled'
+
+def is_empty_result(result):
+    return result is None or (isinstance(result, dict) and 'response' in result and not result['response'])
+
+fixture_caches = {}
+
+def fixture_cache(maxsize=FIXTURE_CACHE_SIZE, negative_ttl=FIXTURE_CACHE_NEGATIVE_TTL):
+    """Cache LRU par match dont la durée de vie dépend du statut du match ; les échecs expirent rapidement"""
+    def decorator(func):
+        entries = OrderedDict()  # id normalisé -> (résultat, expiration, entrées du cache API lues)
+        lock = threading.Lock()
+        stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+        
+        @wraps(func)
+        def wrapper(fixture_id):
+            key = normalize_fixture_id(fixture_id)
+            now = time.time()
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and entry[1] > now:
+                    entries.move_to_end(key)
+                    stats['negative_hits' if is_empty_result(entry[0]) else 'hits'] += 1
+                    # La page qui réutilise ce résultat dépend des mêmes entrées du cache API
+                    record_reads(entry[2])
+                    return entry[0]
+                if entry is not None:
+                    del entries[key]
+                    stats['expired'] += 1
+                stats['misses'] += 1
             
-        response_data = json.loads(data.decode('utf-8'))
+            # Seules les réponses expirées servies pendant cet appel comptent, pas celles du reste de la requête
+            stale_keys = served_stale.get()
+            seen = len(stale_keys) if stale_keys is not None else 0
+            with tracking_reads() as reads:
+                result = func(key)
+            # Un résultat construit à partir d'une réponse expirée est redemandé aussi vite qu'un échec
+            if is_empty_result(result) or (stale_keys is not None and len(stale_keys) > seen):
+                ttl = negative_ttl
+            else:
+                ttl = FIXTURE_CACHE_TTL[fixture_state(key, result)]
+            with lock:
+                entries[key] = (result, now + ttl, dict(reads))
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+                    stats['evictions'] += 1
+            return result
         
-        # Mettre en cache
-        api_cache.set(cache_key, response_data)
+        def cache_peek(fixture_id):
+            """Retourne (trouvé, résultat) sans appeler la fonction"""
+            with lock:
+                entry = entries.get(normalize_fixture_id(fixture_id))
+            if entry is not None and entry[1] > time.time():
+                record_reads(entry[2])
+                return True, entry[0]
+            return False, None
         
-        return response_data
-    except Exception as e:
-        print(f"API Request Error: {str(e)}")
-        return None
-    finally:
-        conn.close()
+        def cache_invalidate(fixture_id):
+            with lock:
+                entries.pop(normalize_fixture_id(fixture_id), None)
+        
+        def cache_clear():
+            with lock:
+                entries.clear()
+        
+        def cache_info():
+            with lock:
+                return dict(stats, size=len(entries), maxsize=maxsize)
+        
+        wrapper.cache_peek = cache_peek
+        wrapper.cache_invalidate = cache_invalidate
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = cache_info
+        fixture_caches[func.__name__] = wrapper
+        return wrapper
+    return decorator
 
-@lru_cache(maxsize=32)
+@fixture_cache()
 def get_match_statistics(fixture_id):
-    # Cache au niveau de la fonction avec lru_cache
     return make_api_request('fixtures/statistics', f'fixture={fixture_id}')
 
-@lru_cache(maxsize=32)
+@fixture_cache()
 def get_match_events(fixture_id):
     return make_api_request('fixtures/events', f'fixture={fixture_id}')
 
-@lru_cache(maxsize=32)
+@fixture_cache()
 def get_match_score(fixture_id):
     return make_api_request('fixtures', f'id={fixture_id}')
 
-@lru_cache(maxsize=32)
+@fixture_cache()
 def get_prediction(fixture_id):
     prediction_data = make_api_request('predictions', f'fixture={fixture_id}')
-    if not prediction_data or 'response' not in prediction_data:
+    if not prediction_data or not prediction_data.get('response'):
         return None
         
     return process_prediction_data(prediction_data)
 
+def get_predictions_bulk(fixture_ids):
+    """Récupère les prédictions de plusieurs matchs en parallèle (concurrence bornée par API_CONCURRENCY)"""
+    # Dédoublonner en conservant l'ordre
+    unique_ids = list(dict.fromkeys(fixture_ids))
+    if ASYNC_API:
+        # Réponses brutes chargées ensemble sur la boucle asyncio ; get_prediction les relit ensuite depuis le cache
+        wait([submit_api_request('predictions', f'fixture={fixture_id}')
+              for fixture_id in unique_ids if not get_prediction.cache_peek(fixture_id)[0]])
+        futures = {}
+    else:
+        futures = {fixture_id: submit_with_context(api_executor, get_prediction, fixture_id) for fixture_id in unique_ids}
+    
+    predictions = {}
+    for fixture_id in unique_ids:
+        try:
+            future = futures.get(fixture_id)
+            predictions[fixture_id] = future.result() if future else get_prediction(fixture_id)
+        except Exception as e:
+            logger.error("Erreur lors de la prédiction du match %s: %s", fixture_id, e)
+            predictions[fixture_id] = None
+    return predictions
+
 @app.template_filter('format_time')
 def format_time(date_str):
     """Formate une date au format HH:MM"""
@@ -184,13 +1679,16 @@ def format_time(date_str):
             return dt.strftime('%H:%M')
         return ''
     except Exception as e:
-        print(f"Erreur lors du formatage de la date {date_str}: {e}")
+        logger.warning("Erreur lors du formatage de la date %s: %s", date_str, e)
         return ''
 
 # Gestionnaire d'erreurs global
 @app.errorhandler(Exception)
 def handle_error(e):
-    print(f"Erreur: {str(e)}")
+    # Les erreurs HTTP (404, 405...) gardent leur réponse et ne sont pas journalisées comme des pannes
+    if isinstance(e, HTTPException):
+        return e
+    logger.exception("Erreur: %s", e)
     return "Une erreur s'est produite. Veuillez réessayer plus tard.", 500
 
 def safe_float(value):
@@ -250,15 +1748,17 @@ def clean_numeric_string(value, default='0'):
 
 def check_prediction_accuracy(match, prediction):
     """Vérifie si la prédiction était correcte"""
-    print(f"Vérification de la prédiction pour le match {match['fixture']['id']}")
-    print("Score final:", match.get('score', {}).get('fulltime'))
-    print("Prédiction:", prediction.get('predictions', {}).get('winner'))
+    logger.debug("Vérification de la prédiction pour le match %s (score final %s, prédiction %s)",
+                 match['fixture']['id'], match.get('score', {}).get('fulltime'),
+                 prediction.get('predictions', {}).get('winner'))
     
     if not match.get('score') or not match['score'].get('fulltime'):
         return False
         
     home_score = match['score']['fulltime']['home']
     away_score = match['score']['fulltime']['away']
+    if home_score is None or away_score is None:
+        return False
     
     # Vérifier la prédiction de victoire
     winner_prediction = prediction.get('predictions', {}).get('winner', {})
@@ -274,7 +1774,7 @@ def check_prediction_accuracy(match, prediction):
     else:  # Match nul prédit
         result = home_score == away_score
     
-    print(f"Résultat de la prédiction: {'Correct' if result else 'Incorrect'}")
+    logger.debug("Résultat de la prédiction: %s", 'Correct' if result else 'Incorrect')
     return result
 
 def process_prediction_data(prediction_data):
@@ -290,10 +1790,10 @@ def process_prediction_data(prediction_data):
             under_over = predictions['under_over']
             if under_over:
                 value = abs(float(under_over))
-                prediction = 'over' if float(under_over) > 0 else 'under'
+                direction = 'over' if float(under_over) > 0 else 'under'
                 under_over_predictions.append({
                     'value': value,
-                    'prediction': prediction
+                    'prediction': direction
                 })
         
         # Autres prédictions under/over (0.5, 1.5, 2.5, 3.5, etc.)
@@ -301,11 +1801,11 @@ def process_prediction_data(prediction_data):
             if key.startswith('under_over_'):
                 try:
                     value = float(key.split('_')[-1])
-                    prediction = predictions[key]
-                    if prediction:
+                    direction = predictions[key]
+                    if direction:
                         under_over_predictions.append({
                             'value': value,
-                            'prediction': prediction.lower()
+                            'prediction': direction.lower()
                         })
                 except (ValueError, AttributeError):
                     continue
@@ -338,8 +1838,7 @@ def process_prediction_data(prediction_data):
     winner = prediction['predictions'].get('winner', {})
     winner_name = winner.get('name') if winner else None
     raw_win_or_draw = prediction['predictions'].get('win_or_draw')
-    print("Valeur brute win_or_draw:", raw_win_or_draw)
-    print("Type de win_or_draw:", type(raw_win_or_draw))
+    logger.debug("Valeur brute win_or_draw: %r (%s)", raw_win_or_draw, type(raw_win_or_draw).__name__)
     
     # Convertir win_or_draw en booléen de manière plus flexible
     win_or_draw = False
@@ -387,97 +1886,891 @@ def process_prediction_data(prediction_data):
 
     return predictions
 
-@app.route('/')
-def home():
-    try:
-        # Récupérer la date actuelle
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # Créer une clé de cache unique pour les matchs du jour
-        cache_key = f"matches_{current_date}"
-        cached_matches = api_cache.get(cache_key)
-        
-        if cached_matches:
-            return render_template('index.html', matches=cached_matches, regions=REGIONS)
-        
-        # Si pas en cache, récupérer les matchs
-        matches_data = make_api_request('fixtures', f'date={current_date}')
-        
-        if not matches_data or 'response' not in matches_data:
-            return render_template('index.html', matches=[], regions=REGIONS)
-        
-        matches = []
-        for match in matches_data['response']:
-            # Filtrer uniquement les matchs des ligues qu'on suit
-            league_id = match['league']['id']
-            if league_id not in LEAGUES:
-                continue
-                
-            # Récupérer uniquement les informations nécessaires
-            match_info = {
-                'id': match['fixture']['id'],
-                'timestamp': match['fixture']['timestamp'],
-                'date': match['fixture']['date'],
-                'league': {
-                    'id': league_id,
-                    'name': LEAGUES[league_id],
-                    'logo': match['league']['logo']
-                },
-                'teams': match['teams'],
-                'goals': match['goals'],
-                'status': match['fixture']['status']
-            }
-            
-            # Ne récupérer les prédictions que pour les matchs à venir
-            if match['fixture']['status']['short'] == 'NS':
-                prediction = get_prediction(match['fixture']['id'])
-                if prediction:
-                    match_info['prediction'] = prediction
-            
-            matches.append(match_info)
+# Nombre maximum de buts par équipe modélisé dans les matrices de score
+POISSON_MAX_GOALS = 10
+# Lignes under/over calculées par le modèle (les mêmes que celles extraites par process_prediction_data)
+UNDER_OVER_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+# Prédictions de la page d'accueil calculées localement à partir des statistiques d'équipes
+POISSON_MODEL = os.environ.get('POISSON_MODEL', '0') == '1'
+
+def poisson_scorelines(home_for, home_against, away_for, away_against, max_goals=POISSON_MAX_GOALS):
+    """Calcule en une passe vectorisée les matrices de scores et les marchés (1X2, BTTS, under/over) de N matchs"""
+    home_for, home_against, away_for, away_against = (
+        np.asarray(values, dtype=float) for values in (home_for, home_against, away_for, away_against))
+    
+    # Buts attendus : attaque de chaque équipe combinée à la défense adverse
+    lambda_home = np.maximum((home_for + away_against) / 2, 1e-6)
+    lambda_away = np.maximum((away_for + home_against) / 2, 1e-6)
+    
+    goals = np.arange(max_goals + 1)
+    log_factorials = np.cumsum(np.log(np.maximum(goals, 1)))
+    home_pmf = np.exp(goals * np.log(lambda_home)[:, None] - lambda_home[:, None] - log_factorials)
+    away_pmf = np.exp(goals * np.log(lambda_away)[:, None] - lambda_away[:, None] - log_factorials)
+    
+    # matrix[n, i, j] = probabilité du score i-j pour le match n (renormalisée après troncature)
+    matrix = home_pmf[:, :, None] * away_pmf[:, None, :]
+    matrix /= matrix.sum(axis=(1, 2), keepdims=True)
+    
+    total_goals = goals[:, None] + goals[None, :]
+    return {
+        'lambda_home': lambda_home,
+        'lambda_away': lambda_away,
+        'matrix': matrix,
+        'home': np.tril(matrix, -1).sum(axis=(1, 2)),
+        'draw': np.trace(matrix, axis1=1, axis2=2),
+        'away': np.triu(matrix, 1).sum(axis=(1, 2)),
+        'btts': matrix[:, 1:, 1:].sum(axis=(1, 2)),
+        'over': {line: matrix[:, total_goals > line].sum(axis=1) for line in UNDER_OVER_LINES}
+    }
+
+def goal_averages(stats, venue):
+    """Moyennes de buts marqués et encaissés d'une équipe (à domicile ou à l'extérieur, sinon au total)"""
+    averages = []
+    for side in ('for', 'against'):
+        average = safe_get(stats, 'goals', side, 'average', venue) or safe_get(stats, 'goals', side, 'average', 'total')
+        averages.append(safe_float(average))
+    return averages
+
+def model_predictions(stats_pairs):
+    """Prédictions du modèle de Poisson pour une liste de (stats domicile, stats extérieur) ; None sans statistiques"""
+    usable = [index for index, (home_stats, away_stats) in enumerate(stats_pairs)
+              if has_goal_averages({'response': home_stats}) and has_goal_averages({'response': away_stats})]
+    results = [None] * len(stats_pairs)
+    if not usable:
+        return results
+    
+    home_averages = np.array([goal_averages(stats_pairs[index][0], 'home') for index in usable])
+    away_averages = np.array([goal_averages(stats_pairs[index][1], 'away') for index in usable])
+    model = poisson_scorelines(home_averages[:, 0], home_averages[:, 1], away_averages[:, 0], away_averages[:, 1])
+    
+    for row, index in enumerate(usable):
+        best_score = np.unravel_index(np.argmax(model['matrix'][row]), model['matrix'][row].shape)
+        results[index] = {
+            'percent': {
+                'home': round(float(model['home'][row]) * 100, 1),
+                'draw': round(float(model['draw'][row]) * 100, 1),
+                'away': round(float(model['away'][row]) * 100, 1)
+            },
+            'btts': round(float(model['btts'][row]) * 100, 1),
+            'under_over': [
+                {
+                    'value': line,
+                    'prediction': 'over' if model['over'][line][row] > 0.5 else 'under',
+                    'probability': round(float(max(model['over'][line][row], 1 - model['over'][line][row])) * 100, 1)
+                }
+                for line in UNDER_OVER_LINES
+            ],
+            'goals_home': round(float(model['lambda_home'][row]), 2),
+            'goals_away': round(float(model['lambda_away'][row]), 2),
+            'score': f"{best_score[0]}-{best_score[1]}"
+        }
+    return results
+
+# Durée (en secondes) pendant laquelle une page rendue est réutilisée côté serveur
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+# Durée (en secondes) pendant laquelle le navigateur peut réutiliser une page sans la revalider
+RESPONSE_MAX_AGE = int(os.environ.get('RESPONSE_MAX_AGE', '30'))
+RESPONSE_CACHE_SIZE = 128
+
+class ResponseCache:
+    """Pages HTML rendues et compressées, indexées par route et arguments.
+
+    Chaque page garde la date d'enregistrement des entrées du cache API qu'elle a lues : elle reste valide
+    tant qu'aucune d'elles n'a été réécrite ou invalidée, quelles que soient les autres écritures."""
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'not_modified': 0}
         
-        # Trier les matchs par heure
-        matches.sort(key=lambda x: x['timestamp'])
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry['expires_at'] > time.time():
+                self.entries.move_to_end(key)
+            else:
+                self.entries.pop(key, None)
+                self.stats['misses'] += 1
+                return None
+        # Lu hors du verrou : api_cache a le sien
+        if any(api_cache.stamp(cache_key) != stamp for cache_key, stamp in entry['reads'].items()):
+            with self._lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+                self.stats['misses'] += 1
+                self.stats['invalidations'] += 1
+            return None
+        self.count('hits')
+        return entry
+            
+    def count(self, counter):
+        with self._lock:
+            self.stats[counter] += 1
+            
+    def store(self, key, body, mimetype, reads):
+        entry = {
+            'etag': hashlib.sha256(body).hexdigest(),
+            'body': gzip.compress(body),
+            'mimetype': mimetype,
+            'reads': reads,
+            'expires_at': time.time() + self.ttl
+        }
+        with self._lock:
+            self.entries[key] = entry
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return entry
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+def cached_response(view):
+    """Sert la page depuis le cache de réponses, avec ETag fort et réponse 304 sans rendu ni appel à l'API"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        route_key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        entry = response_cache.get(route_key)
+        if entry is None:
+            with tracking_reads() as reads:
+                response = make_response(view(*args, **kwargs))
+            if (response.status_code != 200 or response.mimetype != 'text/html'
+                    or g.get('skip_response_cache') or serving_stale()):
+                return response
+            # Copie : un appel parallèle encore en cours pourrait compléter le dictionnaire
+            entry = response_cache.store(route_key, response.get_data(), response.mimetype, dict(reads))
         
-        # Mettre en cache pour 30 minutes
-        api_cache.set(cache_key, matches)
+        # Chaque représentation (compressée ou non) a son propre ETag fort
+        use_gzip = 'gzip' in request.accept_encodings
+        etag = entry['etag'] + ('-gzip' if use_gzip else '')
+        if request.if_none_match.contains(etag):
+            response_cache.count('not_modified')
+            response = make_response('', 304)
+        else:
+            body = entry['body'] if use_gzip else gzip.decompress(entry['body'])
+            response = make_response(body)
+            response.mimetype = entry['mimetype']
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f"public, max-age={RESPONSE_MAX_AGE}, must-revalidate"
+        response.vary.add('Accept-Encoding')
+        return response
+    return wrapper
+
+# Nombre de fragments HTML (cartes de match, blocs de prédiction) conservés en mémoire
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '2048'))
+
+def content_digest(context):
+    """Empreinte des données passées à un fragment : elle change dès que le score ou la prédiction change"""
+    payload = json.dumps(context, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+class FragmentCache:
+    """Fragments HTML rendus, par template et id de match, réutilisés tant que l'empreinte des données est identique"""
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def render(self, template_name, key, context):
+        digest = content_digest(context)
+        cache_key = (template_name, key)
+        with self._lock:
+            entry = self.entries.get(cache_key)
+            if entry is not None and entry[0] == digest:
+                self.entries.move_to_end(cache_key)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+            if entry is not None:
+                self.stats['invalidations'] += 1
+
+        html = Markup(render_template(template_name, **context))
+        with self._lock:
+            self.entries[cache_key] = (digest, html)
+            self.entries.move_to_end(cache_key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return html
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_SIZE)
+
+@app.template_global('render_fragment')
+def render_fragment(template_name, key, **context):
+    return fragment_cache.render(template_name, key, context)
+
+metrics.histogram('prono_request_duration_seconds', "Durée totale des requêtes par route")
+metrics.histogram('prono_request_phase_seconds',
+                  "Durée des requêtes par route et phase (fetch : données, process : traitement, render : templates)")
+metrics.counter('prono_requests_total', "Requêtes par route et statut HTTP")
+
+@contextmanager
+def request_phase(name):
+    """Compte le temps passé dans le bloc pour la phase name de la requête en cours"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = g.setdefault('timings', {})
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+def render_page(template_name, **context):
+    """render_template, avec le temps de rendu compté pour la requête en cours"""
+    with request_phase('render'):
+        return render_template(template_name, **context)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Positionnés dans le contexte du thread de la requête, recopié dans ses appels parallèles
+    request_deadline.set(time.monotonic() + REQUEST_DEADLINE)
+    served_stale.set([])
+
+@app.after_request
+def flag_stale_response(response):
+    """Signale une réponse construite à partir de données expirées, faute de réponse de l'API"""
+    if serving_stale():
+        response.headers['Warning'] = '110 - "Response is Stale"'
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.after_request
+def record_request_timings(response):
+    started = g.get('request_started')
+    if started is None or request.endpoint is None:
+        return response
+    total = time.perf_counter() - started
+    timings = g.get('timings', {})
+    phases = {
+        'fetch': timings.get('fetch', 0.0),
+        'render': timings.get('render', 0.0)
+    }
+    # Tout ce qui n'est ni récupération de données ni rendu : traitement
+    phases['process'] = max(total - phases['fetch'] - phases['render'], 0.0)
+    
+    route = {'route': request.endpoint}
+    metrics.inc('prono_requests_total', dict(route, status=response.status_code))
+    metrics.observe('prono_request_duration_seconds', total, route)
+    for phase, duration in phases.items():
+        metrics.observe('prono_request_phase_seconds', duration, dict(route, phase=phase))
+    response.headers['Server-Timing'] = ', '.join(f"{phase};dur={duration * 1000:.1f}" for phase, duration in phases.items())
+    return response
+
+def group_matches_by_league(matches):
+    """Regroupe les matchs par jour puis par ligue pour le template index.html"""
+    matches_by_league = {}
+    for match in matches:
+        day = match['date'].split('T')[0]
+        league_name = match['league']['name']
+        matches_by_league.setdefault(day, {}).setdefault(league_name, []).append(match)
+    return matches_by_league
+
+def filter_matches(matches, region, category=None, league_id=None):
+    """Matchs des ligues d'une région, éventuellement limités à une catégorie ou à une ligue"""
+    if region not in REGIONS:
+        return matches
+    categories = REGIONS[region]['categories']
+    if category in categories:
+        categories = {category: categories[category]}
+    league_ids = {league['id'] for cat in categories.values() for league in cat['leagues'].values()}
+    if league_id is not None:
+        league_ids &= {league_id}
+    return [match for match in matches if match['league']['id'] in league_ids]
+
+def watches_live(matches, now=None):
+    """Vrai si la page montre un match en cours ou sur le point de commencer : elle suit alors le direct"""
+    now = now or time.time()
+    for match in matches:
+        status = match['status']['short']
+        if status in LIVE_STATUSES:
+            return True
+        # Statut pas encore mis à jour : un match non commencé dont le coup d'envoi est proche ou passé
+        if status == 'NS' and match['timestamp'] - LIVE_WATCH_LEAD <= now < match['timestamp'] + MATCH_DURATION:
+            return True
+    return False
+
+def render_home(matches, selected_region='all', selected_category=None):
+    return render_page('index.html',
+                       matches=matches,
+                       matches_by_league=group_matches_by_league(matches),
+                       regions=REGIONS,
+                       selected_region=selected_region,
+                       selected_category=selected_category,
+                       predictions_batch=PREDICTIONS_BATCH_MAX,
+                       live_watch=watches_live(matches),
+                       live_poll_interval=LIVE_POLL_INTERVAL)
+
+def attach_model_predictions(matches):
+    """Ajoute à chaque match la prédiction du modèle de Poisson, calculée en une passe pour toute la liste"""
+    params_by_match = []
+    futures = {}
+    for match in matches:
+        league_id = match['league']['id']
+        season = current_season(league_id, match['league'].get('season'))
+        pair = []
+        for side in ('home', 'away'):
+            team_id = match['teams'][side]['id']
+            params = team_statistics_params(team_id, league_id, stats_season(team_id, league_id, season))
+            if params not in futures:
+                futures[params] = submit_api_request("teams/statistics", params)
+            pair.append(params)
+        params_by_match.append(pair)
+    
+    stats_pairs = [
+        tuple((futures[params].result() or {}).get('response') for params in pair)
+        for pair in params_by_match
+    ]
+    for match, model in zip(matches, model_predictions(stats_pairs)):
+        if model:
+            match['model'] = model
+
+# Intervalle (en secondes) entre deux relectures complètes de fixtures?date= ; entre-temps, seules les évolutions
+# des matchs (direct et passages à FT) sont fusionnées dans la liste du jour
+DAILY_BUNDLE_FULL_REFRESH = int(os.environ.get('DAILY_BUNDLE_FULL_REFRESH', '21600'))
+# Nombre de journées gardées en mémoire par worker
+DAILY_BUNDLES_KEPT = 3
+# Nombre maximal d'ids par appel fixtures?ids=
+FIXTURES_IDS_BATCH = 20
+
+def match_summary(match):
+    """Informations d'un match de l'API utilisées par la page d'accueil"""
+    league_id = match['league']['id']
+    return {
+        'id': match['fixture']['id'],
+        'timestamp': match['fixture']['timestamp'],
+        'date': match['fixture']['date'],
+        'league': {
+            'id': league_id,
+            'name': LEAGUES[league_id],
+            'logo': match['league']['logo']
+        },
+        'fixture': {
+            'id': match['fixture']['id'],
+            'date': match['fixture']['date'],
+            'status': match['fixture']['status']
+        },
+        'teams': match['teams'],
+        'goals': match['goals'],
+        'score': match['score'],
+        'status': match['fixture']['status']
+    }
+
+class DailyBundle:
+    """Matchs suivis d'une journée, indexés par id et gardés triés par coup d'envoi au fil des fusions"""
+    def __init__(self, date):
+        self.date = date
+        self.by_id = {}
+        self.order = []  # (timestamp, id), trié
+        self.full_synced_at = 0
+        self.lock = threading.Lock()
+
+    def _unindex(self, match):
+        del self.order[bisect.bisect_left(self.order, (match['timestamp'], match['id']))]
+
+    def merge(self, matches):
+        """Fusionne des matchs ; retourne les ids déjà connus qui ont changé, et parmi eux ceux dont le statut
+        ou le coup d'envoi a changé (un score en direct seul ne touche pas la prédiction)"""
+        changed = []
+        transitioned = []
+        for match in matches:
+            fixture_id = match['id']
+            previous = self.by_id.get(fixture_id)
+            if previous == match:
+                continue
+            if previous is None or previous['timestamp'] != match['timestamp']:
+                if previous is not None:
+                    self._unindex(previous)
+                bisect.insort(self.order, (match['timestamp'], fixture_id))
+            if previous is not None:
+                changed.append(fixture_id)
+                if (previous['status']['short'] != match['status']['short']
+                        or previous['timestamp'] != match['timestamp']):
+                    transitioned.append(fixture_id)
+            # Remplacer le dictionnaire sans le modifier : les listes déjà en cache restent cohérentes
+            self.by_id[fixture_id] = match
+        daily_bundle_stats['changed'] += len(changed)
+        daily_bundle_stats['transitioned'] += len(transitioned)
+        return changed, transitioned
+
+    def retain(self, fixture_ids):
+        """Retire les matchs absents de la liste complète (reportés à une autre date)"""
+        for fixture_id in self.by_id.keys() - set(fixture_ids):
+            self._unindex(self.by_id.pop(fixture_id))
+
+    def pending(self, live_ids, now):
+        """Matchs commencés absents du direct : terminés, interrompus ou reportés depuis la dernière fusion"""
+        return [
+            fixture_id for fixture_id, match in self.by_id.items()
+            if fixture_id not in live_ids
+            and (match['status']['short'] in LIVE_STATUSES
+                 or (match['status']['short'] == 'NS' and match['timestamp'] <= now))
+        ]
+
+    def matches(self):
+        return [self.by_id[fixture_id] for _, fixture_id in self.order]
+
+daily_bundles = {}
+daily_bundle_stats = {'full': 0, 'delta': 0, 'changed': 0, 'transitioned': 0}
+daily_bundles_lock = threading.Lock()
+
+def get_daily_bundle(date):
+    with daily_bundles_lock:
+        bundle = daily_bundles.get(date)
+        if bundle is None:
+            bundle = daily_bundles[date] = DailyBundle(date)
+            for old_date in sorted(daily_bundles)[:-DAILY_BUNDLES_KEPT]:
+                if old_date != date:
+                    del daily_bundles[old_date]
+        return bundle
+
+def sync_bundle_full(bundle):
+    matches_data = make_api_request('fixtures', f'date={bundle.date}')
+    if not matches_data or 'response' not in matches_data:
+        return [], []
+    # Filtrer uniquement les matchs des ligues qu'on suit
+    matches = [match_summary(match) for match in matches_data['response'] if match['league']['id'] in LEAGUES]
+    changes = bundle.merge(matches)
+    bundle.retain(match['id'] for match in matches)
+    # Une liste expirée servie faute de réponse de l'API ne compte pas comme relecture complète
+    if not matches_data.get('_stale'):
+        bundle.full_synced_at = time.time()
+        fixture_calendar.upsert(matches_data['response'])
+    daily_bundle_stats['full'] += 1
+    return changes
+
+def apply_live_summary(match, summary):
+    """Match de la liste du jour mis à jour d'après son résumé dans l'état du direct (live_fixture_summary)"""
+    status = dict(match['status'], short=summary['status'], elapsed=summary['elapsed'])
+    return dict(match, status=status, fixture=dict(match['fixture'], status=status), goals=summary['goals'])
+
+def sync_bundle_deltas(bundle):
+    # Matchs en cours : dernier état du direct déjà interrogé pour tout l'hôte par LiveHub, s'il est récent
+    live = live_hub.latest(2 * LIVE_POLL_INTERVAL)
+    updates = [
+        apply_live_summary(bundle.by_id[fixture_id], summary)
+        for fixture_id, summary in (live or {}).items() if fixture_id in bundle.by_id
+    ]
+    # Appels directs, sans cache : les matchs commencés absents du direct (tous, sans état récent) sont relus par id
+    pending = bundle.pending({match['id'] for match in updates}, time.time())
+    for start in range(0, len(pending), FIXTURES_IDS_BATCH):
+        ids = '-'.join(str(fixture_id) for fixture_id in pending[start:start + FIXTURES_IDS_BATCH])
+        data = fetch_api_response('fixtures', f'ids={ids}')
+        fixture_calendar.upsert((data or {}).get('response', []))
+        updates.extend(match_summary(match) for match in (data or {}).get('response', [])
+                       if match['fixture']['id'] in bundle.by_id)
+    daily_bundle_stats['delta'] += 1
+    return bundle.merge(updates)
+
+def invalidate_fixture_data(changed, transitioned=()):
+    """Oublie score, événements et statistiques des matchs qui ont changé, et la prédiction de ceux dont le statut
+    ou le coup d'envoi a changé"""
+    for fixture_id in changed:
+        for cached in (get_match_score, get_match_events, get_match_statistics):
+            cached.cache_invalidate(fixture_id)
+    for fixture_id in transitioned:
+        api_cache.invalidate(f"predictions?fixture={fixture_id}")
+        get_prediction.cache_invalidate(fixture_id)
+
+def build_matches_bundle(date, full=False):
+    """Liste des matchs suivis d'une journée : relecture complète périodique, sinon fusion des seules évolutions"""
+    bundle = get_daily_bundle(date)
+    with bundle.lock:
+        if full or not bundle.by_id or time.time() - bundle.full_synced_at > DAILY_BUNDLE_FULL_REFRESH:
+            changed, transitioned = sync_bundle_full(bundle)
+        else:
+            changed, transitioned = sync_bundle_deltas(bundle)
+        # Les prédictions des autres matchs restent en cache
+        invalidate_fixture_data(changed, transitioned)
+        return bundle.matches()
+
+@app.route('/')
+@cached_response
+def home():
+    region = request.args.get('region', 'all')
+    category = request.args.get('category')
+    try:
+        # Récupérer la date actuelle
+        current_date = datetime.now().strftime('%Y-%m-%d')
         
-        return render_template('index.html', matches=matches, regions=REGIONS)
+        # Les matchs du jour sont mis en cache ; une version périmée est servie pendant sa reconstruction
+        with request_phase('fetch'):
+            matches = get_or_revalidate(f"matches_{current_date}", lambda: build_matches_bundle(current_date))
+        # Les vues par région filtrent la même liste du jour
+        matches = filter_matches(matches or [], region, category, request.args.get('league', type=int))
+        return render_home(matches, region, category)
         
     except Exception as e:
-        print(f"Erreur dans la route home: {str(e)}")
-        return render_template('index.html', matches=[], regions=REGIONS)
+        logger.exception("Erreur dans la route home: %s", e)
+        # Ne pas conserver la page vide servie en cas d'erreur
+        g.skip_response_cache = True
+        return render_home([], region, category)
+
+# Nombre maximal de matchs par appel à /api/predictions (la page découpe ses demandes en lots de cette taille)
+PREDICTIONS_BATCH_MAX = int(os.environ.get('PREDICTIONS_BATCH_MAX', '24'))
+
+def prediction_summary(prediction):
+    """Ce que la carte d'un match affiche de sa prédiction"""
+    if not prediction:
+        return None
+    return {'winner': safe_get(prediction, 'winner', 'name'), 'advice': prediction.get('advice')}
+
+def load_model_predictions(fixture_ids):
+    """Prédictions du modèle de Poisson ; les matchs sont retrouvés dans la liste du jour, sinon via l'API"""
+    bundle, _ = api_cache.lookup(f"matches_{datetime.now().strftime('%Y-%m-%d')}")
+    todays_matches = {match['id']: match for match in bundle or []}
+    matches = {}
+    for fixture_id in fixture_ids:
+        match = todays_matches.get(fixture_id) or get_fixture(fixture_id)
+        if match:
+            # Copie : le modèle ne doit pas être ajouté aux matchs de la liste en cache
+            matches[fixture_id] = dict(match)
+    attach_model_predictions(list(matches.values()))
+    return {fixture_id: match.get('model') for fixture_id, match in matches.items()}
+
+@app.route('/api/predictions')
+def api_predictions():
+    """Prédictions de plusieurs matchs en une réponse : celles en cache tout de suite, les autres chargées en parallèle"""
+    fixture_ids = [safe_int_convert(value) for value in request.args.get('ids', '').split(',')]
+    fixture_ids = list(dict.fromkeys(fixture_id for fixture_id in fixture_ids if fixture_id > 0))[:PREDICTIONS_BATCH_MAX]
+    
+    with request_phase('fetch'):
+        if POISSON_MODEL:
+            models = load_model_predictions(fixture_ids)
+            summaries = {fixture_id: {'model': {'percent': models[fixture_id]['percent']}} if models.get(fixture_id) else None
+                         for fixture_id in fixture_ids}
+        else:
+            predictions = {}
+            missing = []
+            for fixture_id in fixture_ids:
+                found, prediction = get_prediction.cache_peek(fixture_id)
+                if found:
+                    predictions[fixture_id] = prediction
+                else:
+                    missing.append(fixture_id)
+            predictions.update(get_predictions_bulk(missing))
+            summaries = {fixture_id: prediction_summary(predictions.get(fixture_id)) for fixture_id in fixture_ids}
+    
+    response = jsonify({str(fixture_id): summary for fixture_id, summary in summaries.items()})
+    response.headers['Cache-Control'] = f"public, max-age={RESPONSE_MAX_AGE}"
+    return response
+
+# Intervalle (en secondes) entre deux reconstructions de l'index des équipes
+TEAM_INDEX_REFRESH = int(os.environ.get('TEAM_INDEX_REFRESH', '86400'))
+# Délai minimal (en secondes) avant de retenter une construction échouée
+TEAM_INDEX_RETRY = 60
+# Nombre de résultats de recherche conservés pour filtrer les saisies suivantes
+TEAM_SEARCH_CACHE_SIZE = 256
+
+def normalize_name(value):
+    """Met un nom en minuscules et retire les accents pour la recherche"""
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in value if not unicodedata.combining(c)).lower().strip()
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+def get_current_seasons():
+    """Retourne {id de ligue: saison en cours} pour les ligues suivies"""
+    leagues_data = make_api_request('leagues', 'current=true')
+    seasons = {}
+    for item in (leagues_data or {}).get('response', []):
+        league_id = safe_get(item, 'league', 'id')
+        if league_id not in LEAGUES:
+            continue
+        for season in item.get('seasons') or []:
+            if season.get('current'):
+                seasons[league_id] = season['year']
+    return seasons
+
+class TeamIndex:
+    """Index local des équipes des ligues suivies : recherche par sous-chaîne, sans accents"""
+    def __init__(self):
+        self.teams = {}       # id -> {'id', 'name', 'logo', 'league_ids'}
+        self._names = {}      # id -> nom normalisé
+        self._trigrams = {}   # trigramme -> ids des équipes
+        self._results = OrderedDict()  # recherche normalisée -> ids triés (LRU)
+        self._lock = threading.Lock()
+        self.built_at = 0
+        self.attempted_at = 0
+        self.stats = {'builds': 0, 'queries': 0, 'exact_hits': 0, 'prefix_hits': 0}
+        
+    @property
+    def ready(self):
+        return bool(self.teams)
+        
+    def build(self, teams):
+        """Remplace le contenu de l'index par la liste d'équipes fournie"""
+        names = {team_id: normalize_name(team['name']) for team_id, team in teams.items()}
+        index = {}
+        for team_id, name in names.items():
+            for gram in trigrams(name):
+                index.setdefault(gram, set()).add(team_id)
+        with self._lock:
+            self.teams = teams
+            self._names = names
+            self._trigrams = index
+            self._results.clear()
+            self.built_at = time.time()
+            self.stats['builds'] += 1
+            
+    def _lookup(self, query):
+        # Résultat exact déjà calculé
+        ids = self._results.get(query)
+        if ids is not None:
+            self._results.move_to_end(query)
+            self.stats['exact_hits'] += 1
+            return ids
+        
+        # Une recherche plus courte qui préfixe celle-ci contient déjà tous les candidats
+        for end in range(len(query) - 1, 2, -1):
+            candidates = self._results.get(query[:end])
+            if candidates is not None:
+                self.stats['prefix_hits'] += 1
+                break
+        else:
+            grams = [self._trigrams.get(gram, set()) for gram in trigrams(query)]
+            candidates = sorted(set.intersection(*grams), key=lambda i: self._names[i]) if grams else []
+        
+        ids = [team_id for team_id in candidates if query in self._names[team_id]]
+        self._results[query] = ids
+        if len(self._results) > TEAM_SEARCH_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return ids
+        
+    def search(self, term):
+        """Équipes dont le nom contient le terme, celles qui commencent par le terme en premier"""
+        query = normalize_name(term)
+        if len(query) < 3:
+            return []
+        with self._lock:
+            self.stats['queries'] += 1
+            ids = self._lookup(query)
+            names = self._names
+            teams = self.teams
+        ordered = sorted(ids, key=lambda team_id: not names[team_id].startswith(query))
+        return [teams[team_id] for team_id in ordered]
+
+team_index = TeamIndex()
+team_index_lock = threading.Lock()
+
+def load_tracked_teams():
+    """Récupère en parallèle les équipes de chaque ligue suivie pour sa saison en cours"""
+    seasons = get_current_seasons()
+    futures = {
+        league_id: submit_api_request('teams', f'league={league_id}&season={season}')
+        for league_id, season in seasons.items()
+    }
+    teams = {}
+    for league_id, future in futures.items():
+        for item in (future.result() or {}).get('response', []):
+            team = item.get('team') or {}
+            if not team.get('id') or not team.get('name'):
+                continue
+            entry = teams.setdefault(team['id'], {
+                'id': team['id'],
+                'name': team['name'],
+                'logo': team.get('logo'),
+                'league_ids': []
+            })
+            entry['league_ids'].append(league_id)
+    return teams
+
+def refresh_team_index():
+    if not team_index_lock.acquire(blocking=False):
+        return
+    try:
+        team_index.attempted_at = time.time()
+        upstream_priority.set(PRIORITY_BACKGROUND)
+        teams = load_tracked_teams()
+        if teams:
+            team_index.build(teams)
+    except Exception as e:
+        logger.error("Erreur lors de la construction de l'index des équipes: %s", e)
+    finally:
+        team_index_lock.release()
+
+def ensure_team_index():
+    """Indique si l'index est utilisable ; lance sa (re)construction en arrière-plan si nécessaire"""
+    now = time.time()
+    if (now - team_index.built_at > TEAM_INDEX_REFRESH
+            and now - team_index.attempted_at > TEAM_INDEX_RETRY
+            and not team_index_lock.locked()):
+        team_index.attempted_at = now
+        refresh_executor.submit(contextvars.Context().run, refresh_team_index)
+    return team_index.ready
+
+def find_team_ids(search_term, limit=5):
+    """IDs des équipes correspondant au terme : index local, ou API tant que l'index n'est pas prêt"""
+    if ensure_team_index():
+        return [team['id'] for team in team_index.search(search_term)[:limit]]
+    teams_data = make_api_request("teams", f"search={search_term}")
+    return [team['team']['id'] for team in (teams_data or {}).get('response', [])[:limit]]
+
+# Nombre de jours de matchs à venir conservés localement pour chaque ligue suivie
+FIXTURE_CALENDAR_DAYS = int(os.environ.get('FIXTURE_CALENDAR_DAYS', '14'))
+# Intervalle (en secondes) entre deux synchronisations du calendrier
+FIXTURE_CALENDAR_REFRESH = int(os.environ.get('FIXTURE_CALENDAR_REFRESH', '1800'))
+
+class FixtureCalendar:
+    """Calendrier local des prochains matchs des ligues suivies, indexé par match, équipe, ligue et date"""
+    def __init__(self):
+        self.fixtures = {}    # id du match -> match (format de l'API)
+        self.by_team = {}     # id d'équipe -> ids des matchs
+        self.by_league = {}   # id de ligue -> ids des matchs
+        self.by_date = {}     # AAAA-MM-JJ -> ids des matchs
+        self.synced_at = 0
+        self.attempted_at = 0
+        self._lock = threading.Lock()
+        self.stats = {'syncs': 0, 'updated': 0, 'removed': 0}
+        
+    @property
+    def ready(self):
+        return self.synced_at > 0
+        
+    def _add(self, match):
+        fixture_id = match['fixture']['id']
+        self.fixtures[fixture_id] = match
+        for team_id in (match['teams']['home']['id'], match['teams']['away']['id']):
+            self.by_team.setdefault(team_id, set()).add(fixture_id)
+        self.by_league.setdefault(match['league']['id'], set()).add(fixture_id)
+        self.by_date.setdefault(match['fixture']['date'].split('T')[0], set()).add(fixture_id)
+        
+    def _remove(self, fixture_id):
+        match = self.fixtures.pop(fixture_id, None)
+        if match is None:
+            return
+        for team_id in (match['teams']['home']['id'], match['teams']['away']['id']):
+            self.by_team.get(team_id, set()).discard(fixture_id)
+        self.by_league.get(match['league']['id'], set()).discard(fixture_id)
+        self.by_date.get(match['fixture']['date'].split('T')[0], set()).discard(fixture_id)
+        
+    def upsert(self, matches):
+        """Ajoute ou met à jour des matchs ; retourne les ids de ceux qui ont changé"""
+        changed = []
+        with self._lock:
+            for match in matches:
+                if match['league']['id'] not in LEAGUES:
+                    continue
+                fixture_id = match['fixture']['id']
+                if self.fixtures.get(fixture_id) == match:
+                    continue
+                self._remove(fixture_id)
+                self._add(match)
+                changed.append(fixture_id)
+            self.stats['updated'] += len(changed)
+        return changed
+        
+    def sync_league(self, league_id, matches):
+        """Aligne une ligue sur la liste reçue : mises à jour et retrait des matchs sortis de la fenêtre"""
+        received = {match['fixture']['id'] for match in matches}
+        with self._lock:
+            for fixture_id in self.by_league.get(league_id, set()) - received:
+                self._remove(fixture_id)
+                self.stats['removed'] += 1
+        return self.upsert(matches)
+        
+    def get(self, fixture_id):
+        return self.fixtures.get(fixture_id)
+        
+    def _sorted(self, index, key):
+        # Les ensembles de l'index sont modifiés par upsert : lus sous le verrou
+        with self._lock:
+            matches = [self.fixtures[fixture_id] for fixture_id in index.get(key, ()) if fixture_id in self.fixtures]
+        return sorted(matches, key=lambda match: match['fixture']['timestamp'])
+        
+    def for_team(self, team_id, status='NS', limit=10):
+        """Prochains matchs d'une équipe, par date"""
+        matches = self._sorted(self.by_team, team_id)
+        return [match for match in matches if match['fixture']['status']['short'] == status][:limit]
+        
+    def on_date(self, date):
+        return self._sorted(self.by_date, date)
+
+fixture_calendar = FixtureCalendar()
+fixture_calendar_lock = threading.Lock()
+
+def sync_fixture_calendar():
+    """Synchronise le calendrier avec une requête groupée par ligue suivie"""
+    if not fixture_calendar_lock.acquire(blocking=False):
+        return
+    try:
+        fixture_calendar.attempted_at = time.time()
+        upstream_priority.set(PRIORITY_BACKGROUND)
+        today = datetime.now()
+        params = (f"from={today.strftime('%Y-%m-%d')}"
+                  f"&to={(today + timedelta(days=FIXTURE_CALENDAR_DAYS)).strftime('%Y-%m-%d')}")
+        futures = {
+            league_id: submit_api_request('fixtures', f'league={league_id}&season={season}&{params}')
+            for league_id, season in get_current_seasons().items()
+        }
+        synced = 0
+        for league_id, future in futures.items():
+            fixtures_data = future.result()
+            if fixtures_data and 'response' in fixtures_data:
+                fixture_calendar.sync_league(league_id, fixtures_data['response'])
+                synced += 1
+        if synced:
+            fixture_calendar.synced_at = time.time()
+            fixture_calendar.stats['syncs'] += 1
+    except Exception as e:
+        logger.error("Erreur lors de la synchronisation du calendrier: %s", e)
+    finally:
+        fixture_calendar_lock.release()
+
+def ensure_fixture_calendar():
+    """Indique si le calendrier est utilisable ; lance sa synchronisation en arrière-plan si nécessaire"""
+    now = time.time()
+    if (now - fixture_calendar.synced_at > FIXTURE_CALENDAR_REFRESH
+            and now - fixture_calendar.attempted_at > TEAM_INDEX_RETRY
+            and not fixture_calendar_lock.locked()):
+        fixture_calendar.attempted_at = now
+        refresh_executor.submit(contextvars.Context().run, sync_fixture_calendar)
+    return fixture_calendar.ready
+
+def get_team_fixtures(team_ids):
+    """Prochains matchs non commencés de chaque équipe : calendrier local, ou API (appels lancés ensemble) tant qu'il n'est pas prêt"""
+    if ensure_fixture_calendar():
+        return [fixture_calendar.for_team(team_id) for team_id in team_ids]
+    futures = [
+        submit_api_request("fixtures", f"team={team_id}&next=10&status=NS")  # Prochains 10 matchs non commencés
+        for team_id in team_ids
+    ]
+    return [(future.result() or {}).get('response', []) for future in futures]
+
+def get_fixture(fixture_id):
+    """Un match par son id : calendrier local, sinon API"""
+    fixture_id = safe_int_convert(fixture_id)
+    if ensure_fixture_calendar():
+        match = fixture_calendar.get(fixture_id)
+        if match:
+            return match
+    fixture_data = make_api_request("fixtures", f"id={fixture_id}")
+    response = (fixture_data or {}).get('response')
+    if response and not fixture_data.get('_stale'):
+        fixture_calendar.upsert(response)
+    return response[0] if response else None
 
 @app.route('/search')
 def search():
     search_term = request.args.get('q', '')
     if len(search_term) < 3:
-        return render_template('search.html', 
-                             search_term=search_term, 
-                             matches=[],
-                             error="Le terme de recherche doit contenir au moins 3 caractères.")
+        return render_page('search.html', 
+                         search_term=search_term, 
+                         matches=[],
+                         error="Le terme de recherche doit contenir au moins 3 caractères.")
 
-    # D'abord chercher les équipes
-    teams_data = make_api_request("teams", f"search={search_term}")
+    # D'abord chercher les équipes (limité à 5 équipes)
     matches = []
-    
-    if teams_data.get('response'):
-        # Pour chaque équipe trouvée
-        for team in teams_data['response'][:5]:  # Limiter à 5 équipes
-            team_id = team['team']['id']
-            
-            # Chercher les prochains matchs de cette équipe
-            fixtures_data = make_api_request(
-                "fixtures",
-                f"team={team_id}&next=10&status=NS"  # Prochains 10 matchs non commencés
-            )
-            
-            if fixtures_data.get('response'):
-                for match in fixtures_data['response']:
-                    # Vérifier si le match est dans une ligue suivie
-                    league_id = match['league']['id']
-                    if league_id in LEAGUES:
-                        matches.append(match)
+    with request_phase('fetch'):
+        teams_fixtures = get_team_fixtures(find_team_ids(search_term))
+    for team_fixtures in teams_fixtures:
+        # Prochains matchs de chaque équipe
+        for match in team_fixtures:
+            # Vérifier si le match est dans une ligue suivie
+            league_id = match['league']['id']
+            if league_id in LEAGUES:
+                matches.append(match)
 
     # Trier les matchs par date
     matches.sort(key=lambda x: x['fixture']['date'])
@@ -490,79 +2783,46 @@ def search():
             matches_by_date[match_date] = []
         matches_by_date[match_date].append(match)
 
-    return render_template('search.html', 
-                         search_term=search_term, 
-                         matches_by_date=matches_by_date)
+    return render_page('search.html', 
+                     search_term=search_term, 
+                     matches_by_date=matches_by_date)
 
 @app.route('/search-teams', methods=['GET'])
 def search_teams():
     search_term = request.args.get('term', '')
-    print(f"Recherche pour le terme: {search_term}")
+    logger.debug("Recherche pour le terme: %s", search_term)
     
     if len(search_term) < 3:
         return jsonify([])
 
-    # D'abord chercher les équipes
-    teams_data = make_api_request("teams", f"search={search_term}")
-    
+    # D'abord chercher les équipes (limité à 5 équipes)
     suggestions = []
-    if teams_data.get('response'):
-        # Pour chaque équipe trouvée
-        for team in teams_data['response'][:5]:  # Limiter à 5 équipes
-            team_id = team['team']['id']
-            
-            # Chercher les prochains matchs de cette équipe
-            fixtures_data = make_api_request(
-                "fixtures",
-                f"team={team_id}&next=10&status=NS"  # Prochains 10 matchs non commencés
-            )
-            
-            if fixtures_data.get('response'):
-                for match in fixtures_data['response']:
-                    # Vérifier si le match est dans une ligue suivie
-                    league_id = match['league']['id']
-                    if league_id in LEAGUES:
-                        suggestions.append({
-                            'value': str(match['fixture']['id']),
-                            'label': f"{match['teams']['home']['name']} vs {match['teams']['away']['name']} ({match['league']['name']})",
-                            'home_team': match['teams']['home']['name'],
-                            'away_team': match['teams']['away']['name'],
-                            'league': match['league']['name'],
-                            'date': match['fixture']['date'].split('T')[0],
-                            'time': match['fixture']['date'].split('T')[1][:5]
-                        })
-                        print(f"Match ajouté: {match['teams']['home']['name']} vs {match['teams']['away']['name']}")
+    with request_phase('fetch'):
+        teams_fixtures = get_team_fixtures(find_team_ids(search_term))
+    for team_fixtures in teams_fixtures:
+        # Prochains matchs de chaque équipe
+        for match in team_fixtures:
+            # Vérifier si le match est dans une ligue suivie
+            league_id = match['league']['id']
+            if league_id in LEAGUES:
+                suggestions.append({
+                    'value': str(match['fixture']['id']),
+                    'label': f"{match['teams']['home']['name']} vs {match['teams']['away']['name']} ({match['league']['name']})",
+                    'home_team': match['teams']['home']['name'],
+                    'away_team': match['teams']['away']['name'],
+                    'league': match['league']['name'],
+                    'date': match['fixture']['date'].split('T')[0],
+                    'time': match['fixture']['date'].split('T')[1][:5]
+                })
+                logger.debug("Match ajouté: %s vs %s", match['teams']['home']['name'], match['teams']['away']['name'])
 
     # Trier les suggestions par date
     suggestions.sort(key=lambda x: x['date'])
-    print(f"Nombre total de suggestions: {len(suggestions)}")
+    logger.debug("Nombre total de suggestions: %d", len(suggestions))
     return jsonify(suggestions)
 
-@app.route('/predictions', methods=['POST'])
-def get_predictions():
-    fixture_id = request.form.get('fixture_id')
-    if not fixture_id:
-        return redirect(url_for('home'))
-        
-    # Récupérer les informations du match
-    fixture_data = make_api_request("fixtures", f"id={fixture_id}")
-    if not fixture_data.get('response'):
-        return redirect(url_for('home'))
-    match = fixture_data['response'][0]
-    
-    # Récupérer les prédictions
-    pred_data = get_prediction(fixture_id)
-    if not pred_data:
-        return redirect(url_for('home'))
-    prediction_data = pred_data
-
-    # Debug logs
-    print("Structure complète des prédictions:", prediction_data)
-    print("Structure de predictions:", prediction_data.get('predictions', {}))
-    print("Données win_or_draw brutes:", prediction_data.get('predictions', {}).get('win_or_draw'))
-    print("Données winner brutes:", prediction_data.get('predictions', {}).get('winner'))
-    
-    # Formater les prédictions pour l'affichage
+def format_prediction(match, prediction_data):
+    """Met en forme les prédictions traitées pour le template prediction_section.html"""
     formatted_prediction = {
         'teams': {
             'home': {
@@ -624,60 +2884,119 @@ def get_predictions():
                 formatted_prediction['teams']['away']['league']['strength'] = round(safe_int_convert(safe_get(prediction_data, 'predictions', 'teams', 'away', 'win', default=50)), 2)
                 formatted_prediction['strength']['away'] = formatted_prediction['teams']['away']['league']['strength']
 
-    print("Données formatées:", formatted_prediction)  # Debug log
+    return formatted_prediction
+
+@app.route('/predictions', methods=['POST'])
+def get_predictions():
+    fixture_id = request.form.get('fixture_id')
+    if not fixture_id:
+        return redirect(url_for('home'))
+        
+    # Récupérer les informations du match
+    with request_phase('fetch'):
+        match = get_fixture(fixture_id)
+    if not match:
+        return redirect(url_for('home'))
+    
+    # Récupérer les prédictions
+    with request_phase('fetch'):
+        pred_data = get_prediction(fixture_id)
+    if not pred_data:
+        return redirect(url_for('home'))
+    prediction_data = pred_data
+
+    # Debug logs
+    logger.debug("Structure complète des prédictions: %s", prediction_data)
+    logger.debug("Structure de predictions: %s", prediction_data.get('predictions', {}))
+    logger.debug("Données win_or_draw brutes: %s", prediction_data.get('predictions', {}).get('win_or_draw'))
+    logger.debug("Données winner brutes: %s", prediction_data.get('predictions', {}).get('winner'))
+    
+    # Formater les prédictions pour l'affichage
+    formatted_prediction = format_prediction(match, prediction_data)
 
-    return render_template('prediction.html', 
-                         match=match,
-                         prediction=formatted_prediction)
+    logger.debug("Données formatées: %s", formatted_prediction)
 
-@app.route('/prediction/<int:fixture_id>')
-def show_prediction(fixture_id):
-    # Obtenir les prédictions
-    prediction_data = get_prediction(fixture_id)
-    if not prediction_data:
-        return redirect('/')
+    return render_page('prediction.html', 
+                     match=match,
+                     prediction=formatted_prediction)
 
-    prediction = prediction_data
+# Nombre de saisons essayées (la saison en cours puis les précédentes) pour trouver des statistiques
+STATS_SEASONS_TO_TRY = 3
 
-    # Obtenir les statistiques des équipes
-    home_team_id = prediction['teams']['home']['id']
-    away_team_id = prediction['teams']['away']['id']
-    league_id = prediction['league']['id']
-    
-    # Obtenir les statistiques des équipes sur les 3 dernières saisons
-    current_season = 2023
-    seasons = [current_season, current_season - 1, current_season - 2]
-    
-    home_stats = None
-    away_stats = None
-    
-    # Essayer chaque saison jusqu'à trouver des statistiques valides
-    for season in seasons:
-        if not home_stats:
-            home_stats_data = make_api_request("teams/statistics", 
-                                             f"team={home_team_id}&season={season}&league={league_id}")
-            if home_stats_data.get('response', {}).get('goals', {}).get('for', {}).get('average', {}).get('total'):
-                home_stats = home_stats_data.get('response', {})
-        
-        if not away_stats:
-            away_stats_data = make_api_request("teams/statistics", 
-                                             f"team={away_team_id}&season={season}&league={league_id}")
-            if away_stats_data.get('response', {}).get('goals', {}).get('for', {}).get('average', {}).get('total'):
-                away_stats = away_stats_data.get('response', {})
-        
-        if home_stats and away_stats:
-            break
+# Saison qui a effectivement des statistiques, par (équipe, ligue, saison en cours)
+team_stats_seasons = {}
+
+def team_statistics_params(team_id, league_id, season):
+    return f"team={team_id}&season={season}&league={league_id}"
+
+def stats_season(team_id, league_id, season):
+    """Saison mémorisée pour les statistiques de l'équipe quand la saison en cours est season"""
+    return team_stats_seasons.get((team_id, league_id, season), season)
+
+def stats_seasons_to_try(team_id, league_id, season):
+    """Saisons à interroger, de la plus récente à la plus ancienne.
+
+    Une saison mémorisée plus ancienne que season n'évite pas les plus récentes : elles peuvent avoir
+    reçu des données depuis (début de saison)."""
+    known_season = team_stats_seasons.get((team_id, league_id, season))
+    if known_season is None:
+        return [season - offset for offset in range(STATS_SEASONS_TO_TRY)]
+    return list(range(season, known_season - 1, -1))
+
+def has_goal_averages(stats_data):
+    return bool(safe_get(stats_data, 'response', 'goals', 'for', 'average', 'total'))
+
+def current_season(league_id, default=None):
+    """Saison en cours d'une ligue d'après ses métadonnées dans l'API"""
+    return get_current_seasons().get(league_id) or default or datetime.now().year
+
+def load_match_context(home_team_id, away_team_id, league_id, season):
+    """Charge en parallèle les statistiques des deux équipes et les confrontations directes"""
+    futures = {}
+    for team_id in (home_team_id, away_team_id):
+        # Une seule requête si la saison en cours a déjà des statistiques, sinon les saisons candidates à la fois
+        for candidate in stats_seasons_to_try(team_id, league_id, season):
+            futures[(team_id, candidate)] = submit_api_request(
+                "teams/statistics", team_statistics_params(team_id, league_id, candidate))
+    h2h_future = submit_api_request("fixtures/headtohead", f"h2h={home_team_id}-{away_team_id}&last=5")
     
-    # Si toujours pas de stats, utiliser les dernières données disponibles
-    if not home_stats:
-        home_stats_data = make_api_request("teams/statistics", 
-                                         f"team={home_team_id}&season={current_season}&league={league_id}")
-        home_stats = home_stats_data.get('response', {})
+    def pick_statistics(team_id):
+        tried = [candidate for (team, candidate) in futures if team == team_id]
+        for candidate in tried:
+            stats_data = futures[(team_id, candidate)].result()
+            if has_goal_averages(stats_data):
+                team_stats_seasons[(team_id, league_id, season)] = candidate
+                return stats_data['response']
+        # Saison mémorisée sans données (ou aucune) : l'oublier et garder la réponse la plus récente
+        team_stats_seasons.pop((team_id, league_id, season), None)
+        return (futures[(team_id, tried[0])].result() or {}).get('response', {})
     
-    if not away_stats:
-        away_stats_data = make_api_request("teams/statistics", 
-                                         f"team={away_team_id}&season={current_season}&league={league_id}")
-        away_stats = away_stats_data.get('response', {})
+    home_stats = pick_statistics(home_team_id)
+    away_stats = pick_statistics(away_team_id)
+    h2h = (h2h_future.result() or {}).get('response', [])
+    return home_stats, away_stats, h2h
+
+@app.route('/prediction/<int:fixture_id>')
+@cached_response
+def show_prediction(fixture_id):
+    # Obtenir le match et les prédictions (la réponse brute de la prédiction est chargée pendant ce temps)
+    with request_phase('fetch'):
+        prediction_found, _ = get_prediction.cache_peek(fixture_id)
+        prediction_future = None if prediction_found else submit_api_request('predictions', f'fixture={fixture_id}')
+        match = get_fixture(fixture_id)
+        if prediction_future:
+            prediction_future.result()
+        prediction_data = get_prediction(fixture_id)
+    if not match or not prediction_data:
+        return redirect('/')
+
+    # Obtenir les statistiques des équipes et l'historique des confrontations
+    home_team_id = match['teams']['home']['id']
+    away_team_id = match['teams']['away']['id']
+    league_id = match['league']['id']
+    season = current_season(league_id, match['league'].get('season'))
+    with request_phase('fetch'):
+        home_stats, away_stats, h2h = load_match_context(home_team_id, away_team_id, league_id, season)
     
     # Convertir les statistiques en nombres
     if home_stats and 'goals' in home_stats:
@@ -687,16 +3006,14 @@ def show_prediction(fixture_id):
     if away_stats and 'goals' in away_stats:
         away_stats['goals']['for']['average']['total'] = safe_float(away_stats['goals']['for']['average']['total'])
         away_stats['goals']['against']['average']['total'] = safe_float(away_stats['goals']['against']['average']['total'])
-    
-    # Obtenir l'historique des confrontations
-    h2h = make_api_request("fixtures/headtohead", f"h2h={home_team_id}-{away_team_id}&last=5")
 
-    return render_template(
+    return render_page(
         'prediction.html',
-        prediction=prediction,
+        match=match,
+        prediction=format_prediction(match, prediction_data),
         home_stats=home_stats,
         away_stats=away_stats,
-        h2h=h2h.get('response', [])
+        h2h=h2h
     )
 
 @app.route('/favicon.ico')
@@ -704,5 +3021,844 @@ def favicon():
     return send_from_directory(os.path.join(app.root_path, 'static'),
                              'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
+metrics.counter('prono_api_cache_requests_total', "Lectures du cache API par niveau et résultat")
+metrics.counter('prono_api_cache_evictions_total', "Entrées du cache API supprimées à expiration, par niveau")
+metrics.gauge('prono_api_cache_entries', "Entrées du cache API par niveau (l1 : somme des workers)")
+metrics.gauge('prono_api_cache_bytes', "Taille sérialisée des entrées du cache API par niveau (l1 : somme des workers)")
+metrics.counter('prono_api_cache_class_requests_total', "Lectures du cache API par classe de la politique et résultat")
+metrics.counter('prono_api_cache_class_evictions_total', "Entrées L1 évincées par budget, par classe")
+metrics.gauge('prono_api_cache_class_bytes', "Taille des entrées L1 par classe (somme des workers)")
+metrics.counter('prono_cache_events_total', "Événements des caches de réponses, de fragments et par match")
+metrics.counter('prono_upstream_coalesced_total', "Appels à l'API évités par le single-flight")
+metrics.counter('prono_rate_limiter_events_total', "Jetons du limiteur accordés, attendus ou refusés")
+metrics.gauge('prono_rate_limiter_queue_length', "Appels en attente d'un jeton (somme des workers)")
+metrics.gauge('prono_circuit_breaker_open', "Disjoncteurs ouverts par endpoint (somme des workers)")
+metrics.counter('prono_circuit_breaker_events_total', "Ouvertures des disjoncteurs et appels refusés, par endpoint")
+metrics.counter('prono_upstream_projected_responses_total', "Réponses de l'API réduites aux champs utilisés, par endpoint")
+metrics.counter('prono_upstream_projection_bytes_total',
+                "Taille des réponses de l'API avant (raw) et après (stored) projection et filtrage, par endpoint")
+metrics.counter('prono_daily_bundle_events_total', "Relectures complètes, fusions d'évolutions et matchs modifiés des listes du jour")
+
+def collect_cache_metrics():
+    for tier, counters in api_cache.stats.items():
+        for result, value in counters.items():
+            if result == 'evictions':
+                continue
+            yield 'prono_api_cache_requests_total', {'tier': tier, 'result': result}, value
+    yield 'prono_api_cache_evictions_total', {'tier': 'l1'}, api_cache.stats['l1']['evictions']
+    yield 'prono_api_cache_entries', {'tier': 'l1'}, len(api_cache.cache)
+    yield 'prono_api_cache_bytes', {'tier': 'l1'}, sum(list(api_cache.sizes.values()))
+    if api_cache.backend is not None:
+        yield 'prono_api_cache_evictions_total', {'tier': 'l2'}, api_cache.backend.stats['evictions']
+    for name, counters in api_cache.class_stats.items():
+        for result in ('hits', 'stale_hits', 'misses'):
+            yield 'prono_api_cache_class_requests_total', {'class': name, 'result': result}, counters[result]
+        yield 'prono_api_cache_class_evictions_total', {'class': name}, counters['evictions']
+        yield 'prono_api_cache_class_bytes', {'class': name}, api_cache.class_bytes[name]
+
+    caches = {'response': response_cache.stats, 'fragment': fragment_cache.stats, 'static_export': static_export.stats}
+    for name, cached in fixture_caches.items():
+        caches[name] = {event: value for event, value in cached.cache_info().items() if event not in ('size', 'maxsize')}
+    for cache, events in caches.items():
+        for event, value in events.items():
+            yield 'prono_cache_events_total', {'cache': cache, 'event': event}, value
+
+    yield 'prono_upstream_coalesced_total', {'client': 'sync'}, api_single_flight.stats['coalesced']
+    yield 'prono_upstream_coalesced_total', {'client': 'async'}, async_client.stats['coalesced']
+    for event in ('acquired', 'throttled', 'rejected'):
+        yield 'prono_rate_limiter_events_total', {'event': event}, rate_limiter.stats[event]
+    yield 'prono_rate_limiter_queue_length', {}, rate_limiter.queue_length()
+    for event, value in daily_bundle_stats.items():
+        yield 'prono_daily_bundle_events_total', {'event': event}, value
+    with projection_stats_lock:
+        projections = {endpoint: dict(stats) for endpoint, stats in projection_stats.items()}
+    for endpoint, stats in projections.items():
+        yield 'prono_upstream_projected_responses_total', {'endpoint': endpoint}, stats['responses']
+        yield 'prono_upstream_projection_bytes_total', {'endpoint': endpoint, 'stage': 'raw'}, stats['raw_bytes']
+        yield 'prono_upstream_projection_bytes_total', {'endpoint': endpoint, 'stage': 'stored'}, stats['stored_bytes']
+    for endpoint, breaker in list(circuit_breakers.items()):
+        yield 'prono_circuit_breaker_open', {'endpoint': endpoint}, int(breaker.is_open)
+        for event, value in breaker.stats.items():
+            yield 'prono_circuit_breaker_events_total', {'endpoint': endpoint, 'event': event}, value
+
+def collect_shared_cache_metrics():
+    # Le cache SQLite est commun à tous les workers : lu une seule fois
+    if api_cache.backend is not None:
+        entries, size = api_cache.backend.usage()
+        yield 'prono_api_cache_entries', {'tier': 'l2'}, entries
+        yield 'prono_api_cache_bytes', {'tier': 'l2'}, size
+
+metrics.register_collector(collect_cache_metrics)
+metrics.register_collector(collect_shared_cache_metrics, shared=True)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return metrics.render(metrics.aggregate()), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+# Intervalle (en secondes) entre deux appels à fixtures?live=all, quel que soit le nombre de spectateurs
+LIVE_POLL_INTERVAL = int(os.environ.get('LIVE_POLL_INTERVAL', '30'))
+# État des matchs en cours partagé par les workers de l'hôte (écrit par le seul worker qui interroge l'API)
+LIVE_STATE_PATH = os.environ.get('LIVE_STATE_PATH',
+                                 os.path.join(tempfile.gettempdir(), f"prono-live-{socket.gethostname()}.json"))
+# Intervalle (en secondes) entre deux lectures de l'état partagé par chaque worker
+LIVE_CHECK_INTERVAL = 1.0
+# Commentaire SSE envoyé en l'absence d'événement pour garder la connexion ouverte
+LIVE_HEARTBEAT = 15
+# Chaque flux occupe un thread gthread : nombre maximal de flux par worker et durée d'un flux avant reconnexion.
+# Au-delà, /live répond 204 (EventSource ne se reconnecte pas) et la page relit /api/live à chaque intervalle
+LIVE_MAX_CLIENTS = int(os.environ.get('LIVE_MAX_CLIENTS', '2'))
+LIVE_STREAM_DURATION = int(os.environ.get('LIVE_STREAM_DURATION', '300'))
+LIVE_CLIENT_QUEUE = 64
+# Avance (en secondes) sur le coup d'envoi à partir de laquelle la page d'accueil suit le direct
+LIVE_WATCH_LEAD = int(os.environ.get('LIVE_WATCH_LEAD', '900'))
+
+metrics.counter('prono_live_events_total', "Événements poussés aux clients du direct, par type")
+metrics.counter('prono_live_polls_total', "Appels à fixtures?live=all par résultat")
+
+def live_fixture_summary(match):
+    """Ce que les clients reçoivent d'un match en cours"""
+    status = match['fixture']['status']
+    return {
+        'id': match['fixture']['id'],
+        'status': status.get('short'),
+        'elapsed': status.get('elapsed'),
+        'goals': {'home': safe_get(match, 'goals', 'home'), 'away': safe_get(match, 'goals', 'away')},
+        'teams': {'home': safe_get(match, 'teams', 'home', 'name'), 'away': safe_get(match, 'teams', 'away', 'name')},
+        'league': safe_get(match, 'league', 'name')
+    }
+
+def sse_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+def write_bytes_atomic(path, data, mode=None):
+    """Écriture atomique : un lecteur voit l'ancien ou le nouveau contenu, jamais un fichier partiel"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        if mode is not None:
+            os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+
+def write_json_atomic(path, data):
+    write_bytes_atomic(path, json.dumps(data).encode('utf-8'))
+
+def try_host_lock(path):
+    """Verrou exclusif non bloquant, partagé par les processus de l'hôte : le fichier ouvert à garder, ou None s'il est pris"""
+    lock_file = open(path, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+class LiveHub:
+    """Diffuse aux clients SSE du worker les matchs en cours qui ont changé.
+
+    Un seul worker par hôte (celui qui obtient le verrou du fichier d'état) appelle fixtures?live=all et
+    écrit l'état ; tous les workers qui ont des clients relisent ce fichier et ne poussent que les différences.
+    """
+    def __init__(self, state_path, poll_interval):
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+        self.fixtures = {}  # id (texte) -> résumé
+        self.seq = 0
+        self.clients = set()
+        self.watched_until = 0  # le direct est suivi par relecture (/api/live) jusqu'à cette date (time.monotonic())
+        self._lock = threading.Lock()
+        self._thread = None
+        self._leader_file = None  # verrou détenu tant que ce worker interroge l'API
+        self._state_mtime = None
+
+    def subscribe(self):
+        """Nouvelle file de messages pour un client, ou None si le worker a atteint LIVE_MAX_CLIENTS"""
+        with self._lock:
+            if len(self.clients) >= LIVE_MAX_CLIENTS:
+                return None
+            client = queue.Queue(LIVE_CLIENT_QUEUE)
+            self.clients.add(client)
+            self._start()
+        self._load_state()
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self.clients.discard(client)
+
+    def watch(self):
+        """État courant pour un client qui relit le direct ; l'API reste interrogée tant qu'il revient à chaque intervalle"""
+        with self._lock:
+            self.watched_until = time.monotonic() + 2 * self.poll_interval
+            self._start()
+        self._load_state()
+        return self.snapshot()
+
+    def _start(self):
+        # Sous self._lock
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='live-hub', daemon=True)
+            self._thread.start()
+
+    def snapshot(self):
+        with self._lock:
+            return self.seq, list(self.fixtures.values())
+
+    def _publish(self, message, event):
+        with self._lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Client trop lent : il repart d'un instantané complet au lieu d'accumuler du retard
+                while not client.empty():
+                    client.get_nowait()
+                seq, fixtures = self.snapshot()
+                client.put_nowait(sse_event('snapshot', fixtures, seq))
+        metrics.inc('prono_live_events_total', {'event': event}, len(clients))
+
+    def _is_leader(self):
+        if self._leader_file is None:
+            self._leader_file = try_host_lock(self.state_path + '.lock')
+        return self._leader_file is not None
+
+    def _release_leadership(self):
+        if self._leader_file is not None:
+            self._leader_file.close()
+            self._leader_file = None
+
+    def _read_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _poll(self):
+        """Appelle l'API une fois et écrit le nouvel état (le numéro de séquence n'avance que si un match a changé)"""
+        previous = self._read_state() or {'seq': 0, 'fixtures': {}}
+        data = fetch_api_response('fixtures', 'live=all')
+        if data is None or 'response' not in data:
+            metrics.inc('prono_live_polls_total', {'result': 'error'})
+            # Pas de nouvel essai avant l'intervalle suivant
+            write_json_atomic(self.state_path, dict(previous, polled_at=time.time()))
+            return
+        metrics.inc('prono_live_polls_total', {'result': 'ok'})
+        fixtures = {
+            str(match['fixture']['id']): live_fixture_summary(match)
+            for match in data['response'] if safe_get(match, 'league', 'id') in LEAGUES
+        }
+        seq = previous['seq'] + (fixtures != previous['fixtures'])
+        now = time.time()
+        write_json_atomic(self.state_path, {'seq': seq, 'polled_at': now, 'fetched_at': now, 'fixtures': fixtures})
+
+    def latest(self, max_age):
+        """Matchs en cours (id -> résumé) d'après l'état partagé, ou None si le dernier appel réussi date de plus de max_age"""
+        state = self._read_state()
+        if state is None or time.time() - state.get('fetched_at', 0) > max_age:
+            return None
+        return {int(fixture_id): fixture for fixture_id, fixture in state['fixtures'].items()}
+
+    def _load_state(self):
+        """Relit l'état partagé s'il a changé et pousse les différences aux clients"""
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._state_mtime:
+                return
+            self._state_mtime = mtime
+        state = self._read_state()
+        if state is None:
+            return
+        with self._lock:
+            if state['seq'] == self.seq:
+                return
+            previous, self.fixtures, self.seq = self.fixtures, state['fixtures'], state['seq']
+
+        for fixture_id, fixture in state['fixtures'].items():
+            if previous.get(fixture_id) != fixture:
+                # Score, événements et statistiques de ce match ne sont plus à jour dans les caches du worker
+                for cached in (get_match_score, get_match_events, get_match_statistics):
+                    cached.cache_invalidate(fixture_id)
+                self._publish(sse_event('fixture', fixture, state['seq']), 'fixture')
+        for fixture_id in previous.keys() - state['fixtures'].keys():
+            self._publish(sse_event('ended', {'id': int(fixture_id)}, state['seq']), 'ended')
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self.clients and time.monotonic() >= self.watched_until:
+                        self._thread = None
+                        return
+                if self._is_leader():
+                    state = self._read_state() or {}
+                    if time.time() - state.get('polled_at', 0) >= self.poll_interval:
+                        self._poll()
+                self._load_state()
+                time.sleep(LIVE_CHECK_INTERVAL)
+        except Exception as e:
+            logger.error("Erreur du direct: %s", e)
+            with self._lock:
+                self._thread = None
+        finally:
+            self._release_leadership()
+
+live_hub = LiveHub(LIVE_STATE_PATH, LIVE_POLL_INTERVAL)
+
+@app.route('/live')
+def live_updates():
+    """Flux SSE : un instantané des matchs en cours, puis seulement les matchs qui changent"""
+    client = live_hub.subscribe()
+    if client is None:
+        # EventSource abandonne sur un 204 sans se reconnecter : la page passe à /api/live
+        return '', 204
+
+    def stream():
+        try:
+            seq, fixtures = live_hub.snapshot()
+            # Délai de reconnexion du navigateur, en millisecondes
+            yield "retry: 5000\n\n"
+            yield sse_event('snapshot', fixtures, seq)
+            # Le flux est fermé périodiquement : EventSource se reconnecte et libère le thread entre-temps
+            deadline = time.monotonic() + LIVE_STREAM_DURATION
+            while time.monotonic() < deadline:
+                try:
+                    yield client.get(timeout=LIVE_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            live_hub.unsubscribe(client)
+
+    return app.response_class(stream(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/live')
+def api_live():
+    """Matchs en cours pour les pages qui relisent le direct au lieu d'ouvrir un flux SSE"""
+    seq, fixtures = live_hub.watch()
+    return jsonify({'seq': seq, 'fixtures': fixtures}), 200, {'Cache-Control': 'no-cache'}
+
+# Préchargement des matchs et des prédictions (désactivé par défaut)
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', '0') == '1'
+# Intervalle (en secondes) entre deux passes du préchargement
+PREFETCH_INTERVAL = int(os.environ.get('PREFETCH_INTERVAL', '900'))
+# Nombre maximum d'appels API consacrés au préchargement sur une heure glissante, pour tout l'hôte
+PREFETCH_BUDGET_PER_HOUR = int(os.environ.get('PREFETCH_BUDGET_PER_HOUR', '300'))
+# Appels du budget partagés entre les processus de l'hôte ; seul celui qui détient le verrou (chemin + '.lock') précharge
+PREFETCH_STATE_PATH = os.environ.get('PREFETCH_STATE_PATH',
+                                     os.path.join(tempfile.gettempdir(), f"prono-prefetch-{socket.gethostname()}.json"))
+
+class RequestBudget:
+    """Budget d'appels API sur une fenêtre glissante d'une heure"""
+    def __init__(self, per_hour):
+        self.per_hour = per_hour
+        self._calls = deque()
+        self._lock = threading.Lock()
+        
+    def _purge(self, now):
+        while self._calls and now - self._calls[0] >= 3600:
+            self._calls.popleft()
+            
+    def try_spend(self):
+        with self._lock:
+            now = time.time()
+            self._purge(now)
+            if len(self._calls) >= self.per_hour:
+                return False
+            self._calls.append(now)
+            return True
+            
+    def remaining(self):
+        with self._lock:
+            self._purge(time.time())
+            return self.per_hour - len(self._calls)
+
+    def load(self, path):
+        """Reprend les appels enregistrés par le processus qui préchargeait avant celui-ci"""
+        try:
+            with open(path) as f:
+                calls = json.load(f).get('calls', [])
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._calls = deque(sorted(set(self._calls) | set(calls)))
+            self._purge(time.time())
+
+    def save(self, path):
+        with self._lock:
+            self._purge(time.time())
+            calls = list(self._calls)
+        write_json_atomic(path, {'calls': calls})
+
+prefetch_budget = RequestBudget(PREFETCH_BUDGET_PER_HOUR)
+prefetch_stats = {'runs': 0, 'requests': 0, 'budget_exhausted': 0}
+
+def prefetch_request(endpoint, params):
+    """Préchauffe une entrée du cache API ; retourne False si le budget horaire est épuisé"""
+    if api_cache.get(f"{endpoint}?{params}"):
+        return True
+    if not prefetch_budget.try_spend():
+        return False
+    prefetch_stats['requests'] += 1
+    make_api_request(endpoint, params)
+    return True
+
+def run_prefetch():
+    """Précharge les matchs d'aujourd'hui et de demain, puis les données des matchs à venir par ordre de coup d'envoi"""
+    # Les entrées périmées sont rechargées et non servies telles quelles, après les pages des visiteurs
+    revalidating.set(True)
+    upstream_priority.set(PRIORITY_BACKGROUND)
+    prefetch_stats['runs'] += 1
+    now = datetime.now()
+    dates = [now.strftime('%Y-%m-%d'), (now + timedelta(days=1)).strftime('%Y-%m-%d')]
+    
+    def exhausted():
+        prefetch_stats['budget_exhausted'] += 1
+        return {'dates': dates, 'fixtures': len(upcoming), 'budget_remaining': 0}
+    
+    upcoming = []
+    for date in dates:
+        if not prefetch_request('fixtures', f'date={date}'):
+            return exhausted()
+        matches_data = api_cache.get(f"fixtures?date={date}")
+        for match in (matches_data or {}).get('response', []):
+            if (match['league']['id'] in LEAGUES
+                    and match['fixture']['status']['short'] == 'NS'
+                    and match['fixture']['timestamp'] > time.time()):
+                upcoming.append((date, match))
+    
+    # Les matchs les plus proches du coup d'envoi d'abord
+    upcoming.sort(key=lambda item: item[1]['fixture']['timestamp'])
+    
+    for date, match in upcoming:
+        if not prefetch_request('predictions', f"fixture={match['fixture']['id']}"):
+            return exhausted()
+    
+    # Les saisons en cours (current_season) sont lues dans cette réponse : l'appel est compté dans le budget
+    if upcoming and not prefetch_request('leagues', 'current=true'):
+        return exhausted()
+    
+    # Les listes du jour sont relues en entier depuis fixtures?date=, déjà en cache
+    for date in dates:
+        load_and_cache(f"matches_{date}", lambda: build_matches_bundle(date, full=True))
+    
+    for date, match in upcoming:
+        home_team_id = match['teams']['home']['id']
+        away_team_id = match['teams']['away']['id']
+        league_id = match['league']['id']
+        # Mêmes clés que load_match_context pour que la page de prédiction les trouve en cache
+        season = current_season(league_id, match['league']['season'])
+        requests_to_warm = [
+            ('teams/statistics', team_statistics_params(home_team_id, league_id, stats_season(home_team_id, league_id, season))),
+            ('teams/statistics', team_statistics_params(away_team_id, league_id, stats_season(away_team_id, league_id, season))),
+            ('fixtures/headtohead', f"h2h={home_team_id}-{away_team_id}&last=5")
+        ]
+        for endpoint, params in requests_to_warm:
+            if not prefetch_request(endpoint, params):
+                return exhausted()
+    
+    return {'dates': dates, 'fixtures': len(upcoming), 'budget_remaining': prefetch_budget.remaining()}
+
+def prefetch_loop():
+    """Précharge à chaque intervalle, dans un seul processus par hôte : les autres attendent que le verrou se libère"""
+    lock_file = None
+    while True:
+        if lock_file is None:
+            lock_file = try_host_lock(PREFETCH_STATE_PATH + '.lock')
+        if lock_file is not None:
+            prefetch_budget.load(PREFETCH_STATE_PATH)
+            try:
+                contextvars.Context().run(run_prefetch)
+            except Exception as e:
+                logger.error("Erreur lors du préchargement: %s", e)
+            try:
+                prefetch_budget.save(PREFETCH_STATE_PATH)
+            except OSError as e:
+                logger.warning("Budget du préchargement non enregistré: %s", e)
+        time.sleep(PREFETCH_INTERVAL)
+
+def start_prefetch_scheduler():
+    """Démarre le préchargement périodique dans un thread du worker (un seul worker de l'hôte précharge à la fois)"""
+    thread = threading.Thread(target=prefetch_loop, name='prefetch', daemon=True)
+    thread.start()
+    return thread
+
+@app.cli.command('prefetch')
+@click.option('--loop', is_flag=True, help="Relance le préchargement toutes les PREFETCH_INTERVAL secondes.")
+def prefetch_command(loop):
+    """Précharge le cache partagé (à lancer dans un processus séparé des workers)."""
+    if loop:
+        prefetch_loop()
+    else:
+        # Passe unique : les appels comptent dans le même budget horaire que la boucle
+        prefetch_budget.load(PREFETCH_STATE_PATH)
+        result = run_prefetch()
+        prefetch_budget.save(PREFETCH_STATE_PATH)
+        click.echo(json.dumps(result))
+
+# Répertoire des pages exportées par `flask export` ; vide : pas de copies statiques
+EXPORT_DIR = os.environ.get('EXPORT_DIR', '')
+# Âge maximal (en secondes) d'une copie servie à la place du rendu : au-delà, les workers reprennent la main
+EXPORT_MAX_AGE = int(os.environ.get('EXPORT_MAX_AGE', '900'))
+# Intervalle (en secondes) entre deux exports avec --loop
+EXPORT_INTERVAL = int(os.environ.get('EXPORT_INTERVAL', '300'))
+# URL publique du répertoire exporté (serveur statique, CDN) : si définie, les visiteurs y sont redirigés
+EXPORT_BASE_URL = os.environ.get('EXPORT_BASE_URL', '')
+# Marque les requêtes de l'export dans l'environnement WSGI : elles sont toujours rendues
+EXPORT_ENVIRON_KEY = 'prono.export'
+
+def export_page_key(path, args):
+    """Page exportée correspondant à une URL ('/', '/?region=<code>' ou '/prediction/<id>'), None sinon"""
+    if path == '/':
+        if not args or args.to_dict(flat=False) == {'region': ['all']}:
+            return '/'
+        region = args.get('region')
+        if list(args) == ['region'] and region in REGIONS:
+            return f'/?region={region}'
+    elif path.startswith('/prediction/') and not args:
+        return path
+    return None
+
+def export_file_name(key):
+    if key == '/':
+        return 'index.html'
+    if key.startswith('/?region='):
+        return f"region/{key.split('=', 1)[1]}.html"
+    return f"{key.strip('/')}.html"
+
+class StaticExport:
+    """Manifeste des pages exportées, relu quand il change ; seules les copies fraîches sont servies"""
+    def __init__(self, directory, max_age):
+        self.directory = directory
+        self.max_age = max_age
+        self.pages = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.stats = {'served': 0, 'not_modified': 0, 'redirected': 0, 'expired': 0}
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, 'manifest.json')
+
+    def count(self, event):
+        with self._lock:
+            self.stats[event] += 1
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            self.pages = {}
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+        try:
+            with open(self.manifest_path) as f:
+                self.pages = json.load(f).get('pages', {})
+        except (OSError, ValueError) as e:
+            logger.warning("Manifeste de l'export illisible: %s", e)
+
+    def lookup(self, key):
+        """Entrée du manifeste de la page si sa copie est fraîche, None sinon"""
+        if not self.directory:
+            return None
+        self._load()
+        entry = self.pages.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['checked_at'] > self.max_age:
+            self.count('expired')
+            return None
+        return entry
+
+    def read(self, entry, compressed):
+        try:
+            with open(os.path.join(self.directory, entry['file'] + ('.gz' if compressed else '')), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+static_export = StaticExport(EXPORT_DIR, EXPORT_MAX_AGE)
+
+@app.before_request
+def serve_static_export():
+    """Sert (ou redirige vers) la copie exportée d'une page commune à tous les visiteurs tant qu'elle est fraîche"""
+    if request.method != 'GET' or request.environ.get(EXPORT_ENVIRON_KEY):
+        return None
+    key = export_page_key(request.path, request.args)
+    entry = static_export.lookup(key) if key else None
+    if entry is None:
+        return None
+    if EXPORT_BASE_URL:
+        static_export.count('redirected')
+        return redirect(f"{EXPORT_BASE_URL.rstrip('/')}/{entry['file']}")
+
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = entry['digest'] + ('-gzip' if use_gzip else '')
+    if request.if_none_match.contains(etag):
+        static_export.count('not_modified')
+        response = make_response('', 304)
+    else:
+        body = static_export.read(entry, use_gzip)
+        if body is None:
+            return None
+        static_export.count('served')
+        response = make_response(body)
+        response.mimetype = 'text/html'
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={RESPONSE_MAX_AGE}, must-revalidate"
+    response.vary.add('Accept-Encoding')
+    return response
+
+def run_export(directory):
+    """Rend les pages communes à tous les visiteurs dans directory ; seules celles dont le contenu a changé sont réécrites"""
+    # Comme le préchargement : les entrées périmées sont rechargées, après les pages des visiteurs
+    revalidating.set(True)
+    upstream_priority.set(PRIORITY_BACKGROUND)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f).get('pages', {})
+    except (OSError, ValueError):
+        previous = {}
+    pages = {}
+    stats = {'written': 0, 'unchanged': 0, 'skipped': 0, 'removed': 0}
+    client = app.test_client()
+
+    def export(key):
+        response = client.get(key, environ_base={EXPORT_ENVIRON_KEY: True}, headers={'Accept-Encoding': 'identity'})
+        if response.status_code != 200 or response.mimetype != 'text/html' or 'Warning' in response.headers:
+            # Page indisponible ou construite à partir de données expirées : l'ancienne copie vieillit sans être remplacée
+            if key in previous:
+                pages[key] = previous[key]
+            stats['skipped'] += 1
+            return
+        body = response.get_data()
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = previous.get(key)
+        path = os.path.join(directory, export_file_name(key))
+        if entry is None or entry['digest'] != digest or not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_bytes_atomic(path, body, 0o644)
+            write_bytes_atomic(path + '.gz', gzip.compress(body), 0o644)
+            entry = {'file': export_file_name(key), 'digest': digest, 'size': len(body), 'updated_at': time.time()}
+            stats['written'] += 1
+        else:
+            stats['unchanged'] += 1
+        pages[key] = dict(entry, checked_at=time.time())
+
+    os.makedirs(directory, exist_ok=True)
+    export('/')
+    for region in REGIONS:
+        export(f'/?region={region}')
+    # Pages de prédiction des matchs du jour pas encore commencés, d'après la liste que '/' vient de charger
+    matches, _ = api_cache.lookup(f"matches_{datetime.now().strftime('%Y-%m-%d')}")
+    for match in matches or []:
+        if match['status']['short'] == 'NS':
+            export(f"/prediction/{match['id']}")
+
+    for key in previous.keys() - pages.keys():
+        for suffix in ('', '.gz'):
+            path = os.path.join(directory, previous[key]['file'] + suffix)
+            if os.path.exists(path):
+                os.unlink(path)
+        stats['removed'] += 1
+    write_json_atomic(manifest_path, {'generated_at': time.time(), 'pages': pages})
+    return dict(stats, pages=len(pages))
+
+@app.cli.command('export')
+@click.option('--out', 'directory', default=EXPORT_DIR or 'export', show_default=True,
+              help="Répertoire des pages exportées (EXPORT_DIR des workers).")
+@click.option('--loop', is_flag=True, help="Relance l'export toutes les EXPORT_INTERVAL secondes.")
+def export_command(directory, loop):
+    """Exporte en HTML statique (et gzip) les pages communes à tous les visiteurs, avec un manifeste."""
+    while True:
+        try:
+            click.echo(json.dumps(contextvars.Context().run(run_export, directory)))
+        except Exception as e:
+            if not loop:
+                raise
+            logger.error("Erreur lors de l'export: %s", e)
+        if not loop:
+            return
+        time.sleep(EXPORT_INTERVAL)
+
+# Statuts des matchs terminés dont le score final est connu
+COMPLETED_STATUSES = {'FT', 'AET', 'PEN'}
+# Nombre de matchs évalués par tâche envoyée aux processus de backtest
+BACKTEST_CHUNK_SIZE = 200
+
+def iter_backtest_fixtures(snapshot_dir, seasons=None):
+    """Parcourt les matchs terminés des ligues suivies enregistrés dans le répertoire d'instantanés.
+    
+    Disposition attendue : fixtures/<ligue>/<saison>.json (réponse de fixtures?league=&season=)
+    et predictions/<id du match>.json (réponse de predictions?fixture=). Un seul fichier
+    ligue-saison est chargé à la fois.
+    """
+    for path in sorted(glob.glob(os.path.join(snapshot_dir, 'fixtures', '*', '*.json'))):
+        league_id = safe_int_convert(os.path.basename(os.path.dirname(path)), None)
+        season = safe_int_convert(os.path.splitext(os.path.basename(path))[0], None)
+        if league_id not in LEAGUES or (seasons and season not in seasons):
+            continue
+        with open(path, encoding='utf-8') as f:
+            fixtures = json.load(f).get('response', [])
+        for match in fixtures:
+            if safe_get(match, 'fixture', 'status', 'short') in COMPLETED_STATUSES:
+                yield league_id, season, match
+
+def evaluate_prediction_markets(match, prediction):
+    """Résultat (True/False) de chaque marché prédit pour un match terminé"""
+    results = {'winner': check_prediction_accuracy(match, prediction)}
+    
+    fulltime = safe_get(match, 'score', 'fulltime', default={})
+    home_score, away_score = fulltime.get('home'), fulltime.get('away')
+    if home_score is None or away_score is None:
+        return results
+    predictions = prediction.get('predictions', {})
+    
+    # Double chance : l'équipe désignée ne perd pas
+    winner_id = safe_get(predictions, 'winner', 'id')
+    if predictions.get('win_or_draw') and winner_id:
+        if winner_id == match['teams']['home']['id']:
+            results['win_or_draw'] = home_score >= away_score
+        elif winner_id == match['teams']['away']['id']:
+            results['win_or_draw'] = away_score >= home_score
+    
+    # Under/over : valeur négative pour under, positive pour over
+    under_over = predictions.get('under_over')
+    if under_over:
+        line = float(under_over)
+        total = home_score + away_score
+        results['under_over'] = total > abs(line) if line > 0 else total < abs(line)
+    return results
+
+def evaluate_backtest_chunk(snapshot_dir, chunk):
+    """Évalue un lot de matchs (exécuté dans un processus séparé)"""
+    evaluated = []
+    for league_id, season, match in chunk:
+        fixture_id = match['fixture']['id']
+        path = os.path.join(snapshot_dir, 'predictions', f"{fixture_id}.json")
+        if not os.path.exists(path):
+            evaluated.append((fixture_id, league_id, season, None))
+            continue
+        with open(path, encoding='utf-8') as f:
+            prediction = json.load(f)
+        if 'response' in prediction:
+            prediction = prediction['response'][0] if prediction['response'] else None
+        markets = evaluate_prediction_markets(match, prediction) if prediction else None
+        evaluated.append((fixture_id, league_id, season, markets))
+    return evaluated
+
+class BacktestStore:
+    """Agrégats de précision par ligue, saison et marché, avec les matchs déjà évalués pour la reprise"""
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS backtest_results ('
+                          'league_id INTEGER, season INTEGER, market TEXT, '
+                          'evaluated INTEGER NOT NULL, correct INTEGER NOT NULL, '
+                          'PRIMARY KEY (league_id, season, market))')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS backtest_progress ('
+                          'fixture_id INTEGER PRIMARY KEY, league_id INTEGER, season INTEGER)')
+        self.conn.commit()
+        
+    def done(self, league_id, season):
+        rows = self.conn.execute('SELECT fixture_id FROM backtest_progress WHERE league_id = ? AND season = ?',
+                                 (league_id, season))
+        return {row[0] for row in rows}
+        
+    def record(self, evaluated):
+        """Ajoute les résultats d'un lot en une transaction ; un match déjà compté est ignoré"""
+        with self.conn:
+            for fixture_id, league_id, season, markets in evaluated:
+                if markets is None:
+                    continue
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO backtest_progress (fixture_id, league_id, season) VALUES (?, ?, ?)',
+                    (fixture_id, league_id, season))
+                if cursor.rowcount == 0:
+                    continue
+                for market, correct in markets.items():
+                    self.conn.execute(
+                        'INSERT INTO backtest_results (league_id, season, market, evaluated, correct) '
+                        'VALUES (?, ?, ?, 1, ?) ON CONFLICT (league_id, season, market) '
+                        'DO UPDATE SET evaluated = evaluated + 1, correct = correct + excluded.correct',
+                        (league_id, season, market, int(bool(correct))))
+                        
+    def summary(self):
+        return self.conn.execute('SELECT league_id, season, market, evaluated, correct FROM backtest_results '
+                                 'ORDER BY league_id, season, market').fetchall()
+
+def run_backtest(snapshot_dir, db_path, workers=None, seasons=None, chunk_size=BACKTEST_CHUNK_SIZE):
+    """Évalue en parallèle les prédictions enregistrées ; reprend là où le dernier passage s'est arrêté"""
+    store = BacktestStore(db_path)
+    workers = workers or os.cpu_count() or 1
+    stats = {'fixtures': 0, 'skipped': 0, 'missing_predictions': 0}
+    
+    def chunks():
+        chunk = []
+        done, done_key = set(), None
+        for league_id, season, match in iter_backtest_fixtures(snapshot_dir, seasons):
+            if done_key != (league_id, season):
+                done, done_key = store.done(league_id, season), (league_id, season)
+            if match['fixture']['id'] in done:
+                stats['skipped'] += 1
+                continue
+            chunk.append((league_id, season, match))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def collect(finished):
+        for future in finished:
+            evaluated = future.result()
+            stats['fixtures'] += len(evaluated)
+            stats['missing_predictions'] += sum(1 for item in evaluated if item[3] is None)
+            store.record(evaluated)
+    
+    # Nombre de lots en vol borné pour garder une mémoire constante quel que soit le nombre de saisons
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for chunk in chunks():
+            pending.add(executor.submit(evaluate_backtest_chunk, snapshot_dir, chunk))
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+        collect(wait(pending)[0])
+    return stats, store.summary()
+
+@app.cli.command('backtest')
+@click.argument('snapshot_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--db', 'db_path', default='backtest.sqlite3', show_default=True, help="Base SQLite des résultats.")
+@click.option('--workers', type=int, default=None, help="Nombre de processus (par défaut : nombre de CPU).")
+@click.option('--season', 'seasons', type=int, multiple=True, help="Saison à évaluer (répétable).")
+def backtest_command(snapshot_dir, db_path, workers, seasons):
+    """Mesure la précision des prédictions enregistrées dans SNAPSHOT_DIR."""
+    stats, summary = run_backtest(snapshot_dir, db_path, workers, set(seasons))
+    click.echo(json.dumps(stats))
+    for league_id, season, market, evaluated, correct in summary:
+        click.echo(f"{LEAGUES.get(league_id, league_id)}\t{season}\t{market}\t"
+                   f"{correct}/{evaluated}\t{correct / evaluated * 100:.1f}%")
+
+if PREFETCH_ENABLED:
+    start_prefetch_scheduler()
+
 if __name__ == '__main__':
     app.run(debug=False, host='0.0.0.0')
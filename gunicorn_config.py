@@ -1,3 +1,11 @@
+import os
+import tempfile
+
+# Les workers écrivent leurs métriques dans ce répertoire pour que /metrics les agrège
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'prono-metrics'))
+
+import metrics
+
 bind = "0.0.0.0:10000"
 workers = 2  # Réduit pour éviter la surcharge
 threads = 4
@@ -6,3 +14,14 @@ worker_class = "gthread"
 max_requests = 1000
 max_requests_jitter = 50
 log_level = "debug"
+
+def on_starting(server):
+    # Repartir de zéro : les instantanés d'une exécution précédente fausseraient les sommes
+    metrics.clear()
+
+def worker_exit(server, worker):
+    # Dernier instantané du worker avant son arrêt
+    metrics.flush()
+
+def child_exit(server, worker):
+    metrics.mark_process_dead(worker.pid)
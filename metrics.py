@@ -0,0 +1,270 @@
+"""Métriques au format texte Prometheus, agrégées entre les workers gunicorn.
+
+Chaque worker garde ses compteurs et histogrammes en mémoire et en écrit régulièrement un instantané
+JSON dans METRICS_DIR ; /metrics additionne les instantanés de tous les workers. Ce module n'importe
+pas l'application : gunicorn_config.py l'utilise depuis le processus maître.
+"""
+from bisect import bisect_left
+import fcntl
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+# Répertoire des instantanés par worker ; sans lui, /metrics ne montre que le processus qui répond
+METRICS_DIR = os.environ.get('METRICS_DIR')
+# Intervalle (en secondes) entre deux écritures de l'instantané d'un worker
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+# Bornes (en secondes) par défaut des histogrammes de durée
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = 'archive.lock'
+
+logger = logging.getLogger('prono')
+
+def label_key(labels):
+    return tuple(sorted((str(name), str(value)) for name, value in (labels or {}).items()))
+
+def empty_snapshot():
+    return {'counters': {}, 'gauges': {}, 'histograms': {}}
+
+def merge_snapshot(total, snapshot, gauges=True):
+    """Ajoute snapshot à total ; les jauges ne sont reprises que pour les workers vivants"""
+    for kind in ('counters', 'gauges') if gauges else ('counters',):
+        for key, value in snapshot.get(kind, {}).items():
+            total[kind][key] = total[kind].get(key, 0) + value
+    for key, histogram in snapshot.get('histograms', {}).items():
+        current = total['histograms'].get(key)
+        if current is None or len(current['counts']) != len(histogram['counts']):
+            total['histograms'][key] = {'counts': list(histogram['counts']), 'sum': histogram['sum']}
+        else:
+            current['counts'] = [a + b for a, b in zip(current['counts'], histogram['counts'])]
+            current['sum'] += histogram['sum']
+    return total
+
+def encode_snapshot(snapshot):
+    # Les clés (nom, labels) deviennent des chaînes JSON
+    return {kind: {json.dumps(key): value for key, value in samples.items()} for kind, samples in snapshot.items()}
+
+def decode_snapshot(data):
+    snapshot = empty_snapshot()
+    for kind in snapshot:
+        for key, value in data.get(kind, {}).items():
+            name, labels = json.loads(key)
+            snapshot[kind][(name, tuple(tuple(label) for label in labels))] = value
+    return snapshot
+
+def read_snapshot(path):
+    try:
+        with open(path) as f:
+            return decode_snapshot(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+def write_snapshot(path, snapshot):
+    """Écriture atomique : un lecteur voit l'ancien ou le nouvel instantané, jamais un fichier partiel"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(encode_snapshot(snapshot), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+
+def format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+class Registry:
+    """Compteurs, jauges et histogrammes d'un processus"""
+    def __init__(self, directory=None, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.definitions = {}  # nom -> (type, aide, bornes)
+        self.collectors = []  # (fonction, partagée entre les workers)
+        self._lock = threading.Lock()
+        self._pid = None
+        self.counters = {}
+        self.histograms = {}
+
+    def _check_process(self):
+        # Sous verrou : après un fork, les valeurs du parent restent dans son propre instantané
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        if self.directory:
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Écriture des métriques impossible: %s", e)
+
+    def counter(self, name, help_text):
+        self.definitions[name] = ('counter', help_text, None)
+
+    def gauge(self, name, help_text):
+        self.definitions[name] = ('gauge', help_text, None)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.definitions[name] = ('histogram', help_text, tuple(buckets))
+
+    def register_collector(self, collect, shared=False):
+        """collect() retourne des (nom, labels, valeur) lus au moment de l'export.
+
+        Une valeur partagée (par exemple la taille du cache SQLite commun) est lue une seule fois
+        par le processus qui répond, au lieu d'être additionnée entre les workers."""
+        self.collectors.append((collect, shared))
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, label_key(labels))
+        with self._lock:
+            self._check_process()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        buckets = self.definitions[name][2]
+        key = (name, label_key(labels))
+        with self._lock:
+            self._check_process()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'counts': [0] * (len(buckets) + 1), 'sum': 0.0}
+            histogram['counts'][bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+
+    def _collect(self, shared):
+        snapshot = empty_snapshot()
+        for collect, is_shared in self.collectors:
+            if is_shared != shared:
+                continue
+            try:
+                for name, labels, value in collect():
+                    kind = 'gauges' if self.definitions[name][0] == 'gauge' else 'counters'
+                    key = (name, label_key(labels))
+                    snapshot[kind][key] = snapshot[kind].get(key, 0) + value
+            except Exception as e:
+                logger.warning("Collecte de métriques impossible: %s", e)
+        return snapshot
+
+    def snapshot(self):
+        """Valeurs de ce processus, collecteurs non partagés compris"""
+        with self._lock:
+            self._check_process()
+            snapshot = {
+                'counters': dict(self.counters),
+                'gauges': {},
+                'histograms': {key: {'counts': list(h['counts']), 'sum': h['sum']} for key, h in self.histograms.items()}
+            }
+        return merge_snapshot(snapshot, self._collect(shared=False))
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'worker-{pid}.json')
+
+    def flush(self):
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            write_snapshot(self._path(os.getpid()), self.snapshot())
+
+    def _archive_lock(self, mode):
+        os.makedirs(self.directory, exist_ok=True)
+        lock = open(os.path.join(self.directory, LOCK_FILE), 'a')
+        fcntl.flock(lock, mode)
+        return lock
+
+    def aggregate(self):
+        """Somme des instantanés de tous les workers (vivants et terminés) et des valeurs partagées"""
+        if not self.directory:
+            total = self.snapshot()
+        else:
+            self.flush()
+            total = empty_snapshot()
+            with self._archive_lock(fcntl.LOCK_SH):
+                for path in glob.glob(os.path.join(self.directory, 'worker-*.json')):
+                    snapshot = read_snapshot(path)
+                    if snapshot:
+                        merge_snapshot(total, snapshot)
+                archive = read_snapshot(os.path.join(self.directory, ARCHIVE_FILE))
+                if archive:
+                    merge_snapshot(total, archive)
+        return merge_snapshot(total, self._collect(shared=True))
+
+    def mark_process_dead(self, pid):
+        """Verse les compteurs d'un worker terminé dans l'archive et abandonne ses jauges (hook child_exit)"""
+        if not self.directory:
+            return
+        with self._archive_lock(fcntl.LOCK_EX):
+            path = self._path(pid)
+            snapshot = read_snapshot(path)
+            if snapshot is None:
+                return
+            archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+            archive = read_snapshot(archive_path) or empty_snapshot()
+            write_snapshot(archive_path, merge_snapshot(archive, snapshot, gauges=False))
+            os.unlink(path)
+
+    def clear(self):
+        """Supprime les instantanés d'une exécution précédente (hook on_starting)"""
+        if not self.directory:
+            return
+        paths = glob.glob(os.path.join(self.directory, 'worker-*.json'))
+        paths.append(os.path.join(self.directory, ARCHIVE_FILE))
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def render(self, snapshot):
+        """Format texte d'exposition Prometheus (version 0.0.4)"""
+        samples = {}
+        for kind in ('counters', 'gauges', 'histograms'):
+            for (name, labels), value in snapshot[kind].items():
+                samples.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(self.definitions):
+            metric_type, help_text, buckets = self.definitions[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in sorted(samples.get(name, []), key=lambda sample: sample[0]):
+                if metric_type != 'histogram':
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), value['counts']):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else format_value(bound)
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {format_value(value["sum"])}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+registry = Registry(METRICS_DIR)
+
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+register_collector = registry.register_collector
+inc = registry.inc
+observe = registry.observe
+aggregate = registry.aggregate
+render = registry.render
+flush = registry.flush
+mark_process_dead = registry.mark_process_dead
+clear = registry.clear
@@ -0,0 +1,238 @@
+"""Fixtures communes : l'application est importée avec le cache mémoire seul et une API simulée en local."""
+import gzip
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# Avant l'import de l'application : pas de cache SQLite, de métriques partagées ni de préchargement
+os.environ['CACHE_BACKEND'] = 'memory'
+os.environ.pop('METRICS_DIR', None)
+os.environ['PREFETCH_ENABLED'] = '0'
+os.environ['LIVE_STATE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='prono-tests-'), 'live.json')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as prono  # noqa: E402
+
+# Ligues suivies (Premier League, La Liga, Ligue 1) et une ligue non suivie
+TRACKED_LEAGUES = (39, 140, 61)
+UNTRACKED_LEAGUE = 999
+CURRENT_SEASON = 2026
+
+
+def make_fixture(fixture_id, league_id=39, home=None, away=None, status='NS', timestamp=None, goals=(None, None)):
+    """Match au format de l'API (champs superflus compris, retirés par la projection)"""
+    timestamp = timestamp or int(time.time()) + 3600 + fixture_id
+    home = home or fixture_id * 10
+    away = away or fixture_id * 10 + 1
+    return {
+        'fixture': {'id': fixture_id, 'referee': 'Arbitre', 'timestamp': timestamp,
+                    'date': datetime.fromtimestamp(timestamp).strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+                    'status': {'short': status, 'long': status, 'elapsed': None}, 'venue': {'name': 'Stade'}},
+        'league': {'id': league_id, 'name': f'Ligue {league_id}', 'logo': 'league.png', 'country': 'Pays',
+                   'season': CURRENT_SEASON, 'round': 'Journée 1', 'flag': 'flag.png'},
+        'teams': {'home': {'id': home, 'name': f'Équipe {home}', 'logo': 'home.png', 'winner': None},
+                  'away': {'id': away, 'name': f'Équipe {away}', 'logo': 'away.png', 'winner': None}},
+        'goals': {'home': goals[0], 'away': goals[1]},
+        'score': {'halftime': {'home': None, 'away': None}, 'fulltime': {'home': None, 'away': None}}
+    }
+
+
+def make_prediction(match):
+    return {
+        'predictions': {'winner': {'id': match['teams']['home']['id'], 'name': match['teams']['home']['name'],
+                                   'comment': 'Win'},
+                        'win_or_draw': True, 'under_over': '-2.5', 'goals': {'home': '-1.5', 'away': '-1.5'},
+                        'advice': 'Double chance', 'percent': {'home': '50%', 'draw': '25%', 'away': '25%'}},
+        'league': match['league'],
+        'teams': {'home': dict(match['teams']['home'], last_5={'form': '60%'}),
+                  'away': dict(match['teams']['away'], last_5={'form': '40%'})},
+        'comparison': {'att': {'home': '60%', 'away': '40%'}, 'def': {'home': '55%', 'away': '45%'},
+                       'poisson_distribution': {'home': '70%', 'away': '30%'}},
+        'h2h': []
+    }
+
+
+class FakeUpstream:
+    """API simulée : répond à partir de la liste fixtures, compte les appels et peut renvoyer une erreur"""
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.fixtures = [make_fixture(100 + i, league_id=(TRACKED_LEAGUES + (UNTRACKED_LEAGUE,))[i % 4])
+                         for i in range(8)]
+        self.fail_status = None
+        self.raw_body = None  # corps renvoyé tel quel avec un statut 200 (réponse tronquée, JSON invalide)
+        self.delay = 0
+        with self._lock:
+            self.calls = []
+
+    def calls_to(self, endpoint, **params):
+        """Appels reçus sur endpoint dont les paramètres contiennent params"""
+        with self._lock:
+            calls = list(self.calls)
+        return [qs for path, qs in calls
+                if path == endpoint and all(qs.get(name) == str(value) for name, value in params.items())]
+
+    def fixture(self, fixture_id):
+        return next(match for match in self.fixtures if match['fixture']['id'] == fixture_id)
+
+    def body(self, endpoint, qs):
+        fixtures = self.fixtures
+        if endpoint == 'fixtures':
+            if 'id' in qs:
+                return [match for match in fixtures if str(match['fixture']['id']) == qs['id']]
+            if 'ids' in qs:
+                ids = qs['ids'].split('-')
+                return [match for match in fixtures if str(match['fixture']['id']) in ids]
+            if 'live' in qs:
+                return [match for match in fixtures if match['fixture']['status']['short'] in prono.LIVE_STATUSES]
+            if 'team' in qs:
+                team_id = int(qs['team'])
+                return [match for match in fixtures
+                        if team_id in (match['teams']['home']['id'], match['teams']['away']['id'])]
+            if 'league' in qs:
+                return [match for match in fixtures if str(match['league']['id']) == qs['league']]
+            return fixtures
+        if endpoint == 'predictions':
+            return [make_prediction(match) for match in fixtures if str(match['fixture']['id']) == qs['fixture']]
+        if endpoint == 'leagues':
+            return [{'league': {'id': league_id, 'name': name},
+                     'seasons': [{'year': CURRENT_SEASON - 1, 'current': False}, {'year': CURRENT_SEASON, 'current': True}]}
+                    for league_id, name in prono.LEAGUES.items()]
+        if endpoint == 'teams':
+            teams = {}
+            for match in fixtures:
+                for side in ('home', 'away'):
+                    team = match['teams'][side]
+                    if 'search' in qs and qs['search'].lower() not in team['name'].lower():
+                        continue
+                    if 'league' in qs and str(match['league']['id']) != qs['league']:
+                        continue
+                    teams[team['id']] = {'team': {'id': team['id'], 'name': team['name'], 'logo': team['logo'],
+                                                  'country': 'Pays'}, 'venue': {}}
+            return list(teams.values())
+        if endpoint == 'teams/statistics':
+            return {'team': {'id': int(qs['team'])}, 'league': {'id': int(qs['league']), 'season': int(qs['season'])},
+                    'form': 'WWDLW', 'fixtures': {'played': {'total': 10}},
+                    'goals': {'for': {'total': {'total': 15}, 'average': {'total': '1.5', 'home': '1.7', 'away': '1.3'}},
+                              'against': {'total': {'total': 10}, 'average': {'total': '1.0', 'home': '0.8', 'away': '1.2'}}}}
+        if endpoint == 'fixtures/headtohead':
+            return fixtures[:3]
+        if endpoint in ('fixtures/events', 'fixtures/statistics'):
+            return []
+        return None
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, raw=b'', headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                endpoint = url.path.replace('/v3/', '', 1)
+                qs = {name: values[0] for name, values in parse_qs(url.query).items()}
+                with upstream._lock:
+                    upstream.calls.append((endpoint, qs))
+                if upstream.delay:
+                    time.sleep(upstream.delay)
+                if upstream.fail_status:
+                    return self._send(upstream.fail_status)
+                if upstream.raw_body is not None:
+                    return self._send(200, upstream.raw_body, [('Content-Type', 'application/json')])
+                response = upstream.body(endpoint, qs)
+                if response is None:
+                    return self._send(404)
+                results = len(response) if isinstance(response, list) else 1
+                raw = json.dumps({'get': endpoint, 'results': results, 'response': response}).encode()
+                headers = [('Content-Type', 'application/json'),
+                           ('X-RateLimit-Limit', '300'), ('X-RateLimit-Remaining', '299')]
+                if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+                    raw = gzip.compress(raw)
+                    headers.append(('Content-Encoding', 'gzip'))
+                self._send(200, raw, headers)
+
+        return Handler
+
+
+@pytest.fixture(scope='session')
+def upstream():
+    fake = FakeUpstream()
+    threading.Thread(target=fake.server.serve_forever, daemon=True).start()
+
+    class Connection(http.client.HTTPConnection):
+        """Connexion « HTTPS » redirigée vers l'API simulée"""
+        def __init__(self, host, *args, **kwargs):
+            kwargs.pop('context', None)
+            super().__init__('127.0.0.1', fake.port, *args, **kwargs)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(http.client, 'HTTPSConnection', Connection)
+        yield fake
+    fake.server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(upstream, monkeypatch):
+    """Chaque test part de caches, disjoncteurs et quotas vides"""
+    upstream.reset()
+    monkeypatch.setattr(prono, 'api_cache', prono.APICache(None))
+    monkeypatch.setattr(prono, 'api_single_flight', prono.SingleFlight())
+    monkeypatch.setattr(prono, 'rate_limiter', prono.RateLimiter(prono.API_RATE_LIMIT_PER_MINUTE))
+    monkeypatch.setattr(prono, 'response_cache', prono.ResponseCache(prono.RESPONSE_CACHE_SIZE, prono.RESPONSE_CACHE_TTL))
+    monkeypatch.setattr(prono, 'fragment_cache', prono.FragmentCache(prono.FRAGMENT_CACHE_SIZE))
+    monkeypatch.setattr(prono, 'fixture_calendar', prono.FixtureCalendar())
+    prono.daily_bundles.clear()
+    prono.circuit_breakers.clear()
+    prono.team_stats_seasons.clear()
+    for cached in prono.fixture_caches.values():
+        cached.cache_clear()
+    # Les requêtes du client de test et les fonctions appelées directement partagent le contexte du thread
+    prono.request_deadline.set(None)
+    prono.served_stale.set(None)
+    prono.revalidating.set(False)
+    prono.upstream_priority.set(prono.PRIORITY_INTERACTIVE)
+    yield
+    prono.refresh_executor.submit(lambda: None).result()
+
+
+def age_api_cache(seconds):
+    """Vieillit toutes les entrées L1 du cache API, comme si elles avaient été écrites seconds plus tôt"""
+    cache = prono.api_cache
+    with cache._lock:
+        for key, (data, timestamp) in list(cache.cache.items()):
+            cache.cache[key] = (data, timestamp - seconds)
+
+
+@pytest.fixture
+def client():
+    return prono.app.test_client()
+
+
+@pytest.fixture
+def today():
+    return datetime.now().strftime('%Y-%m-%d')
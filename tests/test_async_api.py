@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+import app as prono
+from conftest import age_api_cache
+
+# Au-delà de la fenêtre de service périmé : seule la dernière réponse connue reste
+EXPIRED = 10 ** 7
+
+
+@pytest.fixture
+def async_client(upstream, monkeypatch):
+    """Client asyncio en HTTP clair vers l'API simulée"""
+    client = prono.AsyncAPIClient('127.0.0.1', 2, 60, port=upstream.port)
+    client.ssl_context = None
+    monkeypatch.setattr(prono, 'async_client', client)
+    yield client
+    if client._loop is not None:
+        client._loop.call_soon_threadsafe(client._loop.stop)
+
+
+@pytest.fixture
+def cache_threads(monkeypatch):
+    """Noms des threads qui ont accédé au cache API"""
+    threads = []
+    cache = prono.api_cache
+    for name in ('lookup', 'set', 'last_good'):
+        method = getattr(cache, name)
+
+        def spy(*args, _method=method, **kwargs):
+            threads.append(threading.current_thread().name)
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(cache, name, spy)
+    return threads
+
+
+def test_async_request_is_cached_off_the_loop(async_client, cache_threads, upstream):
+    data = async_client.run(prono.make_api_request_async, 'predictions', 'fixture=100')
+    assert data['response'][0]['predictions']['advice'] == 'Double chance'
+    assert async_client.run(prono.make_api_request_async, 'predictions', 'fixture=100') == data
+    assert len(upstream.calls_to('predictions', fixture=100)) == 1
+    assert cache_threads and 'api-loop' not in cache_threads
+
+
+def test_async_stale_fallback_runs_off_the_loop(async_client, cache_threads, upstream):
+    async_client.run(prono.make_api_request_async, 'predictions', 'fixture=100')
+    age_api_cache(EXPIRED)
+    upstream.fail_status = 503
+    data = async_client.run(prono.make_api_request_async, 'predictions', 'fixture=100')
+    assert data['_stale']
+    assert 'api-loop' not in cache_threads
+
+
+def test_sync_and_async_misses_on_a_key_call_upstream_once(async_client, upstream):
+    upstream.delay = 0.3
+    results = []
+    sync = threading.Thread(target=lambda: results.append(prono.make_api_request('predictions', 'fixture=100')))
+    sync.start()
+    while not upstream.calls_to('predictions'):
+        time.sleep(0.01)
+    results.append(async_client.run(prono.make_api_request_async, 'predictions', 'fixture=100'))
+    sync.join()
+    assert len(upstream.calls_to('predictions', fixture=100)) == 1
+    assert results[0] == results[1] and results[0]['response']
+
+
+def test_sync_miss_waits_for_the_async_load(async_client, upstream):
+    upstream.delay = 0.3
+    future = async_client.submit(prono.make_api_request_async, 'predictions', 'fixture=100')
+    while not upstream.calls_to('predictions'):
+        time.sleep(0.01)
+    data = prono.make_api_request('predictions', 'fixture=100')
+    assert future.result() == data and data['response']
+    assert len(upstream.calls_to('predictions', fixture=100)) == 1
+    assert prono.api_single_flight.stats['coalesced'] == 1
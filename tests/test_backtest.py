@@ -0,0 +1,53 @@
+import json
+
+import app as prono
+from conftest import make_fixture, make_prediction
+
+
+def finished(fixture_id, home_goals, away_goals):
+    match = make_fixture(fixture_id, status='FT', goals=(home_goals, away_goals))
+    match['score']['fulltime'] = {'home': home_goals, 'away': away_goals}
+    return match
+
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def build_snapshots(directory):
+    """Trois matchs terminés (dont un sans prédiction enregistrée), un match à venir et une ligue non suivie"""
+    matches = [finished(1, 2, 0), finished(2, 0, 1), finished(3, 1, 1)]
+    write_json(directory / 'fixtures' / '39' / '2025.json', {'response': matches + [make_fixture(4)]})
+    write_json(directory / 'fixtures' / '999' / '2025.json', {'response': [finished(5, 1, 0)]})
+    for match in matches[:2]:
+        write_json(directory / 'predictions' / f"{match['fixture']['id']}.json", {'response': [make_prediction(match)]})
+    return matches
+
+
+def winner_row(summary):
+    return next(row for row in summary if row[2] == 'winner')
+
+
+def test_second_run_resumes_without_counting_twice(tmp_path):
+    build_snapshots(tmp_path / 'snapshots')
+    db_path = str(tmp_path / 'backtest.sqlite3')
+    stats, summary = prono.run_backtest(str(tmp_path / 'snapshots'), db_path, workers=1, chunk_size=2)
+    assert stats == {'fixtures': 3, 'skipped': 0, 'missing_predictions': 1}
+    # La prédiction désigne l'équipe à domicile : juste pour le match 1, fausse pour le match 2
+    assert winner_row(summary) == (39, 2025, 'winner', 2, 1)
+
+    stats, again = prono.run_backtest(str(tmp_path / 'snapshots'), db_path, workers=1, chunk_size=2)
+    assert stats == {'fixtures': 1, 'skipped': 2, 'missing_predictions': 1}
+    assert again == summary
+
+
+def test_prediction_added_after_a_run_is_picked_up(tmp_path):
+    matches = build_snapshots(tmp_path / 'snapshots')
+    db_path = str(tmp_path / 'backtest.sqlite3')
+    prono.run_backtest(str(tmp_path / 'snapshots'), db_path, workers=1)
+    write_json(tmp_path / 'snapshots' / 'predictions' / '3.json', {'response': [make_prediction(matches[2])]})
+
+    stats, summary = prono.run_backtest(str(tmp_path / 'snapshots'), db_path, workers=1)
+    assert stats == {'fixtures': 1, 'skipped': 2, 'missing_predictions': 0}
+    assert winner_row(summary) == (39, 2025, 'winner', 3, 1)
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+import app as prono
+from conftest import CURRENT_SEASON, make_fixture
+
+
+def leagues_response(current_season):
+    return {'response': [{'league': {'id': 39}, 'seasons': [{'year': current_season, 'current': True}]}]}
+
+
+def test_past_season_reads_current_seasons_from_the_shared_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite3')
+    writer = prono.APICache(prono.SQLiteCacheBackend(path))
+    reader = prono.APICache(prono.SQLiteCacheBackend(path))
+    monkeypatch.setattr(prono, 'api_cache', reader)
+    # Saisons en cours écrites par un autre worker : absentes du L1 de celui-ci
+    writer.set('leagues?current=true', leagues_response(2030))
+    assert prono.cache_policy('teams/statistics?team=1&season=2029&league=39') == 'reference'
+    assert prono.cache_policy('teams/statistics?team=1&season=2030&league=39') == 'default'
+    assert 'leagues?current=true' not in reader.cache
+    assert reader.stats['l2']['hits'] == 0
+
+
+def fixtures(status):
+    return {'response': [make_fixture(5, status=status)]}
+
+
+@pytest.mark.parametrize('key, data, cache_class', [
+    ('fixtures?live=all', None, 'live'),
+    ('fixtures?date=2026-10-18', None, 'daily'),
+    ('matches_2026-10-18', None, 'daily'),
+    ('fixtures?team=10&next=5', None, 'default'),
+    ('fixtures?id=5', fixtures('1H'), 'live'),
+    ('fixtures?id=5', fixtures('FT'), 'finished'),
+    ('fixtures?id=5', fixtures('NS'), 'default'),
+    ('fixtures/statistics?fixture=5', fixtures('FT'), 'finished'),
+    ('fixtures/headtohead?h2h=1-2&last=5', None, 'reference'),
+    ('teams/statistics?team=1&season=2024&league=39', None, 'reference'),
+    ('teams/statistics?team=1&season=2026&league=39', None, 'default'),
+    ('teams?league=39&season=2026', None, 'reference'),
+    ('leagues?current=true', None, 'reference'),
+    ('predictions?fixture=5', None, 'default'),
+    ('odds?fixture=5', None, 'default'),
+])
+def test_cache_class_of_each_key(key, data, cache_class):
+    prono.api_cache.set('leagues?current=true', leagues_response(CURRENT_SEASON))
+    assert prono.cache_policy(key, data) == cache_class
+
+
+def test_live_responses_expire_before_daily_ones():
+    assert prono.CACHE_CLASSES['live'].ttl < prono.CACHE_CLASSES['daily'].ttl
+    assert prono.CACHE_CLASSES['live'].stale <= prono.CACHE_CLASSES['live'].ttl
+
+
+def test_first_matching_rule_wins():
+    # Un match terminé lu via fixtures?live= reste dans la classe live (règle sur les paramètres plus haut)
+    assert prono.cache_policy('fixtures?live=all', fixtures('FT')) == 'live'
+    assert prono.cache_policy('fixtures/headtohead?h2h=1-2', fixtures('1H')) == 'reference'
+
+
+def small_classes(monkeypatch, budget):
+    for name, cache_class in prono.CACHE_CLASSES.items():
+        monkeypatch.setitem(prono.CACHE_CLASSES, name, cache_class._replace(budget=budget))
+
+
+def payload(index):
+    return {'response': [{'id': index}] * 5}
+
+
+def test_class_budget_evicts_least_recently_read_entry_of_that_class(monkeypatch):
+    size = len(json.dumps(payload(0)))
+    small_classes(monkeypatch, 2 * size)
+    cache = prono.APICache(None)
+    cache.set('fixtures?live=all&league=1', payload(1))
+    cache.set('fixtures?live=all&league=2', payload(2))
+    cache.set('leagues?id=1', payload(3))
+    cache.get('fixtures?live=all&league=1')
+    cache.set('fixtures?live=all&league=3', payload(4))
+    assert set(cache.lru['live']) == {'fixtures?live=all&league=1', 'fixtures?live=all&league=3'}
+    assert cache.class_stats['live']['evictions'] == 1
+    # Les autres classes gardent leurs entrées
+    assert 'leagues?id=1' in cache.cache
+
+
+def test_global_budget_evicts_lowest_priority_class_first():
+    size = len(json.dumps(payload(0)))
+    cache = prono.APICache(None, budget=3 * size)
+    cache.set('leagues?id=1', payload(1))
+    cache.set('fixtures?date=2026-10-18', payload(2))
+    cache.set('fixtures?live=all', payload(3))
+    cache.set('teams?id=1', payload(4))
+    # live (priorité 1) part avant daily (3) et reference (4)
+    assert 'fixtures?live=all' not in cache.cache
+    assert {'leagues?id=1', 'fixtures?date=2026-10-18', 'teams?id=1'} <= set(cache.cache)
+    cache.set('odds?fixture=1', payload(5))
+    # Puis default (2), avant daily et reference
+    assert set(cache.cache) == {'leagues?id=1', 'fixtures?date=2026-10-18', 'teams?id=1'}
+    assert cache.class_stats['default']['evictions'] == 1
+    assert cache.class_stats['live']['evictions'] == 1
+
+
+def test_hit_miss_counters_per_class():
+    cache = prono.APICache(None)
+    assert cache.lookup('fixtures/headtohead?h2h=1-2') == (None, False)
+    cache.set('fixtures/headtohead?h2h=1-2', payload(1))
+    assert cache.get('fixtures/headtohead?h2h=1-2') == payload(1)
+    cache.set('fixtures?live=all', payload(2))
+    with cache._lock:
+        data, timestamp = cache.cache['fixtures?live=all']
+        cache.cache['fixtures?live=all'] = (data, timestamp - prono.CACHE_LIVE_TTL - 1)
+    assert cache.lookup('fixtures?live=all') == (payload(2), False)
+    assert cache.class_stats['reference'] == {'hits': 1, 'stale_hits': 0, 'misses': 1, 'evictions': 0}
+    assert cache.class_stats['live'] == {'hits': 0, 'stale_hits': 1, 'misses': 0, 'evictions': 0}
+    assert cache.class_stats['default']['misses'] == 0
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+import app as prono
+from conftest import make_fixture
+
+
+@pytest.fixture
+def hub(tmp_path, monkeypatch):
+    hub = prono.LiveHub(str(tmp_path / 'live.json'), prono.LIVE_POLL_INTERVAL)
+    monkeypatch.setattr(prono, 'live_hub', hub)
+    return hub
+
+
+def publish_live(hub, fixtures, fetched_at=None):
+    """État du direct tel que l'écrit le worker qui interroge l'API"""
+    fetched_at = fetched_at or time.time()
+    prono.write_json_atomic(hub.state_path, {
+        'seq': 1, 'polled_at': fetched_at, 'fetched_at': fetched_at,
+        'fixtures': {str(match['fixture']['id']): prono.live_fixture_summary(match) for match in fixtures}
+    })
+
+
+def summary(fixture_id, timestamp, status='NS', goals=None):
+    return {'id': fixture_id, 'timestamp': timestamp, 'status': {'short': status},
+            'goals': goals or {'home': None, 'away': None}}
+
+
+def test_merge_keeps_kickoff_order_and_reports_transitions():
+    bundle = prono.DailyBundle('2026-10-18')
+    assert bundle.merge([summary(1, 300), summary(2, 100), summary(3, 200)]) == ([], [])
+    assert [match['id'] for match in bundle.matches()] == [2, 3, 1]
+
+    # Score seul : le match a changé sans changer de statut
+    assert bundle.merge([summary(2, 100, goals={'home': 1, 'away': 0})]) == ([2], [])
+    # Statut et coup d'envoi : transitions
+    assert bundle.merge([summary(3, 200, status='1H'), summary(1, 50)]) == ([3, 1], [3, 1])
+    assert [match['id'] for match in bundle.matches()] == [1, 2, 3]
+    assert bundle.merge([summary(1, 50)]) == ([], [])
+
+
+def test_retain_drops_postponed_fixtures():
+    bundle = prono.DailyBundle('2026-10-18')
+    bundle.merge([summary(1, 100), summary(2, 200)])
+    bundle.retain([2])
+    assert [match['id'] for match in bundle.matches()] == [2]
+
+
+def started(upstream, status='1H'):
+    match = upstream.fixtures[0]
+    match['fixture']['status']['short'] = status
+    match['fixture']['timestamp'] = int(time.time()) - 600
+    return match
+
+
+def test_deltas_reuse_the_shared_live_state(upstream, hub, today):
+    match = started(upstream)
+    fixture_id = match['fixture']['id']
+    prono.build_matches_bundle(today)
+    prono.get_prediction(fixture_id)
+    prono.get_match_score(fixture_id)
+
+    match['goals'] = {'home': 1, 'away': 0}
+    match['fixture']['status']['elapsed'] = 12
+    publish_live(hub, [match])
+    upstream.calls.clear()
+    matches = {match['id']: match for match in prono.build_matches_bundle(today)}
+
+    assert upstream.calls == []
+    assert matches[fixture_id]['goals'] == {'home': 1, 'away': 0}
+    assert matches[fixture_id]['status']['elapsed'] == 12
+    # Le score a changé, pas le statut : la prédiction reste en cache, le score non
+    assert prono.get_prediction.cache_peek(fixture_id)[0]
+    assert not prono.get_match_score.cache_peek(fixture_id)[0]
+
+
+def test_deltas_without_recent_live_state_read_started_fixtures_by_id(upstream, hub, today):
+    match = started(upstream)
+    fixture_id = match['fixture']['id']
+    prono.build_matches_bundle(today)
+    prono.get_prediction(fixture_id)
+
+    publish_live(hub, [match], fetched_at=time.time() - 10 * prono.LIVE_POLL_INTERVAL)
+    match['fixture']['status']['short'] = 'FT'
+    upstream.calls.clear()
+    matches = {match['id']: match for match in prono.build_matches_bundle(today)}
+
+    assert upstream.calls_to('fixtures', live='all') == []
+    assert upstream.calls_to('fixtures', ids=str(fixture_id))
+    assert matches[fixture_id]['status']['short'] == 'FT'
+    # Passage à FT : la prédiction est rechargée
+    assert not prono.get_prediction.cache_peek(fixture_id)[0]
+
+
+def test_fixture_missing_from_live_state_is_read_by_id(upstream, hub, today):
+    match = started(upstream)
+    prono.build_matches_bundle(today)
+    publish_live(hub, [])
+    match['fixture']['status']['short'] = 'FT'
+    upstream.calls.clear()
+    prono.build_matches_bundle(today)
+    assert [call['ids'] for call in upstream.calls_to('fixtures') if 'ids' in call] == [str(match['fixture']['id'])]
+
+
+def test_live_fixtures_outside_the_bundle_are_ignored(upstream, hub, today):
+    prono.build_matches_bundle(today)
+    other = make_fixture(999, status='1H')
+    publish_live(hub, [other])
+    assert 999 not in {match['id'] for match in prono.build_matches_bundle(today)}
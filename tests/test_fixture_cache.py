@@ -0,0 +1,121 @@
+import pytest
+
+import app as prono
+from conftest import make_fixture
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prono.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def states(monkeypatch):
+    """État de chaque match tel que le voit fixture_cache, fixé par le test"""
+    states = {}
+    monkeypatch.setattr(prono, 'fixture_state', lambda fixture_id, result=None: states.get(fixture_id, 'unknown'))
+    return states
+
+
+@pytest.fixture
+def cached(monkeypatch):
+    """Fonction mise en cache par match qui compte ses appels ; results[id] fixe son résultat et les ids de stale
+    sont construits à partir d'une réponse expirée"""
+    monkeypatch.setattr(prono, 'fixture_caches', dict(prono.fixture_caches))
+    calls = []
+    results = {}
+    stale = set()
+
+    @prono.fixture_cache(maxsize=2, negative_ttl=5)
+    def load(fixture_id):
+        calls.append(fixture_id)
+        if fixture_id in stale:
+            prono.served_stale.get().append(f'fixtures?id={fixture_id}')
+        return results.get(fixture_id, {'response': [make_fixture(fixture_id)]})
+
+    load.calls = calls
+    load.results = results
+    load.stale = stale
+    return load
+
+
+def test_result_built_from_fresh_data_keeps_its_ttl_after_an_earlier_stale_fallback(cached, clock, states):
+    states[1] = 'finished'
+    # Une autre donnée de la même requête a été servie expirée
+    prono.served_stale.set(['fixtures?date=2026-10-18'])
+    cached(1)
+    clock.now += prono.FIXTURE_CACHE_TTL['finished'] - 1
+    cached(1)
+    assert cached.calls == [1]
+
+
+def test_result_built_from_stale_data_gets_the_negative_ttl(cached, clock, states):
+    states[1] = 'finished'
+    cached.stale.add(1)
+    prono.served_stale.set([])
+    cached(1)
+    clock.now += 6
+    cached(1)
+    assert cached.calls == [1, 1]
+
+
+@pytest.mark.parametrize('state', ['scheduled', 'live', 'finished', 'unknown'])
+def test_ttl_depends_on_fixture_state(cached, clock, states, state):
+    states[1] = state
+    cached(1)
+    clock.now += prono.FIXTURE_CACHE_TTL[state] - 1
+    cached(1)
+    assert cached.calls == [1]
+    clock.now += 2
+    cached(1)
+    assert cached.calls == [1, 1]
+    assert cached.cache_info()['expired'] == 1
+
+
+def test_live_fixture_expires_before_scheduled_and_finished_ones():
+    ttl = prono.FIXTURE_CACHE_TTL
+    assert ttl['live'] < ttl['scheduled'] < ttl['finished']
+
+
+@pytest.mark.parametrize('result', [None, {'response': []}])
+def test_failures_use_the_negative_ttl(cached, clock, states, result):
+    states[1] = 'finished'
+    cached.results[1] = result
+    assert cached(1) == result
+    clock.now += 4
+    cached(1)
+    assert cached.cache_info()['negative_hits'] == 1
+    clock.now += 2
+    cached(1)
+    assert cached.calls == [1, 1]
+
+
+def test_least_recently_used_fixture_is_evicted(cached, clock, states):
+    cached(1)
+    cached(2)
+    cached(1)
+    cached(3)
+    assert cached.cache_info()['evictions'] == 1
+    cached(1)
+    assert cached.calls == [1, 2, 3]
+    cached(2)
+    assert cached.calls == [1, 2, 3, 2]
+
+
+def test_ids_are_normalized(cached, clock, states):
+    cached(1)
+    cached('1')
+    assert cached.calls == [1]
+    assert cached.cache_peek('1') == (True, cached(1))
+    cached.cache_invalidate(1)
+    assert cached.cache_peek(1) == (False, None)
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import app as prono
+from conftest import age_api_cache, make_fixture
+
+
+def test_home_page_fixtures_reach_the_calendar(client, upstream):
+    client.get('/')
+    match = upstream.fixtures[0]
+    team_id = match['teams']['home']['id']
+    assert prono.fixture_calendar.get(match['fixture']['id'])['fixture']['id'] == match['fixture']['id']
+    assert [found['fixture']['id'] for found in prono.fixture_calendar.for_team(team_id)] == [match['fixture']['id']]
+
+
+def test_fixture_loaded_by_id_reaches_the_calendar(upstream):
+    fixture_id = upstream.fixtures[1]['fixture']['id']
+    assert prono.get_fixture(fixture_id)['fixture']['id'] == fixture_id
+    assert prono.fixture_calendar.get(fixture_id) is not None
+
+
+def test_status_change_from_deltas_updates_team_fixtures(upstream, today):
+    match = upstream.fixtures[0]
+    match['fixture']['status']['short'] = '1H'
+    match['fixture']['timestamp'] = int(time.time()) - 600
+    prono.build_matches_bundle(today)
+    team_id = match['teams']['home']['id']
+    assert prono.fixture_calendar.for_team(team_id, status='1H')
+
+    match['fixture']['status']['short'] = 'FT'
+    prono.build_matches_bundle(today)
+    assert prono.fixture_calendar.for_team(team_id, status='1H') == []
+    assert prono.fixture_calendar.for_team(team_id, status='FT')
+
+
+def test_stale_fallback_does_not_overwrite_the_calendar(upstream, today):
+    prono.build_matches_bundle(today)
+    prono.fixture_calendar.upsert([make_fixture(100, status='FT')])
+    age_api_cache(10 ** 7)
+    upstream.fail_status = 503
+    prono.served_stale.set([])
+    assert prono.build_matches_bundle(today, full=True)
+    assert prono.served_stale.get()
+    assert prono.fixture_calendar.get(100)['fixture']['status']['short'] == 'FT'
+
+
+def test_reads_are_safe_while_fixtures_are_upserted():
+    calendar = prono.FixtureCalendar()
+    errors = []
+    done = threading.Event()
+
+    def write():
+        count = 0
+        while not done.is_set():
+            count += 1
+            # Même équipe et même date : retirés puis ajoutés, les ensembles lus par les autres threads changent de taille
+            calendar.upsert([make_fixture(count % 200 + 1, home=1, timestamp=2000000000 + count % 7)])
+
+    def read():
+        try:
+            for _ in range(500):
+                calendar.for_team(1)
+                calendar.on_date('2033-05-18')
+        except RuntimeError as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    done.set()
+    writer.join()
+    assert errors == []
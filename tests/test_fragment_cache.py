@@ -0,0 +1,32 @@
+import app as prono
+from conftest import UNTRACKED_LEAGUE
+
+
+def render_home(client):
+    # Sans la page entière en cache, seuls les fragments peuvent être réutilisés
+    prono.response_cache.entries.clear()
+    return client.get('/').get_data(as_text=True)
+
+
+def test_unchanged_fixture_cards_are_reused(client, upstream):
+    tracked = sum(match['league']['id'] != UNTRACKED_LEAGUE for match in upstream.fixtures)
+    first = render_home(client)
+    assert prono.fragment_cache.stats['misses'] == tracked
+    assert render_home(client) == first
+    assert prono.fragment_cache.stats['hits'] == tracked
+
+
+def test_changed_fixture_card_is_rendered_again(client, upstream, today):
+    render_home(client)
+    matches, _ = prono.api_cache.lookup(f'matches_{today}')
+    changed = [dict(matches[0], goals={'home': 3, 'away': 0})] + matches[1:]
+    prono.api_cache.set(f'matches_{today}', changed)
+    render_home(client)
+    assert prono.fragment_cache.stats['invalidations'] == 1
+    assert prono.fragment_cache.stats['hits'] == len(matches) - 1
+
+
+def test_least_recently_used_fragments_are_evicted(client, monkeypatch):
+    monkeypatch.setattr(prono, 'fragment_cache', prono.FragmentCache(2))
+    render_home(client)
+    assert len(prono.fragment_cache.entries) == 2
@@ -0,0 +1,36 @@
+import time
+
+from conftest import UNTRACKED_LEAGUE
+
+
+def test_home_lists_tracked_fixtures_only(client, upstream):
+    response = client.get('/')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    for match in upstream.fixtures:
+        name = match['teams']['home']['name']
+        if match['league']['id'] == UNTRACKED_LEAGUE:
+            assert name not in html
+        else:
+            assert name in html
+
+
+def test_predictions_of_a_page_are_fetched_concurrently(client, upstream):
+    upstream.delay = 0.3
+    ids = [match['fixture']['id'] for match in upstream.fixtures[:4]]
+    started = time.monotonic()
+    response = client.get('/api/predictions?ids=' + ','.join(map(str, ids)))
+    elapsed = time.monotonic() - started
+    assert response.status_code == 200
+    assert set(response.get_json()) == {str(fixture_id) for fixture_id in ids}
+    assert all(response.get_json()[str(fixture_id)]['advice'] == 'Double chance' for fixture_id in ids)
+    # Quatre appels de 0,3 s en série dépasseraient 1,2 s
+    assert elapsed < 0.9
+    assert len(upstream.calls_to('predictions')) == 4
+
+
+def test_predictions_are_served_from_cache_afterwards(client, upstream):
+    ids = ','.join(str(match['fixture']['id']) for match in upstream.fixtures[:2])
+    client.get('/api/predictions?ids=' + ids)
+    client.get('/api/predictions?ids=' + ids)
+    assert len(upstream.calls_to('predictions')) == 2
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import app as prono
+from conftest import make_fixture, make_prediction
+
+FIXTURES_DOCUMENT = {
+    'get': 'fixtures', 'parameters': {'date': '2026-10-18'}, 'errors': [], 'results': 3,
+    'paging': {'current': 1, 'total': 1},
+    'response': [make_fixture(100, goals=(2, 1)), make_fixture(101, league_id=999), make_fixture(102, league_id=61)],
+    'ratio': 1.25, 'exponent': 1e5, 'negative': -3.5e-2, 'flag': True, 'nothing': None
+}
+PREDICTIONS_DOCUMENT = {'get': 'predictions', 'results': 1, 'response': [make_prediction(make_fixture(100))], 'score': 0.75}
+DOCUMENTS = [
+    FIXTURES_DOCUMENT,
+    PREDICTIONS_DOCUMENT,
+    {'x': 1.25},
+    {'x': 12e-3, 'response': [1, 2.5, -30, 4E+2]},
+    {'response': []},
+    {}
+]
+
+
+def chunked(raw, size):
+    return iter([raw[start:start + size] for start in range(0, len(raw), size)])
+
+
+@pytest.mark.parametrize('document', DOCUMENTS, ids=lambda document: document.get('get', str(document)))
+def test_every_chunk_size_decodes_the_same_document(document):
+    raw = json.dumps(document, separators=(',', ':')).encode('utf-8')
+    for size in range(1, len(raw) + 1):
+        assert prono.JSONStream(chunked(raw, size)).parse() == document, size
+
+
+def test_spaced_document_split_inside_numbers():
+    raw = b'{"x": 1.25 , "y": [1e5, 2] , "z": -0.5E-2}'
+    for size in range(1, len(raw) + 1):
+        assert prono.JSONStream(chunked(raw, size)).parse() == {'x': 1.25, 'y': [1e5, 2], 'z': -0.005}, size
+
+
+def test_filter_drops_items_while_reading():
+    raw = json.dumps(FIXTURES_DOCUMENT).encode('utf-8')
+    data = prono.JSONStream(chunked(raw, 7)).parse(prono.is_tracked_fixture)
+    assert [match['fixture']['id'] for match in data['response']] == [100, 102]
+    assert data['ratio'] == 1.25
+
+
+def test_truncated_document_raises():
+    raw = json.dumps(FIXTURES_DOCUMENT).encode('utf-8')[:-20]
+    with pytest.raises(ValueError):
+        prono.JSONStream(chunked(raw, 64)).parse()
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+import app as prono
+
+
+@pytest.fixture
+def hub(tmp_path, monkeypatch):
+    hub = prono.LiveHub(str(tmp_path / 'live.json'), poll_interval=1)
+    monkeypatch.setattr(prono, 'live_hub', hub)
+    yield hub
+    # Le thread du direct ne doit plus interroger l'API simulée pendant les tests suivants
+    hub.watched_until = 0
+    thread = hub._thread
+    if thread is not None:
+        thread.join(5)
+
+
+def test_home_without_live_or_imminent_fixture_does_not_follow_live(client):
+    html = client.get('/').get_data(as_text=True)
+    assert 'const liveWatch = false;' in html
+
+
+def test_home_with_live_fixture_follows_live(client, upstream):
+    upstream.fixtures[0]['fixture']['status']['short'] = '1H'
+    html = client.get('/').get_data(as_text=True)
+    assert 'const liveWatch = true;' in html
+
+
+def test_imminent_kickoff_is_watched():
+    now = time.time()
+    soon = {'status': {'short': 'NS'}, 'timestamp': now + prono.LIVE_WATCH_LEAD / 2}
+    later = {'status': {'short': 'NS'}, 'timestamp': now + prono.LIVE_WATCH_LEAD * 2}
+    finished = {'status': {'short': 'FT'}, 'timestamp': now - 3600}
+    assert prono.watches_live([later, soon], now)
+    assert not prono.watches_live([later, finished], now)
+
+
+def test_full_worker_answers_204_so_the_page_falls_back_to_polling(client, hub, monkeypatch):
+    monkeypatch.setattr(prono, 'LIVE_MAX_CLIENTS', 0)
+    response = client.get('/live')
+    assert response.status_code == 204
+    assert 'Retry-After' not in response.headers
+
+
+def test_polling_endpoint_keeps_the_hub_polling_upstream(client, hub, upstream):
+    upstream.fixtures[0]['fixture']['status']['short'] = '2H'
+    upstream.fixtures[0]['goals'] = {'home': 2, 'away': 1}
+    deadline = time.monotonic() + 5
+    fixtures = []
+    while not fixtures and time.monotonic() < deadline:
+        response = client.get('/api/live')
+        assert response.status_code == 200
+        fixtures = response.get_json()['fixtures']
+        time.sleep(0.1)
+    assert [(fixture['id'], fixture['goals']) for fixture in fixtures] == \
+        [(upstream.fixtures[0]['fixture']['id'], {'home': 2, 'away': 1})]
+    assert len(upstream.calls_to('fixtures', live='all')) == 1
+    assert hub.watched_until > time.monotonic()
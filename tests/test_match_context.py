@@ -0,0 +1,45 @@
+import app as prono
+from conftest import CURRENT_SEASON
+
+HOME, AWAY, LEAGUE = 1000, 1001, 39
+
+
+def without_statistics_for(upstream, monkeypatch, *seasons):
+    """L'API simulée répond sans moyennes de buts pour ces saisons (saison pas encore commencée)"""
+    body = upstream.body
+
+    def patched(endpoint, qs):
+        response = body(endpoint, qs)
+        if endpoint == 'teams/statistics' and int(qs['season']) in seasons:
+            response = dict(response, goals={})
+        return response
+
+    monkeypatch.setattr(upstream, 'body', patched)
+
+
+def test_season_without_statistics_falls_back_and_is_remembered(upstream, monkeypatch):
+    without_statistics_for(upstream, monkeypatch, CURRENT_SEASON)
+    home_stats, _, _ = prono.load_match_context(HOME, AWAY, LEAGUE, CURRENT_SEASON)
+    assert home_stats['league']['season'] == CURRENT_SEASON - 1
+    assert prono.team_stats_seasons[(HOME, LEAGUE, CURRENT_SEASON)] == CURRENT_SEASON - 1
+
+
+def test_remembered_older_season_does_not_hide_new_statistics(upstream):
+    # Mémorisé quand la saison en cours n'avait pas encore de données ; elle en a maintenant
+    prono.team_stats_seasons[(HOME, LEAGUE, CURRENT_SEASON)] = CURRENT_SEASON - 1
+    home_stats, _, _ = prono.load_match_context(HOME, AWAY, LEAGUE, CURRENT_SEASON)
+    assert home_stats['league']['season'] == CURRENT_SEASON
+    assert prono.team_stats_seasons[(HOME, LEAGUE, CURRENT_SEASON)] == CURRENT_SEASON
+    assert upstream.calls_to('teams/statistics', team=HOME, season=CURRENT_SEASON)
+
+
+def test_memo_of_a_previous_current_season_is_not_reused(upstream):
+    prono.team_stats_seasons[(HOME, LEAGUE, CURRENT_SEASON - 1)] = CURRENT_SEASON - 2
+    home_stats, _, _ = prono.load_match_context(HOME, AWAY, LEAGUE, CURRENT_SEASON)
+    assert home_stats['league']['season'] == CURRENT_SEASON
+
+
+def test_remembered_current_season_costs_one_request(upstream):
+    prono.team_stats_seasons[(HOME, LEAGUE, CURRENT_SEASON)] = CURRENT_SEASON
+    prono.load_match_context(HOME, AWAY, LEAGUE, CURRENT_SEASON)
+    assert len(upstream.calls_to('teams/statistics', team=HOME)) == 1
@@ -0,0 +1,58 @@
+import metrics
+
+
+def make_registry(directory):
+    registry = metrics.Registry(directory and str(directory))
+    registry.counter('requests_total', "Requêtes")
+    registry.gauge('queue_length', "File")
+    registry.histogram('duration_seconds', "Durée", buckets=(0.1, 1.0))
+    return registry
+
+
+def worker_snapshot(requests, queue, duration):
+    return {
+        'counters': {('requests_total', ()): requests},
+        'gauges': {('queue_length', ()): queue},
+        'histograms': {('duration_seconds', ()): {'counts': [1, 0, 0] if duration < 0.1 else [0, 1, 0], 'sum': duration}}
+    }
+
+
+def test_snapshots_of_all_workers_are_summed(tmp_path):
+    registry = make_registry(tmp_path)
+    metrics.write_snapshot(str(tmp_path / 'worker-1.json'), worker_snapshot(3, 2, 0.05))
+    metrics.write_snapshot(str(tmp_path / 'worker-2.json'), worker_snapshot(4, 1, 0.5))
+    total = registry.aggregate()
+    assert total['counters'][('requests_total', ())] == 7
+    assert total['gauges'][('queue_length', ())] == 3
+    assert total['histograms'][('duration_seconds', ())] == {'counts': [1, 1, 0], 'sum': 0.55}
+
+
+def test_dead_worker_keeps_its_counters_but_not_its_gauges(tmp_path):
+    registry = make_registry(tmp_path)
+    metrics.write_snapshot(str(tmp_path / 'worker-1.json'), worker_snapshot(3, 2, 0.05))
+    metrics.write_snapshot(str(tmp_path / 'worker-2.json'), worker_snapshot(4, 1, 0.5))
+    registry.mark_process_dead(1)
+    assert not (tmp_path / 'worker-1.json').exists()
+    total = registry.aggregate()
+    assert total['counters'][('requests_total', ())] == 7
+    assert total['gauges'][('queue_length', ())] == 1
+    assert total['histograms'][('duration_seconds', ())]['counts'] == [1, 1, 0]
+
+
+def test_render_uses_cumulative_buckets():
+    registry = make_registry(None)
+    registry.inc('requests_total', {'route': 'home'}, 2)
+    registry.observe('duration_seconds', 0.05)
+    registry.observe('duration_seconds', 5)
+    text = registry.render(registry.aggregate())
+    assert 'requests_total{route="home"} 2' in text
+    assert 'duration_seconds_bucket{le="0.1"} 1' in text
+    assert 'duration_seconds_bucket{le="+Inf"} 2' in text
+    assert 'duration_seconds_count 2' in text
+
+
+def test_metrics_endpoint_exposes_requests(client):
+    client.get('/')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'prono_requests_total{' in text
+    assert '# TYPE prono_request_duration_seconds histogram' in text
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+import app as prono
+from conftest import make_fixture
+
+
+def pmf(goals, rate):
+    return math.exp(-rate) * rate ** goals / math.factorial(goals)
+
+
+def hand_matrix(lambda_home, lambda_away, max_goals=prono.POISSON_MAX_GOALS):
+    """Probabilités des scores i-j calculées terme à terme, renormalisées après troncature"""
+    cells = {(i, j): pmf(i, lambda_home) * pmf(j, lambda_away)
+             for i in range(max_goals + 1) for j in range(max_goals + 1)}
+    total = sum(cells.values())
+    return {score: value / total for score, value in cells.items()}
+
+
+# (buts marqués domicile, encaissés domicile, marqués extérieur, encaissés extérieur) -> λ domicile, λ extérieur
+CASES = [((1.5, 1.0, 1.0, 1.5), (1.5, 1.0)), ((2.0, 0.4, 0.6, 1.2), (1.6, 0.5)), ((0.8, 2.2, 1.9, 0.9), (0.85, 2.05))]
+
+
+def test_lambdas_combine_attack_and_opposing_defence():
+    model = prono.poisson_scorelines(*zip(*(averages for averages, _ in CASES)))
+    assert np.allclose(model['lambda_home'], [lambdas[0] for _, lambdas in CASES])
+    assert np.allclose(model['lambda_away'], [lambdas[1] for _, lambdas in CASES])
+
+
+@pytest.mark.parametrize('averages, lambdas', CASES)
+def test_markets_match_hand_computed_poisson(averages, lambdas):
+    model = prono.poisson_scorelines(*([value] for value in averages))
+    cells = hand_matrix(*lambdas)
+    home = sum(p for (i, j), p in cells.items() if i > j)
+    draw = sum(p for (i, j), p in cells.items() if i == j)
+    away = sum(p for (i, j), p in cells.items() if i < j)
+    assert model['home'][0] == pytest.approx(home)
+    assert model['draw'][0] == pytest.approx(draw)
+    assert model['away'][0] == pytest.approx(away)
+    assert model['home'][0] + model['draw'][0] + model['away'][0] == pytest.approx(1)
+    assert model['btts'][0] == pytest.approx(sum(p for (i, j), p in cells.items() if i and j))
+    for line in prono.UNDER_OVER_LINES:
+        assert model['over'][line][0] == pytest.approx(sum(p for (i, j), p in cells.items() if i + j > line))
+
+
+def test_lower_triangle_is_home_wins():
+    # Avec une équipe extérieure qui ne marque jamais, toute la masse hors 0-0 est sous la diagonale
+    model = prono.poisson_scorelines([2.0], [0.0], [0.0], [2.0])
+    assert model['lambda_away'][0] == pytest.approx(1e-6)
+    assert model['home'][0] == pytest.approx(1 - math.exp(-2.0) / sum(pmf(i, 2.0) for i in range(11)), abs=1e-5)
+    assert model['away'][0] == pytest.approx(0, abs=1e-5)
+    swapped = prono.poisson_scorelines([0.0], [2.0], [2.0], [0.0])
+    assert swapped['away'][0] == pytest.approx(model['home'][0])
+
+
+def test_under_over_two_and_a_half_counts_three_goals_or_more():
+    # La somme des buts suit une loi de Poisson de paramètre λ domicile + λ extérieur = 2,5
+    model = prono.poisson_scorelines([1.5], [1.0], [1.0], [1.5])
+    under = sum(pmf(goals, 2.5) for goals in range(3))
+    truncation = sum(pmf(i, 1.5) * pmf(j, 1.0) for i in range(11) for j in range(11))
+    assert 1 - model['over'][2.5][0] == pytest.approx(under / truncation)
+    assert model['matrix'][0][0, 0] == pytest.approx(math.exp(-2.5) / truncation)
+
+
+def test_model_predictions_skip_matches_without_statistics():
+    stats = {'goals': {'for': {'average': {'total': '1.5', 'home': '1.5', 'away': '1.5'}},
+                       'against': {'average': {'total': '1.0', 'home': '1.0', 'away': '1.0'}}}}
+    results = prono.model_predictions([(stats, stats), (stats, {}), (None, stats)])
+    assert results[1] is None and results[2] is None
+    percent = results[0]['percent']
+    assert percent['home'] + percent['draw'] + percent['away'] == pytest.approx(100, abs=0.2)
+    assert results[0]['goals_home'] == 1.25 and results[0]['goals_away'] == 1.25
+    assert results[0]['score'] == '1-1'
+
+
+def test_attach_model_predictions_uses_venue_averages(upstream):
+    matches = [make_fixture(100), make_fixture(101)]
+    prono.attach_model_predictions(matches)
+    # API simulée : 1,7 marqués à domicile, 1,2 encaissés à l'extérieur, 1,3 marqués à l'extérieur, 0,8 encaissés à domicile
+    assert matches[0]['model']['goals_home'] == 1.45
+    assert matches[0]['model']['goals_away'] == 1.05
+    assert len(upstream.calls_to('teams/statistics')) == 4
@@ -0,0 +1,52 @@
+import contextvars
+import time
+
+import app as prono
+
+
+def test_host_lock_is_held_by_a_single_owner(tmp_path):
+    path = str(tmp_path / 'prefetch.lock')
+    owner = prono.try_host_lock(path)
+    assert owner is not None
+    assert prono.try_host_lock(path) is None
+    owner.close()
+    other = prono.try_host_lock(path)
+    assert other is not None
+    other.close()
+
+
+def test_budget_is_handed_over_between_processes(tmp_path):
+    path = str(tmp_path / 'prefetch.json')
+    first = prono.RequestBudget(3)
+    assert first.try_spend() and first.try_spend()
+    first.save(path)
+    # Le processus qui prend la suite repart des appels déjà faits dans l'heure
+    second = prono.RequestBudget(3)
+    second.load(path)
+    assert second.remaining() == 1
+    assert second.try_spend()
+    assert not second.try_spend()
+
+
+def test_expired_calls_are_not_handed_over(tmp_path):
+    path = str(tmp_path / 'prefetch.json')
+    prono.write_json_atomic(path, {'calls': [time.time() - 7200]})
+    budget = prono.RequestBudget(1)
+    budget.load(path)
+    assert budget.remaining() == 1
+
+
+def test_every_prefetch_call_is_counted_in_the_budget(upstream, monkeypatch):
+    budget = prono.RequestBudget(1000)
+    monkeypatch.setattr(prono, 'prefetch_budget', budget)
+    result = contextvars.Context().run(prono.run_prefetch)
+    assert result['fixtures'] > 0
+    assert upstream.calls_to('leagues')
+    assert len(upstream.calls) == 1000 - budget.remaining()
+
+
+def test_prefetch_stops_when_the_budget_is_exhausted(upstream, monkeypatch):
+    monkeypatch.setattr(prono, 'prefetch_budget', prono.RequestBudget(3))
+    result = contextvars.Context().run(prono.run_prefetch)
+    assert result['budget_remaining'] == 0
+    assert len(upstream.calls) == 3
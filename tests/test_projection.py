@@ -0,0 +1,32 @@
+import app as prono
+import metrics
+
+
+def projection_bytes(snapshot, endpoint, stage):
+    key = ('prono_upstream_projection_bytes_total', metrics.label_key({'endpoint': endpoint, 'stage': stage}))
+    return snapshot['counters'].get(key, 0)
+
+
+def test_projection_keeps_only_rendered_fields(upstream):
+    data = prono.fetch_api_response('fixtures', 'id=100')
+    match = data['response'][0]
+    assert set(match) == {'fixture', 'league', 'teams', 'goals', 'score'}
+    assert 'referee' not in match['fixture'] and 'venue' not in match['fixture']
+    assert 'flag' not in match['league']
+
+
+def test_daily_list_drops_untracked_leagues(upstream, today):
+    data = prono.fetch_api_response('fixtures', f'date={today}')
+    assert {match['league']['id'] for match in data['response']} <= set(prono.LEAGUES)
+    assert len(data['response']) < len(upstream.fixtures)
+
+
+def test_saved_bytes_are_exported_per_endpoint(upstream):
+    before = metrics.registry.snapshot()
+    prono.fetch_api_response('predictions', 'fixture=100')
+    after = metrics.registry.snapshot()
+    raw = projection_bytes(after, 'predictions', 'raw') - projection_bytes(before, 'predictions', 'raw')
+    stored = projection_bytes(after, 'predictions', 'stored') - projection_bytes(before, 'predictions', 'stored')
+    assert 0 < stored < raw
+    key = ('prono_upstream_projected_responses_total', metrics.label_key({'endpoint': 'predictions'}))
+    assert after['counters'][key] == before['counters'].get(key, 0) + 1
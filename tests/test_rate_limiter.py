@@ -0,0 +1,61 @@
+import threading
+import time
+
+import app as prono
+
+
+def drained(per_minute):
+    limiter = prono.RateLimiter(per_minute)
+    limiter.tokens = 0.0
+    return limiter
+
+
+def test_interactive_calls_are_served_before_waiting_background_calls():
+    # Un jeton toutes les 0,1 s
+    limiter = drained(600)
+    order = []
+
+    def acquire(name, priority):
+        assert limiter.acquire(priority, 5)
+        order.append(name)
+
+    background = threading.Thread(target=acquire, args=('background', prono.PRIORITY_BACKGROUND))
+    background.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=acquire, args=('interactive', prono.PRIORITY_INTERACTIVE))
+    interactive.start()
+    background.join()
+    interactive.join()
+    assert order == ['interactive', 'background']
+    assert limiter.stats['throttled'] == 2
+    assert limiter.queue_length() == 0
+
+
+def test_call_gives_up_after_its_timeout():
+    limiter = drained(6)
+    assert not limiter.acquire(prono.PRIORITY_INTERACTIVE, 0.05)
+    assert limiter.stats['rejected'] == 1
+    assert limiter.queue_length() == 0
+
+
+def test_429_blocks_until_retry_after():
+    limiter = prono.RateLimiter(600)
+    limiter.update(429, {'retry-after': '1'})
+    assert not limiter.acquire(prono.PRIORITY_INTERACTIVE, 0.2)
+    assert limiter.stats['rate_limited_responses'] == 1
+
+
+def test_quota_headers_adjust_the_bucket():
+    limiter = prono.RateLimiter(600)
+    limiter.update(200, {'x-ratelimit-limit': '30', 'x-ratelimit-remaining': '0'})
+    assert limiter.capacity == 30
+    assert not limiter.acquire(prono.PRIORITY_INTERACTIVE, 0.05)
+
+
+def test_wait_time_is_exported(client, monkeypatch):
+    limiter = drained(600)
+    monkeypatch.setattr(prono, 'rate_limiter', limiter)
+    assert limiter.acquire(prono.PRIORITY_BACKGROUND, 5)
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'prono_rate_limiter_wait_seconds_count{priority="background"}' in text
+    assert 'prono_rate_limiter_queue_length 0' in text
@@ -0,0 +1,113 @@
+import contextvars
+import threading
+import time
+
+import app as prono
+import metrics
+from conftest import age_api_cache
+
+# Au-delà de la fenêtre de service périmé de toutes les classes : seule la dernière réponse connue reste
+EXPIRED = 10 ** 7
+
+
+def upstream_count(endpoint, status):
+    key = ('prono_upstream_responses_total', metrics.label_key({'endpoint': endpoint, 'status': status}))
+    return metrics.registry.counters.get(key, 0)
+
+
+def start_outage(upstream, today):
+    """Données du jour expirées, relecture complète due et API en erreur"""
+    age_api_cache(EXPIRED)
+    prono.response_cache.entries.clear()
+    prono.daily_bundles[today].full_synced_at = 0
+    upstream.fail_status = 503
+
+
+def test_page_built_during_outage_is_not_cached_as_fresh(client, upstream, today):
+    assert 'Warning' not in client.get('/').headers
+    start_outage(upstream, today)
+
+    response = client.get('/')
+    assert response.headers['Warning'] == '110 - "Response is Stale"'
+    assert upstream.fixtures[0]['teams']['home']['name'] in response.get_data(as_text=True)
+    assert prono.api_cache.lookup(f'matches_{today}') == (None, False)
+
+    upstream.fail_status = None
+    response = client.get('/')
+    assert 'Warning' not in response.headers
+    assert prono.api_cache.lookup(f'matches_{today}')[1]
+
+
+def test_requests_coalesced_on_a_stale_load_are_flagged(upstream, today):
+    prono.app.test_client().get('/')
+    start_outage(upstream, today)
+    upstream.delay = 0.3
+    responses = []
+
+    def fetch():
+        responses.append(prono.app.test_client().get('/'))
+
+    threads = [threading.Thread(target=fetch) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(upstream.calls_to('fixtures', date=today)) == 2
+    assert all(response.headers.get('Warning') for response in responses)
+
+
+def test_unparsable_body_is_recorded_once(upstream):
+    upstream.raw_body = b'{"response": ['
+    before = upstream_count('predictions', 200), upstream_count('predictions', 'error')
+    assert prono.fetch_api_response('predictions', 'fixture=100') is None
+    assert upstream_count('predictions', 200) == before[0] + 1
+    assert upstream_count('predictions', 'error') == before[1]
+    assert prono.circuit_breaker('predictions').failures == 0
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    breaker = prono.CircuitBreaker(threshold=2, reset_timeout=0.05)
+    breaker.record(False)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.is_open and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    # Un seul appel d'essai à la fois
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.is_open and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(True)
+    assert not breaker.is_open and breaker.allow()
+    assert breaker.stats['opened'] == 1
+
+
+def test_cancelled_probe_can_be_retried():
+    breaker = prono.CircuitBreaker(threshold=1, reset_timeout=0)
+    breaker.record(False)
+    assert breaker.allow()
+    breaker.cancel()
+    assert breaker.allow()
+
+
+def test_open_breaker_fails_fast_without_calling_upstream(upstream):
+    upstream.fail_status = 500
+    for _ in range(prono.CIRCUIT_FAILURE_THRESHOLD):
+        prono.fetch_api_response('fixtures/events', 'fixture=100')
+    calls = len(upstream.calls_to('fixtures/events'))
+    upstream.fail_status = None
+    assert prono.fetch_api_response('fixtures/events', 'fixture=100') is None
+    assert len(upstream.calls_to('fixtures/events')) == calls
+
+
+def test_passed_deadline_skips_upstream(upstream):
+    def call():
+        prono.request_deadline.set(time.monotonic() - 1)
+        return prono.fetch_api_response('predictions', 'fixture=100')
+
+    assert contextvars.Context().run(call) is None
+    assert upstream.calls_to('predictions') == []
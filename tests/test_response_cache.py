@@ -0,0 +1,71 @@
+import app as prono
+
+
+def test_page_is_served_from_cache(client):
+    first = client.get('/')
+    second = client.get('/')
+    assert second.get_data() == first.get_data()
+    assert prono.response_cache.stats['hits'] == 1
+
+
+def test_unrelated_write_keeps_cached_page(client, upstream):
+    client.get('/')
+    # /api/predictions écrit des prédictions dans le cache API, que la page d'accueil ne lit pas
+    client.get(f"/api/predictions?ids={upstream.fixtures[0]['fixture']['id']}")
+    prono.api_cache.set('teams?search=zzz', {'response': []})
+    client.get('/')
+    assert prono.response_cache.stats['hits'] == 1
+    assert prono.response_cache.stats['invalidations'] == 0
+
+
+def test_page_is_rendered_again_when_its_data_changes(client, upstream, today):
+    client.get('/')
+    matches, _ = prono.api_cache.lookup(f'matches_{today}')
+    renamed = [dict(match, teams={'home': dict(match['teams']['home'], name='Nouveau nom'), 'away': match['teams']['away']})
+               for match in matches]
+    prono.api_cache.set(f'matches_{today}', renamed)
+    response = client.get('/')
+    assert 'Nouveau nom' in response.get_data(as_text=True)
+    assert prono.response_cache.stats['invalidations'] == 1
+
+
+def test_invalidated_entry_invalidates_page(client, today):
+    client.get('/')
+    prono.api_cache.invalidate(f'matches_{today}')
+    client.get('/')
+    assert prono.response_cache.stats['hits'] == 0
+
+
+def test_not_modified_with_matching_etag(client):
+    etag = client.get('/').headers['ETag']
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+
+def test_prediction_page_depends_on_its_fixture_only(client, upstream):
+    prono.sync_fixture_calendar()
+    fixture_id, other_id = (match['fixture']['id'] for match in upstream.fixtures[:2])
+    assert client.get(f'/prediction/{fixture_id}').status_code == 200
+
+    prono.invalidate_fixture_data([other_id], [other_id])
+    client.get(f'/api/predictions?ids={other_id}')
+    client.get(f'/prediction/{fixture_id}')
+    assert prono.response_cache.stats['hits'] == 1
+
+    # La prédiction de ce match est oubliée : la page est reconstruite
+    prono.invalidate_fixture_data([fixture_id], [fixture_id])
+    client.get(f'/prediction/{fixture_id}')
+    assert prono.response_cache.stats['hits'] == 1
+    assert prono.response_cache.stats['invalidations'] == 1
+
+
+def test_prediction_page_read_through_fixture_cache_keeps_dependencies(client, upstream):
+    prono.sync_fixture_calendar()
+    fixture_id = upstream.fixtures[0]['fixture']['id']
+    # Prédiction déjà en cache par match : la page ne relit pas le cache API mais en dépend toujours
+    client.get(f'/api/predictions?ids={fixture_id}')
+    client.get(f'/prediction/{fixture_id}')
+    prono.api_cache.invalidate(f'predictions?fixture={fixture_id}')
+    client.get(f'/prediction/{fixture_id}')
+    assert prono.response_cache.stats['invalidations'] == 1
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import app as prono
+
+
+def test_concurrent_calls_on_a_key_run_once():
+    flight = prono.SingleFlight()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'données'
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('clé', load, 5))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ['données'] * 5
+    assert flight.stats == {'calls': 1, 'coalesced': 4, 'timeouts': 0}
+
+
+def test_follower_gives_up_after_timeout():
+    flight = prono.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'tard'
+
+    leader = threading.Thread(target=flight.do, args=('clé', slow, 5))
+    leader.start()
+    started.wait(5)
+    assert flight.do('clé', lambda: 'jamais', 0.05) is None
+    release.set()
+    leader.join()
+    assert flight.stats['timeouts'] == 1
+    # La clé est libérée : l'appel suivant s'exécute
+    assert flight.do('clé', lambda: 'ensuite', 1) == 'ensuite'
+
+
+def test_concurrent_misses_call_upstream_once(upstream):
+    upstream.delay = 0.2
+    results = []
+
+    def fetch():
+        results.append(prono.make_api_request('predictions', 'fixture=100'))
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(upstream.calls_to('predictions', fixture=100)) == 1
+    assert all(result == results[0] for result in results)
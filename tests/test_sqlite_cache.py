@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+import app as prono
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cache.sqlite3')
+
+
+def workers(path):
+    """Deux caches API comme dans deux workers : L1 séparés, même fichier SQLite"""
+    return prono.APICache(prono.SQLiteCacheBackend(path)), prono.APICache(prono.SQLiteCacheBackend(path))
+
+
+def test_entry_written_by_a_worker_is_read_by_another(path):
+    first, second = workers(path)
+    first.set('teams?id=1', {'response': [{'id': 1}]})
+    assert second.lookup('teams?id=1') == ({'response': [{'id': 1}]}, True)
+    assert second.stats['l2']['hits'] == 1
+    # Remontée en L1 : la lecture suivante ne touche plus le fichier
+    second.get('teams?id=1')
+    assert second.stats['l1']['hits'] == 1
+
+
+def test_invalidation_reaches_the_other_worker_l2(path):
+    first, second = workers(path)
+    first.set('teams?id=1', {'response': []})
+    second.invalidate('teams?id=1')
+    # Le L1 du premier worker garde sa copie ; un worker démarré ensuite ne la trouve plus
+    assert prono.APICache(prono.SQLiteCacheBackend(path)).lookup('teams?id=1') == (None, False)
+
+
+def test_expired_row_is_not_served_but_stays_the_last_good_answer(path):
+    backend = prono.SQLiteCacheBackend(path)
+    now = time.time()
+    backend.set('fixtures?id=1', {'response': ['ancien']}, now - 100, now - 10)
+    assert backend.get('fixtures?id=1') is None
+    assert backend.last_good('fixtures?id=1') == ({'response': ['ancien']}, now - 100)
+
+    cache = prono.APICache(backend)
+    assert cache.lookup('fixtures?id=1') == (None, False)
+    assert cache.last_good('fixtures?id=1') == {'response': ['ancien']}
+
+
+def test_sweep_removes_rows_expired_beyond_retention(path):
+    # Pas de purge automatique pendant les écritures : elle est lancée à la main
+    backend = prono.SQLiteCacheBackend(path, sweep_interval=float('inf'), retention=60)
+    now = time.time()
+    backend.set('old', {'v': 1}, now - 1000, now - 120)
+    backend.set('recent', {'v': 2}, now - 100, now - 30)
+    backend.set('fresh', {'v': 3}, now, now + 60)
+    assert backend.sweep() == 1
+    assert backend.last_good('old') is None
+    assert backend.last_good('recent') is not None
+    assert backend.usage()[0] == 2
+
+
+def test_concurrent_writers_do_not_lose_entries(path):
+    backends = [prono.SQLiteCacheBackend(path) for _ in range(4)]
+    errors = []
+
+    def write(worker, backend):
+        try:
+            for index in range(50):
+                now = time.time()
+                backend.set(f'key-{worker}-{index}', {'worker': worker, 'index': index}, now, now + 60)
+                backend.set('shared', {'worker': worker, 'index': index}, now, now + 60)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(worker, backend)) for worker, backend in enumerate(backends)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    reader = prono.SQLiteCacheBackend(path)
+    assert reader.usage()[0] == 4 * 50 + 1
+    assert reader.get('key-3-49')[0] == {'worker': 3, 'index': 49}
+    assert reader._connection().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
@@ -0,0 +1,83 @@
+import contextvars
+import gzip
+import json
+
+import pytest
+
+import app as prono
+
+MARKER = b'<html>copie exportee</html>'
+
+
+def export(directory):
+    # Comme la commande : contexte séparé, pour ne pas laisser revalidating aux requêtes suivantes
+    return contextvars.Context().run(prono.run_export, str(directory))
+
+
+def manifest(directory):
+    return json.loads((directory / 'manifest.json').read_text())['pages']
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    """Pages exportées dans tmp_path ; la page d'accueil exportée est remplacée par MARKER pour la reconnaître"""
+    export(tmp_path)
+    (tmp_path / 'index.html').write_bytes(MARKER)
+    (tmp_path / 'index.html.gz').write_bytes(gzip.compress(MARKER))
+    monkeypatch.setattr(prono, 'static_export', prono.StaticExport(str(tmp_path), 900))
+    prono.response_cache.entries.clear()
+    return tmp_path
+
+
+def test_export_writes_every_common_page(tmp_path, today):
+    stats = export(tmp_path)
+    pages = manifest(tmp_path)
+    matches, _ = prono.api_cache.lookup(f'matches_{today}')
+    expected = {'/'} | {f'/?region={region}' for region in prono.REGIONS} | \
+        {f"/prediction/{match['id']}" for match in matches if match['status']['short'] == 'NS'}
+    assert set(pages) == expected
+    assert stats['written'] == len(expected) and stats['skipped'] == 0
+    for entry in pages.values():
+        body = (tmp_path / entry['file']).read_bytes()
+        assert gzip.decompress((tmp_path / (entry['file'] + '.gz')).read_bytes()) == body
+    assert b'<html' in (tmp_path / 'index.html').read_bytes()
+
+
+def test_unchanged_pages_are_not_rewritten(tmp_path):
+    export(tmp_path)
+    stats = export(tmp_path)
+    assert stats['written'] == 0
+    assert stats['unchanged'] == stats['pages']
+
+
+def test_fresh_copy_is_served_instead_of_the_live_route(client, exported):
+    response = client.get('/')
+    assert response.get_data() == MARKER
+    assert prono.static_export.stats['served'] == 1
+
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == MARKER
+
+    etag = response.headers['ETag']
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_copy_is_redirected_to_the_public_url(client, exported, monkeypatch):
+    monkeypatch.setattr(prono, 'EXPORT_BASE_URL', 'https://static.example.org/')
+    response = client.get('/')
+    assert response.status_code == 302
+    assert response.headers['Location'] == 'https://static.example.org/index.html'
+
+
+def test_stale_copy_falls_back_to_the_live_route(client, exported, monkeypatch):
+    monkeypatch.setattr(prono, 'static_export', prono.StaticExport(str(exported), 0))
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.get_data() != MARKER
+    assert prono.static_export.stats == {'served': 0, 'not_modified': 0, 'redirected': 0, 'expired': 1}
+
+
+def test_pages_with_user_parameters_are_never_served_from_the_export(client, exported):
+    assert client.get('/?region=all&page=2').get_data() != MARKER
+    assert prono.static_export.stats['served'] == 0